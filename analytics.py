@@ -0,0 +1,159 @@
+"""
+Batch analytics over every incident series at once
+
+``monthly_matrix`` pivots the data into one dense (series x month) matrix,
+one row per (Site, Category, Cause) combination. ``detect_anomalies`` then
+scores every point of every series together with robust statistics: the
+seasonal profile (per calendar month median) is removed, a rolling median
+gives the local level and a rolling MAD the local spread. Intermittent
+series are scored against their typical non-zero month. Tens of thousands
+of series are processed with array operations instead of a Python loop
+per series.
+"""
+
+import warnings
+
+from generate_dashboard import months
+
+SERIES_KEYS = ('Site', 'Category', 'Cause')
+
+# Scales a MAD to a standard deviation for normally distributed data
+MAD_SCALE = 1.4826
+
+
+def monthly_matrix(df, keys=SERIES_KEYS, value='Count'):
+    """Pivot ``df`` into ``(index, periods, matrix)``, with missing months filled with zero
+
+    ``index`` holds the series keys (one row per series), ``periods`` the Year
+    and Month of every column, and ``matrix`` the summed ``value``.
+    """
+    import numpy as np
+    import pandas as pd
+
+    keys = list(keys)
+    grouped = df.groupby(keys, sort=True, observed=True)
+    series = grouped.ngroup().to_numpy()
+    index = grouped.size().index.to_frame(index=False)
+
+    first_year, last_year = int(df['Year'].min()), int(df['Year'].max())
+    n_periods = (last_year - first_year + 1) * len(months)
+    month = pd.Categorical(df['Month'], categories=months).codes
+    period = (df['Year'].to_numpy() - first_year) * len(months) + month
+
+    matrix = np.bincount(series * n_periods + period, weights=df[value].to_numpy(dtype=np.float64),
+                         minlength=len(index) * n_periods).reshape(len(index), n_periods)
+    periods = pd.DataFrame({
+        'Year': np.repeat(np.arange(first_year, last_year + 1), len(months)),
+        'Month': months * (last_year - first_year + 1),
+    })
+    return index, periods, matrix
+
+
+def _rolling_windows(matrix, window):
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    # Centered windows; the edges repeat the first/last value
+    pad = window // 2
+    padded = np.pad(matrix, ((0, 0), (pad, window - 1 - pad)), mode='edge')
+    return sliding_window_view(padded, window, axis=1)
+
+
+def seasonal_offsets(matrix, season=12):
+    """Per-series offset of each calendar month from the series median, shape ``matrix.shape``"""
+    import numpy as np
+
+    n_series, n_periods = matrix.shape
+    # The per-month median needs at least three full seasons to be meaningful
+    if n_periods < 3 * season or n_periods % season:
+        return np.zeros_like(matrix)
+    profile = np.median(matrix.reshape(n_series, -1, season), axis=1)
+    offsets = profile - np.median(profile, axis=1, keepdims=True)
+    return np.tile(offsets, n_periods // season)
+
+
+def detect_anomalies(matrix, window=7, season=12, min_scale=1.0, counts=True):
+    """Robust z-scores of every point of every series, plus the expected values
+
+    With ``counts`` the spread is at least the Poisson standard deviation
+    (square root of the expected value), which keeps small-count series
+    from flagging ordinary noise. Returns ``(expected, score)`` arrays
+    shaped like ``matrix``.
+    """
+    import numpy as np
+
+    offsets = seasonal_offsets(matrix, season)
+    deseasonalized = matrix - offsets
+    windows = _rolling_windows(deseasonalized, window)
+    level = np.median(windows, axis=-1)
+    rolling_mad = np.median(np.abs(windows - level[..., None]), axis=-1)
+
+    residual = deseasonalized - level
+    # Flat windows have a MAD of zero; fall back to the series-wide spread
+    series_mad = np.median(np.abs(residual), axis=1, keepdims=True)
+    scale = np.maximum(MAD_SCALE * np.maximum(rolling_mad, series_mad), min_scale)
+    expected = level + offsets
+    if not counts:
+        return expected, residual / scale
+
+    scale = np.maximum(scale, np.sqrt(np.maximum(expected, 0)))
+    score = residual / scale
+    # Intermittent series (zero in most months): score the non-zero months
+    # against the series' typical non-zero size instead of a zero level
+    intermittent = np.median(matrix, axis=1) <= 0
+    if intermittent.any():
+        sparse = matrix[intermittent]
+        sizes = np.where(sparse > 0, sparse, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            size = np.nan_to_num(np.nanmedian(sizes, axis=1, keepdims=True))
+            size_mad = np.nan_to_num(np.nanmedian(np.abs(sizes - size), axis=1, keepdims=True))
+        size_scale = np.maximum(np.maximum(MAD_SCALE * size_mad, np.sqrt(size)), min_scale)
+        nonzero = sparse > 0
+        expected[intermittent] = np.where(nonzero, size, 0.0)
+        score[intermittent] = np.where(nonzero, (sparse - size) / size_scale, 0.0)
+    return expected, score
+
+
+def find_anomalies(df, keys=SERIES_KEYS, value='Count', threshold=3.5, window=7, season=12, min_scale=1.0,
+                   counts=True):
+    """Flagged points of every series as a frame: keys, Year, Month, value, Expected and Score"""
+    import numpy as np
+    import pandas as pd
+
+    if df.empty:
+        return pd.DataFrame(columns=list(keys) + ['Year', 'Month', value, 'Expected', 'Score'])
+    index, periods, matrix = monthly_matrix(df, keys, value)
+    expected, score = detect_anomalies(matrix, window=window, season=season, min_scale=min_scale, counts=counts)
+    rows, cols = np.nonzero(np.abs(score) > threshold)
+
+    flagged = index.iloc[rows].reset_index(drop=True)
+    flagged['Year'] = periods['Year'].to_numpy()[cols]
+    flagged['Month'] = periods['Month'].to_numpy()[cols]
+    flagged[value] = matrix[rows, cols]
+    flagged['Expected'] = expected[rows, cols]
+    flagged['Score'] = score[rows, cols]
+    return flagged.sort_values('Score', key=np.abs, ascending=False, ignore_index=True)
+
+
+def summarize_by_period(anomalies, by=(), series_keys=SERIES_KEYS, value='Count', limit=3):
+    """Number of flagged series per Year/Month (and ``by``) with a hover text of the strongest ones"""
+    import pandas as pd
+
+    keys = ['Year', 'Month'] + list(by)
+    if anomalies.empty:
+        return pd.DataFrame(columns=keys + ['Anomalies', 'Text'])
+
+    def describe(group):
+        top = group.head(limit)
+        names = top[list(series_keys)].astype(str).agg(' / '.join, axis=1)
+        lines = [f"{name}: {count:.0f} (expected {expected:.0f})"
+                 for name, count, expected in zip(names, top[value], top['Expected'])]
+        if len(group) > limit:
+            lines.append(f"... +{len(group) - limit}")
+        return '<br>'.join(lines)
+
+    grouped = anomalies.groupby(keys, sort=False)
+    summary = grouped.size().rename('Anomalies').reset_index()
+    summary['Text'] = [describe(group) for _, group in grouped]
+    return summary
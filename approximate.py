@@ -0,0 +1,94 @@
+"""
+Approximate query answers from a stratified sample, with confidence intervals
+
+A ``StratifiedSample`` keeps a fixed fraction of the rows of every stratum
+(Site x Year by default), at least one row each, so small sites are never
+dropped. Sums over any filtered subset are estimated with the stratified
+(Horvitz-Thompson) estimator, and each estimate carries a normal-approximation
+confidence interval from the within-stratum variance.
+"""
+
+# Sampling rates offered in the Dash app
+SAMPLE_RATES = [0.01, 0.05, 0.1]
+DEFAULT_STRATA = ('Site', 'Year')
+Z_95 = 1.959963984540054
+
+
+class StratifiedSample:
+    """Per-stratum simple random sample of ``df`` at ``rate``"""
+
+    def __init__(self, df, rate, strata=DEFAULT_STRATA, seed=0):
+        import numpy as np
+        import pandas as pd
+
+        if not 0 < rate <= 1:
+            raise ValueError("rate must be in (0, 1]")
+        self.rate = rate
+        self.strata = list(strata)
+        self.population = len(df)
+
+        codes = df.groupby(self.strata, sort=False, observed=True).ngroup().to_numpy()
+        sizes = np.bincount(codes)
+        take = np.minimum(sizes, np.maximum(1, np.ceil(rate * sizes).astype(np.int64)))
+
+        # Shuffle once, then keep the first n_h rows of every stratum
+        order = np.random.default_rng(seed).permutation(len(df))
+        shuffled = codes[order]
+        rank = pd.Series(shuffled).groupby(shuffled).cumcount().to_numpy()
+        keep = np.sort(order[rank < take[shuffled]])
+
+        self.rows = df.iloc[keep].reset_index(drop=True)
+        self.rows['_stratum'] = codes[keep]
+        self.sizes = pd.DataFrame({'N': sizes, 'n': take})
+
+    def __len__(self):
+        return len(self.rows)
+
+    def estimate(self, rows, by=(), value='Count', z=Z_95):
+        """Estimated sum of ``value`` over ``rows`` (a filtered subset of ``self.rows``) by ``by``
+
+        Returns a frame with the ``by`` columns plus ``value``, ``Error``
+        (half-width of the confidence interval), ``Low`` and ``High``.
+        """
+        import numpy as np
+        import pandas as pd
+
+        by = list(by)
+        y = rows[value].to_numpy(dtype=np.float64)
+        parts = pd.DataFrame({'sum': y, 'sumsq': y * y})
+        keys = [rows[col].to_numpy() for col in by] + [rows['_stratum'].to_numpy()]
+        parts = parts.groupby(keys, sort=False, observed=True).sum().reset_index()
+        parts.columns = by + ['_stratum', 'sum', 'sumsq']
+
+        stratum = self.sizes.iloc[parts['_stratum'].to_numpy()]
+        N = stratum['N'].to_numpy(dtype=np.float64)
+        n = stratum['n'].to_numpy(dtype=np.float64)
+        total = parts['sum'].to_numpy()
+        # Domain estimation: rows outside the filter count as zeros of their stratum
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s2 = np.where(n > 1, (parts['sumsq'].to_numpy() - total * total / n) / (n - 1), 0.0)
+        parts['estimate'] = N / n * total
+        parts['variance'] = N * N * (1 - n / N) * np.maximum(s2, 0.0) / n
+
+        if by:
+            result = parts.groupby(by, sort=False, observed=True)[['estimate', 'variance']].sum().reset_index()
+        else:
+            result = pd.DataFrame({'estimate': [parts['estimate'].sum()], 'variance': [parts['variance'].sum()]})
+        error = z * np.sqrt(result.pop('variance').to_numpy())
+        result = result.rename(columns={'estimate': value})
+        result['Error'] = error
+        result['Low'] = np.maximum(result[value] - error, 0.0)
+        result['High'] = result[value] + error
+        return result
+
+    def estimate_total(self, rows, value='Count', z=Z_95):
+        """``(estimate, error)`` for the sum of ``value`` over ``rows``"""
+        if rows.empty:
+            return 0.0, 0.0
+        result = self.estimate(rows, (), value=value, z=z)
+        return float(result[value].iloc[0]), float(result['Error'].iloc[0])
+
+
+def format_rate(rate):
+    """Human-readable sampling rate, e.g. ``1%``"""
+    return f"{rate * 100:g}%"
@@ -0,0 +1,82 @@
+/*
+ * Browser-side decoder for figures encoded by figure_codec.py.
+ *
+ * Dictionary-encoded arrays ({"dict": [labels], "codes": {"dtype", "bdata"}})
+ * are expanded back into plain string arrays; numeric typed-array specs are
+ * left alone because plotly.js decodes them natively.
+ */
+(function() {
+    var TYPED_ARRAYS = {
+        i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array,
+        i4: Int32Array, u4: Uint32Array, f4: Float32Array, f8: Float64Array
+    };
+
+    function decodeTypedArray(spec) {
+        var binary = atob(spec.bdata);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return new TYPED_ARRAYS[spec.dtype](bytes.buffer);
+    }
+
+    function isDictionaryArray(value) {
+        return value !== null && typeof value === 'object' && !Array.isArray(value) &&
+            Array.isArray(value.dict) && value.codes !== undefined && Object.keys(value).length === 2;
+    }
+
+    function decodeValue(value) {
+        if (isDictionaryArray(value)) {
+            var codes = Array.isArray(value.codes) ? value.codes : decodeTypedArray(value.codes);
+            var labels = new Array(codes.length);
+            for (var i = 0; i < codes.length; i++) {
+                labels[i] = value.dict[codes[i]];
+            }
+            return labels;
+        }
+        if (Array.isArray(value)) {
+            return value.map(decodeValue);
+        }
+        if (value !== null && typeof value === 'object' && value.bdata === undefined) {
+            var result = {};
+            Object.keys(value).forEach(function(key) {
+                result[key] = decodeValue(value[key]);
+            });
+            return result;
+        }
+        return value;
+    }
+
+    function decodeFigure(figure) {
+        if (!figure) {
+            return figure;
+        }
+        return {data: (figure.data || []).map(decodeValue), layout: figure.layout || {}};
+    }
+
+    window.figureCodec = {decodeFigure: decodeFigure};
+
+    // Clientside callbacks used by dash_app.py
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        figure_codec: {
+            decode_outputs: function(exact, approx) {
+                var noUpdate = window.dash_clientside.no_update;
+                var triggered = (window.dash_clientside.callback_context.triggered || []).map(function(t) {
+                    return t.prop_id;
+                });
+                var payload;
+                if (triggered.indexOf('approx-store.data') !== -1) {
+                    // Keep an exact answer that is already on screen for the same filters
+                    payload = exact && approx && exact.key === approx.key ? null : approx;
+                } else {
+                    // Drop exact answers for a selection that has since changed
+                    payload = exact && (!approx || exact.key === approx.key) ? exact : null;
+                }
+                if (!payload || !payload.figures) {
+                    return noUpdate;
+                }
+                return payload.figures.map(decodeFigure).concat([payload.count]);
+            }
+        }
+    });
+})();
@@ -0,0 +1,139 @@
+/*
+ * Viewport-driven chart loading and page timings for the static dashboard.
+ *
+ * Placeholders (<div class="lazy-chart" data-src="chart-1.json">) inside a
+ * .lazy-chart-grid are drawn when they scroll into view: the chart JSON is
+ * fetched, decoded by figure_codec.js and plotted. plotly.js and the shared
+ * layout are only downloaded with the first visible chart.
+ *
+ * Paint, load and per-chart times (ms since navigation start) are recorded in
+ * window.dashboardTimings on every page, so lazy and inline pages compare.
+ */
+(function() {
+    var timings = window.dashboardTimings = {page: {}, charts: {}};
+
+    function now() {
+        return Math.round(performance.now() * 10) / 10;
+    }
+
+    if ('PerformanceObserver' in window) {
+        try {
+            new PerformanceObserver(function(list) {
+                list.getEntries().forEach(function(entry) {
+                    timings.page[entry.name] = Math.round(entry.startTime * 10) / 10;
+                });
+            }).observe({type: 'paint', buffered: true});
+        } catch (err) {
+            // Paint timing is not supported by this browser
+        }
+    }
+    window.addEventListener('load', function() {
+        timings.page.load = now();
+    });
+
+    function loadScript(src) {
+        return new Promise(function(resolve, reject) {
+            var script = document.createElement('script');
+            script.src = src;
+            script.async = true;
+            script.onload = resolve;
+            script.onerror = function() {
+                reject(new Error('could not load ' + src));
+            };
+            document.head.appendChild(script);
+        });
+    }
+
+    function fetchJSON(url) {
+        return fetch(url).then(function(response) {
+            if (!response.ok) {
+                throw new Error(url + ': HTTP ' + response.status);
+            }
+            return response.json();
+        });
+    }
+
+    function startLoader(grid) {
+        var base = grid.getAttribute('data-base') || '';
+        var charts = grid.querySelectorAll('.lazy-chart');
+        var pending = charts.length;
+        var shared = null;
+
+        // plotly.js and the shared layout, requested once with the first visible chart
+        function loadShared() {
+            if (!shared) {
+                var start = now();
+                shared = Promise.all([
+                    window.Plotly ? Promise.resolve() : loadScript(base + grid.getAttribute('data-plotly')),
+                    fetchJSON(base + grid.getAttribute('data-layout'))
+                ]).then(function(results) {
+                    timings.page.plotlyRequested = start;
+                    timings.page.plotlyLoaded = now();
+                    return results[1];
+                });
+            }
+            return shared;
+        }
+
+        function render(element) {
+            var timing = timings.charts[element.id] = {visible: now()};
+            Promise.all([fetchJSON(base + element.getAttribute('data-src')), loadShared()])
+                .then(function(results) {
+                    timing.fetched = now();
+                    var figure = window.figureCodec.decodeFigure(results[0]);
+                    var layout = Object.assign({}, results[1], figure.layout);
+                    element.classList.remove('lazy-chart-pending');
+                    return Plotly.newPlot(element, figure.data, layout, {responsive: true});
+                })
+                .then(function() {
+                    // Charts drawn after a filter change start out filtered
+                    if (window.dashboardQueries) {
+                        window.dashboardQueries.apply(element);
+                    }
+                    timing.rendered = now();
+                    timing.renderMs = Math.round((timing.rendered - timing.visible) * 10) / 10;
+                    if (timings.page.firstChart === undefined) {
+                        timings.page.firstChart = timing.rendered;
+                    }
+                    if (--pending === 0) {
+                        timings.page.allCharts = timing.rendered;
+                        console.table(timings.charts);
+                    }
+                })
+                .catch(function(err) {
+                    element.classList.add('lazy-chart-error');
+                    element.textContent = 'Não foi possível carregar o gráfico (' + err.message +
+                        '). Sirva a página por HTTP, por exemplo: python -m http.server';
+                    console.error(err);
+                });
+        }
+
+        if (!('IntersectionObserver' in window)) {
+            Array.prototype.forEach.call(charts, render);
+            return;
+        }
+        var observer = new IntersectionObserver(function(entries) {
+            entries.forEach(function(entry) {
+                if (entry.isIntersecting) {
+                    observer.unobserve(entry.target);
+                    render(entry.target);
+                }
+            });
+        }, {rootMargin: '200px 0px'});
+        Array.prototype.forEach.call(charts, function(element) {
+            observer.observe(element);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        timings.page.domContentLoaded = now();
+        var grid = document.querySelector('.lazy-chart-grid');
+        timings.page.mode = grid ? 'lazy' : 'inline';
+        if (grid) {
+            startLoader(grid);
+        } else {
+            // Inline charts are drawn while the page is parsed
+            timings.page.allCharts = timings.page.domContentLoaded;
+        }
+    });
+})();
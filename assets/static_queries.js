@@ -0,0 +1,128 @@
+/*
+ * Refilters the static dashboard charts from precomputed answers.
+ *
+ * The page marks the answers with <div id="static-queries" data-manifest=
+ * "main_dashboard_queries/manifest.json">. On the first filter change the
+ * manifest (filter combination -> answer file) is fetched; every change then
+ * fetches one small static JSON file, cached in memory and by the browser,
+ * and restyles the main trace of each chart by its name. The totals-only
+ * overlays (anomalies, forecast) are hidden while a filter is set.
+ *
+ * Each refilter time is appended to window.dashboardTimings.queries.
+ */
+(function() {
+    var FILTER_SELECTS = {Category: 'categoryFilter', Severity: 'severityFilter', Site: 'siteFilter', Year: 'yearFilter'};
+    var OVERLAYS = ['Anomalies', 'Forecast interval', 'Forecast'];
+
+    var manifestUrl = null;
+    var base = '';
+    var manifest = null;
+    var answers = {};
+    var current = null;
+    var filtered = false;
+    // Only the answer of the latest change is drawn
+    var latest = 0;
+
+    function fetchJSON(url) {
+        return fetch(url).then(function(response) {
+            if (!response.ok) {
+                throw new Error(url + ': HTTP ' + response.status);
+            }
+            return response.json();
+        });
+    }
+
+    function traceUpdate(trace, chart) {
+        if (trace.type === 'pie') {
+            return {labels: [chart.labels], values: [chart.values]};
+        }
+        var update = {};
+        var horizontal = trace.orientation === 'h';
+        update[horizontal ? 'y' : 'x'] = [chart.labels];
+        update[horizontal ? 'x' : 'y'] = [chart.values];
+        if (trace.text !== undefined) {
+            update.text = [chart.values];
+        }
+        if (trace.marker && trace.marker.colorscale) {
+            update['marker.color'] = [chart.values];
+        }
+        return update;
+    }
+
+    // Restyle the charts drawn in one plot div with the current answer
+    function apply(div) {
+        if (!current || !div.data) {
+            return;
+        }
+        div.data.forEach(function(trace, i) {
+            if (current[trace.name]) {
+                Plotly.restyle(div, traceUpdate(trace, current[trace.name]), [i]);
+            } else if (OVERLAYS.indexOf(trace.name) >= 0) {
+                Plotly.restyle(div, {visible: !filtered}, [i]);
+            }
+        });
+    }
+
+    function filterKey() {
+        return manifest.filters.map(function(column) {
+            var select = document.getElementById(FILTER_SELECTS[column]);
+            return select ? select.value : '';
+        }).join('|');
+    }
+
+    function refilter() {
+        var start = performance.now();
+        var request = ++latest;
+        if (!manifest) {
+            manifest = fetchJSON(manifestUrl).then(function(data) {
+                manifest = data;
+                return data;
+            });
+        }
+        Promise.resolve(manifest)
+            .then(function() {
+                var key = filterKey();
+                // Combinations without incidents all share the empty answer
+                var name = manifest.results[key] || manifest.empty;
+                if (!name) {
+                    throw new Error('no precomputed answer for ' + key);
+                }
+                if (!answers[name]) {
+                    answers[name] = fetchJSON(base + name);
+                }
+                return answers[name].then(function(answer) {
+                    if (request !== latest) {
+                        return;
+                    }
+                    current = answer;
+                    filtered = key.replace(/\|/g, '') !== '';
+                    document.querySelectorAll('.js-plotly-plot').forEach(apply);
+                    var timings = window.dashboardTimings;
+                    if (timings) {
+                        (timings.queries = timings.queries || []).push(
+                            {key: key, ms: Math.round((performance.now() - start) * 10) / 10});
+                    }
+                });
+            })
+            .catch(function(err) {
+                console.error('Could not refilter the charts:', err);
+            });
+    }
+
+    window.dashboardQueries = {apply: apply};
+
+    document.addEventListener('DOMContentLoaded', function() {
+        var config = document.getElementById('static-queries');
+        if (!config) {
+            return;
+        }
+        manifestUrl = config.getAttribute('data-manifest');
+        base = manifestUrl.slice(0, manifestUrl.lastIndexOf('/') + 1);
+        Object.keys(FILTER_SELECTS).forEach(function(column) {
+            var select = document.getElementById(FILTER_SELECTS[column]);
+            if (select) {
+                select.addEventListener('change', refilter);
+            }
+        });
+    });
+})();
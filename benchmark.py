@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the dashboard generators and the Dash callback
+
+Times the cold start of every CLI entry point, data generation,
+aggregation/figure build, HTML generation and the ``update_all_graphs``
+callback at several dataset sizes, records wall time, peak memory and output
+bytes as JSON and compares them with a stored baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import analytics
+import approximate
+import dash_app
+import detail_table
+import enhanced_dashboard
+import export
+import forecasting
+import outofcore
+import partitioned
+import snapshot
+import static_queries
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+# Sampling rate used for the approximate-mode callback cases
+APPROX_RATE = 0.01
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(REPO_DIR, 'benchmark_baseline.json')
+
+# Cold-start commands for every CLI entry point, run in a fresh interpreter
+STARTUP_COMMANDS = {
+    'generate_dashboard.py --help': ['generate_dashboard.py', '--help'],
+    'enhanced_dashboard.py --help': ['enhanced_dashboard.py', '--help'],
+    'Untitled-1.py --help': ['Untitled-1.py', '--help'],
+    'benchmark.py --help': ['benchmark.py', '--help'],
+    'export.py --help': ['export.py', '--help'],
+    'loadtest.py --help': ['loadtest.py', '--help'],
+    'import dash_app': ['-c', 'import dash_app'],
+}
+
+# Fixed filter combinations for update_all_graphs
+# (category, site, month, cause, severity, year, status)
+FILTER_COMBINATIONS = {
+    'all': (None, None, None, None, None, None, None),
+    'single-site': (None, ['Weston'], None, None, None, None, None),
+    'category-severity': (['Spill', 'Injury'], None, None, None, ['Critical', 'Major'], None, None),
+    'year-quarter': (None, None, ['Jan', 'Feb', 'Mar'], None, None, [2008], None),
+    'narrow': (['Equipment'], ['Acton'], None, ['Design', 'Training'], None, [2009], ['Open']),
+}
+
+
+# Chart selection applied on top of the "all" combination for the crossfilter case
+CROSSFILTER_SELECTION = {'bar-category': ['Spill', 'Injury'], 'pie-severity': ['Critical']}
+# Detail table page fetched for every filter combination: page 10, largest counts first
+DETAIL_PAGE = {'page_current': 10, 'sort_by': [{'column_id': 'Count', 'direction': 'desc'}]}
+
+
+def scale_data(df, n_rows, seed=0):
+    """Resample a base frame to ``n_rows`` rows with a fixed seed"""
+    return df.sample(n=n_rows, replace=True, random_state=seed).reset_index(drop=True)
+
+
+def measure(func, repeat=3):
+    """Run ``func`` ``repeat`` times, then once more under tracemalloc for the peak"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, {
+        'wall_s': min(timings),
+        'wall_median_s': statistics.median(timings),
+        'peak_bytes': peak,
+    }
+
+
+def worker_steps(max_workers):
+    """Worker counts of a speedup curve: 1, 2, 4... up to ``max_workers``"""
+    steps = [1]
+    while steps[-1] * 2 < max_workers:
+        steps.append(steps[-1] * 2)
+    return steps + [max_workers] if max_workers > 1 else steps
+
+
+def run_benchmarks(sizes, repeat=3, combinations=None, max_workers=None):
+    """Run every benchmark case and return a list of result dicts
+
+    At the largest size the partitioned group-by runs with 1 to
+    ``max_workers`` processes (default: every CPU); each entry of that curve
+    carries its ``speedup`` over one process.
+    """
+    from plotly.io.json import to_json_plotly
+
+    combinations = combinations or list(FILTER_COMBINATIONS)
+    results = []
+
+    def record(name, rows, stats, output_bytes):
+        entry = {'name': name, 'rows': rows, 'output_bytes': output_bytes, **stats}
+        results.append(entry)
+        print(f"  {name:<45} {stats['wall_s'] * 1000:>10.1f} ms"
+              f" {stats['peak_bytes'] / 1e6:>10.1f} MB {output_bytes / 1e6:>10.2f} MB out")
+
+    print("🔄 Benchmarking generate_data()...")
+    # generate_data() has a fixed grid, so it is timed at its native size
+    base_df, stats = measure(enhanced_dashboard.generate_data, repeat)
+    record('generate_data', len(base_df), stats, int(base_df.memory_usage(deep=True).sum()))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        dash_base_df = dash_app.generate_data()
+
+    print("🔄 Benchmarking sharded generation...")
+    # Same rows whatever the worker count; the scale gives roughly the largest benchmark size
+    scale = max(1, max(sizes) // len(dash_base_df))
+    for workers in sorted({1, min(4, os.cpu_count() or 1)}):
+        df, stats = measure(lambda: dash_app.generate_data(workers=workers, scale=scale), repeat)
+        record(f'generate_data[scale={scale}:workers={workers}]', len(df), stats,
+               int(df.memory_usage(deep=True).sum()))
+        del df
+
+    if snapshot.available():
+        # What every run after the first pays instead of generating
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'snapshot.arrow')
+            snapshot.write_snapshot(dash_app.generate_data(scale=scale), path)
+            df, stats = measure(lambda: snapshot.read_snapshot(path), repeat)
+            record(f'read_snapshot[scale={scale}]', len(df), stats, os.path.getsize(path))
+            del df
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n_rows in sizes:
+            print(f"🔄 Benchmarking {n_rows:,} rows...")
+            df = scale_data(base_df, n_rows)
+
+            fig, stats = measure(lambda: enhanced_dashboard.create_enhanced_dashboard(df), repeat)
+            record(f'create_enhanced_dashboard[{n_rows}]', n_rows, stats, len(to_json_plotly(fig)))
+
+            if n_rows == max(sizes):
+                # Speedup curve of the partitioned group-by behind create_enhanced_dashboard(workers=N)
+                single = None
+                # Small frames use fewer workers than asked (partitioned.MIN_PARTITION_ROWS)
+                steps = worker_steps(max_workers or os.cpu_count() or 1)
+                for workers in sorted({partitioned.worker_count(n_rows, workers) for workers in steps}):
+                    reduced, stats = measure(lambda: partitioned.aggregate_frame(df, workers=workers), repeat)
+                    record(f'aggregate_frame[{n_rows}:workers={workers}]', n_rows, stats, len(reduced))
+                    single = single or stats['wall_s']
+                    results[-1]['speedup'] = single / stats['wall_s']
+                    print(f"    ⚡ {workers} worker(s): {results[-1]['speedup']:.2f}x")
+
+            output_path = os.path.join(tmpdir, 'main_dashboard.html')
+            _, stats = measure(lambda: enhanced_dashboard.generate_enhanced_html(df, filename=output_path), repeat)
+            record(f'generate_enhanced_html[{n_rows}]', n_rows, stats, os.path.getsize(output_path))
+
+            # Only the initial page counts as output: the charts and plotly.js load on scroll
+            lazy_path = os.path.join(tmpdir, 'lazy_dashboard.html')
+            _, stats = measure(lambda: enhanced_dashboard.generate_enhanced_html(df, filename=lazy_path, lazy=True),
+                               repeat)
+            record(f'generate_enhanced_html[{n_rows}:lazy]', n_rows, stats, os.path.getsize(lazy_path))
+
+            queries_dir = os.path.join(tmpdir, 'queries')
+            _, stats = measure(lambda: static_queries.write_static_queries(df, queries_dir, enhanced_dashboard.months),
+                               repeat)
+            record(f'write_static_queries[{n_rows}]', n_rows, stats,
+                   sum(entry.stat().st_size for entry in os.scandir(queries_dir)))
+            del df
+
+            dash_df = scale_data(dash_base_df, n_rows)
+            for combo in combinations:
+                args = FILTER_COMBINATIONS[combo]
+                # Dash serializes the outputs inside the request, so that is part of the cost
+                payload, stats = measure(
+                    lambda: to_json_plotly(dash_app.encode_outputs(dash_app.update_all_graphs(dash_df, *args))), repeat)
+                record(f'update_all_graphs[{n_rows}:{combo}]', n_rows, stats, len(payload))
+
+            engine, stats = measure(lambda: dash_app.create_crossfilter(dash_df), repeat)
+            record(f'create_crossfilter[{n_rows}]', n_rows, stats, 0)
+            for combo, selection in [(combo, None) for combo in combinations] + [('all', CROSSFILTER_SELECTION)]:
+                args = FILTER_COMBINATIONS[combo]
+                name = f'{combo}+selection' if selection else combo
+                payload, stats = measure(lambda: crossfilter_update(engine, args, selection), repeat)
+                record(f'update_all_graphs_crossfilter[{n_rows}:{name}]', n_rows, stats, len(payload))
+            # A zoom on the trend chart reads one roll-up group, whatever the number of rows
+            view = engine.grains.view(engine.grains.window(engine.grains.view(), 11.5, 23.5))
+            payload, stats = measure(
+                lambda: to_json_plotly(dash_app.update_trend_zoom(engine, view, *FILTER_COMBINATIONS['all'])),
+                repeat)
+            record(f'update_trend_zoom[{n_rows}]', n_rows, stats, len(payload))
+            # A drill-down view reads the leaf sums below its root, whatever the number of rows
+            site = dash_df['Site'].iloc[0]
+            payload, stats = measure(
+                lambda: to_json_plotly(dash_app.update_hierarchy(engine, [site], *FILTER_COMBINATIONS['all'])),
+                repeat)
+            record(f'update_hierarchy[{n_rows}]', n_rows, stats, len(payload))
+            table = detail_table.DetailTable(engine, dash_app.DETAIL_COLUMNS)
+            for combo in combinations:
+                args = FILTER_COMBINATIONS[combo]
+                payload, stats = measure(
+                    lambda: json.dumps(dash_app.update_detail_table(table, *args, **DETAIL_PAGE)[0]), repeat)
+                record(f'update_detail_table[{n_rows}:{combo}]', n_rows, stats, len(payload))
+            del engine, table
+
+            sample, stats = measure(lambda: approximate.StratifiedSample(dash_df, APPROX_RATE), repeat)
+            record(f'stratified_sample[{n_rows}]', n_rows, stats, int(sample.rows.memory_usage(deep=True).sum()))
+            for combo in combinations:
+                args = FILTER_COMBINATIONS[combo]
+                payload, stats = measure(
+                    lambda: to_json_plotly(dash_app.encode_outputs(dash_app.update_all_graphs_approx(sample, *args))),
+                    repeat)
+                record(f'update_all_graphs_approx[{n_rows}:{combo}]', n_rows, stats, len(payload))
+            del sample
+
+            for fmt in export.available_formats():
+                # Streamed chunk by chunk, so the peak stays at about one encoded chunk
+                size, stats = measure(lambda: sum(len(part) for part in export.stream_export(dash_df, fmt)), repeat)
+                record(f'stream_export[{n_rows}:{fmt}]', n_rows, stats, size)
+
+            # Out of core: the file is summed in chunks, so the peak follows the groups, not the rows
+            input_path = os.path.join(tmpdir, 'incidents.parquet' if snapshot.available() else 'incidents.csv')
+            export.write_export(dash_df, input_path)
+            reduced, stats = measure(lambda: outofcore.aggregate_file(input_path, chunk_rows=100_000), repeat)
+            record(f'aggregate_file[{n_rows}]', n_rows, stats, len(reduced))
+            del reduced
+            os.remove(input_path)
+
+            anomalies, stats = measure(lambda: analytics.find_anomalies(dash_df), repeat)
+            record(f'find_anomalies[{n_rows}]', n_rows, stats, len(anomalies))
+            forecaster, stats = measure(lambda: forecasting.SeriesForecaster().fit(dash_df), repeat)
+            record(f'fit_forecast[{n_rows}]', n_rows, stats, len(forecaster.index))
+            del dash_df
+
+    return results
+
+
+def crossfilter_update(engine, args, selection=None):
+    """Serialized crossfilter callback output, starting from the unfiltered state"""
+    from plotly.io.json import to_json_plotly
+
+    # Reset first so every run pays for the same delta
+    for name in engine.dimensions:
+        engine.filter(name, None)
+    return to_json_plotly(dash_app.encode_outputs(
+        dash_app.update_all_graphs_crossfilter(engine, *args, selection=selection)))
+
+
+def measure_startup(repeat=5):
+    """Time each CLI entry point from a cold interpreter and record its peak RSS"""
+    results = []
+    print("🔄 Benchmarking cold start...")
+    for name, command in STARTUP_COMMANDS.items():
+        timings = []
+        peak = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            process = subprocess.Popen([sys.executable, *command], cwd=REPO_DIR,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            _, status, rusage = os.wait4(process.pid, 0)
+            timings.append(time.perf_counter() - start)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if process.returncode != 0:
+                raise RuntimeError(f"{name} exited with status {process.returncode}")
+            # ru_maxrss is in kilobytes on Linux
+            peak = max(peak, rusage.ru_maxrss * 1024)
+        entry = {
+            'name': f'startup[{name}]',
+            'rows': 0,
+            'output_bytes': 0,
+            'wall_s': min(timings),
+            'wall_median_s': statistics.median(timings),
+            'peak_bytes': peak,
+        }
+        results.append(entry)
+        print(f"  {entry['name']:<45} {entry['wall_s'] * 1000:>10.1f} ms {peak / 1e6:>10.1f} MB rss")
+    return results
+
+
+def compare_to_baseline(results, baseline, time_tolerance=0.25, memory_tolerance=0.25, bytes_tolerance=0.05):
+    """Return a list of regression messages for results worse than the baseline"""
+    baseline_by_name = {entry['name']: entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        base = baseline_by_name.get(entry['name'])
+        if base is None:
+            continue
+        checks = [
+            ('wall_s', time_tolerance),
+            ('peak_bytes', memory_tolerance),
+            ('output_bytes', bytes_tolerance),
+        ]
+        for key, tolerance in checks:
+            if base[key] and entry[key] > base[key] * (1 + tolerance):
+                regressions.append(
+                    f"{entry['name']}: {key} {entry[key]:,.4g} > baseline {base[key]:,.4g}"
+                    f" (+{(entry[key] / base[key] - 1) * 100:.0f}%, tolerance {tolerance * 100:.0f}%)"
+                )
+    return regressions
+
+
+def environment_info():
+    """Describe the interpreter and library versions used for a run"""
+    import numpy as np
+    import pandas as pd
+    import plotly
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plotly': plotly.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard generation and callback paths")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Dataset sizes in rows (default: 10k, 1M, 10M)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (best is reported)")
+    parser.add_argument('--combinations', nargs='+', choices=list(FILTER_COMBINATIONS),
+                        help="Filter combinations to run through update_all_graphs (default: all)")
+    parser.add_argument('--max-workers', type=int,
+                        help="Largest worker count of the partitioned group-by speedup curve (default: every CPU)")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the JSON results")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="Overwrite the baseline with this run")
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    parser.add_argument('--bytes-tolerance', type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    results = measure_startup()
+    results += run_benchmarks(args.sizes, repeat=args.repeat, combinations=args.combinations,
+                              max_workers=args.max_workers)
+    report = {'environment': environment_info(), 'results': results}
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved as: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ No baseline found at {args.baseline}, skipping comparison")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.time_tolerance,
+                                      args.memory_tolerance, args.bytes_tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against {args.baseline}:")
+        for message in regressions:
+            print(f"   {message}")
+        return 1
+
+    print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
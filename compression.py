@@ -0,0 +1,173 @@
+"""
+Compressed HTTP responses for the Dash server (gzip, and Brotli when installed)
+
+``install`` adds a Flask ``after_request`` hook that compresses text
+responses (callback JSON, the layout, JavaScript and CSS bundles, exports
+served as text) with the best encoding the client accepts, following the
+q-values of its ``Accept-Encoding``: Brotli (``br``, only if the
+``brotli`` package is installed) before gzip. Responses under ``min_size``
+bytes, media types that are already compressed, partial and streamed
+responses are sent as they are.
+
+The figure JSON of the callbacks is highly repetitive (the same keys and
+labels on every trace), so gzip typically shrinks it 5-10x; on a slow link
+this saves more time than the compression costs. Cacheable responses (the
+fingerprinted Dash component suites, ``assets/`` files with an ETag) are
+compressed once per URL, ETag and encoding and served from memory
+afterwards. ETags are made weak, since the compressed bytes are a different
+representation of the same resource.
+"""
+
+import collections
+import gzip
+import threading
+
+# Responses smaller than this are sent uncompressed: the headers cost more than the saving
+MIN_SIZE = 1024
+# 1 (fastest) to 9 (smallest); Brotli uses the same number as its quality (0-11)
+DEFAULT_LEVEL = 6
+# Compressed bodies kept per (URL, ETag, encoding)
+MAX_CACHED = 64
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                      'image/svg+xml')
+
+
+def available_encodings():
+    """Encodings this server can produce, most preferred first"""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return ['gzip']
+    return ['br', 'gzip']
+
+
+def negotiate(accept_encoding, encodings=None):
+    """Best of ``encodings`` for an ``Accept-Encoding`` header value, or None for identity
+
+    Encodings are ranked by q-value, ties by the order of ``encodings``;
+    ``*`` matches any encoding not listed and ``q=0`` refuses one.
+    """
+    encodings = available_encodings() if encodings is None else encodings
+    weights = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data, encoding, level=DEFAULT_LEVEL):
+    """``data`` (bytes) compressed with ``encoding`` ('gzip' or 'br')"""
+    if encoding == 'br':
+        import brotli
+
+        return brotli.compress(data, quality=min(level, 11))
+    # mtime=0 so the same body always gives the same bytes
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def decompress(data, encoding):
+    """Inverse of ``compress``; identity for None"""
+    if encoding == 'br':
+        import brotli
+
+        return brotli.decompress(data)
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    return data
+
+
+def compressible(content_type):
+    """Whether a media type is text that compresses well"""
+    content_type = (content_type or '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class _BodyCache:
+    """Thread-safe LRU of compressed bodies of cacheable responses"""
+
+    def __init__(self, max_entries=MAX_CACHED):
+        self.max_entries = max_entries
+        self._bodies = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._bodies[key] = body
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+
+
+def install(server, level=DEFAULT_LEVEL, min_size=MIN_SIZE):
+    """Compress the responses of a Flask server; ``level`` 0 leaves them uncompressed
+
+    Install it after ``metrics.install``, so the response-size metrics see
+    both the payload and the bytes sent.
+    """
+    from flask import g, request
+
+    if not level:
+        return server
+    encodings = available_encodings()
+    cache = _BodyCache()
+
+    @server.after_request
+    def _compress_response(response):
+        response.vary.add('Accept-Encoding')
+        if (response.status_code != 200 or 'Content-Encoding' in response.headers
+                or response.is_streamed and not response.direct_passthrough
+                or not compressible(response.content_type)):
+            return response
+        encoding = negotiate(request.headers.get('Accept-Encoding'), encodings)
+        if encoding is None:
+            return response
+        etag, _ = response.get_etag()
+        cacheable = bool(etag or response.cache_control.max_age)
+        key = (request.full_path, etag, encoding)
+        body = cache.get(key) if cacheable else None
+        if body is None:
+            # Files sent by send_file are read here instead of passed through
+            response.direct_passthrough = False
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            body = compress(data, encoding, level)
+            if cacheable:
+                cache.put(key, body)
+            g.uncompressed_bytes = len(data)
+        else:
+            g.uncompressed_bytes = response.content_length
+            close = getattr(response.response, 'close', None)
+            if close is not None:
+                # The file is not read, but must still be closed
+                response.call_on_close(close)
+        response.direct_passthrough = False
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+    return server
@@ -0,0 +1,231 @@
+"""
+Incremental crossfilter engine
+
+Rows are filtered by any number of named dimensions. Each group keeps the
+sum of ``value`` per key over the rows that pass every filter except the
+one it excludes, which is how a chart shows the data filtered by every other
+chart's selection but not by its own.
+
+Changing a filter only visits the rows whose labels entered or left the
+selection (found through a per-column sorted index), and every group is
+updated by the delta of those rows instead of re-filtering the whole frame.
+``count_scans`` counts the rows visited by the filter changes of the
+calling thread, for the rows-scanned metrics. Groups only some views read
+can be added with ``add_lazy_group``: they are built, and kept up to date,
+from the first time they are read.
+"""
+
+import contextlib
+import threading
+
+
+def _index_dtype(size):
+    import numpy as np
+
+    return np.int32 if size < 2 ** 31 else np.int64
+
+
+class _Column:
+    """Integer codes of a column plus a sorted index from label to rows"""
+
+    def __init__(self, name, codes, labels):
+        import numpy as np
+
+        self.name = name
+        self.codes = codes
+        self.labels = labels
+        self.order = np.argsort(codes, kind='stable').astype(_index_dtype(len(codes)))
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(labels)))])
+
+    def rows(self, label_codes):
+        """Row numbers of every row with one of ``label_codes``"""
+        import numpy as np
+
+        return np.concatenate([self.order[self.offsets[j]:self.offsets[j + 1]] for j in label_codes])
+
+
+class _Dimension:
+    def __init__(self, name, column, n_rows):
+        import numpy as np
+
+        self.name = name
+        self.column = column
+        self.selected = np.ones(len(column.labels), dtype=bool)
+        self.passes = np.ones(n_rows, dtype=bool)
+
+
+class _Group:
+    def __init__(self, name, columns, exclude, keys, sums):
+        self.name = name
+        self.columns = columns
+        self.exclude = exclude
+        self.keys = keys
+        self.sums = sums
+
+
+class _ScanCount:
+    rows = 0
+
+
+class Crossfilter:
+    """Filter ``df`` by named dimensions and keep per-group sums of ``value`` up to date"""
+
+    def __init__(self, df, value='Count'):
+        import numpy as np
+
+        self.df = df
+        self.value = value
+        self.values = df[value].to_numpy(dtype=np.float64)
+        self._integer = df[value].dtype.kind in 'iu'
+        self.n_rows = len(df)
+        # Number of dimensions each row currently fails
+        self.fail_count = np.zeros(self.n_rows, dtype=np.int16)
+        self.total = float(self.values.sum())
+        # Rows passing every filter, and a counter bumped whenever that set changes
+        self.count = self.n_rows
+        self.version = 0
+        self.lock = threading.Lock()
+        self._scans = threading.local()
+        self._columns = {}
+        self.dimensions = {}
+        self.groups = {}
+        self._lazy_groups = {}
+
+    def add_column(self, name, codes, labels):
+        """Register precomputed integer ``codes`` into ``labels`` under ``name``"""
+        import numpy as np
+
+        codes = np.asarray(codes)
+        codes = codes.astype(np.int32 if len(labels) > 32767 else np.int16)
+        self._columns[name] = _Column(name, codes, list(labels))
+        return self._columns[name]
+
+    def column(self, name, categories=None):
+        """Codes of a frame column, factorized once and shared by every dimension and group"""
+        import pandas as pd
+
+        if name not in self._columns:
+            if categories is None:
+                codes, labels = pd.factorize(self.df[name], sort=True)
+                labels = labels.tolist()
+            else:
+                codes, labels = pd.Categorical(self.df[name], categories=categories).codes, list(categories)
+            self.add_column(name, codes, labels)
+        return self._columns[name]
+
+    def add_dimension(self, name, column=None):
+        """Add a filterable dimension over ``column`` (defaults to ``name``)"""
+        if self.groups:
+            raise RuntimeError("add every dimension before the first group")
+        self.dimensions[name] = _Dimension(name, self.column(column or name), self.n_rows)
+        return self.dimensions[name]
+
+    def add_group(self, name, columns, exclude=None):
+        """Sum ``value`` by ``columns``, ignoring the filter of dimension ``exclude``"""
+        import numpy as np
+
+        cols = [self.column(col) for col in columns]
+        shape = tuple(len(col.labels) for col in cols)
+        keys = np.ravel_multi_index([col.codes for col in cols], shape).astype(_index_dtype(int(np.prod(shape))))
+        return self.add_keyed_group(name, keys, int(np.prod(shape)), exclude, cols)
+
+    def add_keyed_group(self, name, keys, size, exclude=None, columns=()):
+        """Sum ``value`` by precomputed row ``keys`` in ``range(size)``, ignoring the filter of dimension ``exclude``
+
+        For groupings too sparse for one key per label combination; read
+        their sums with ``group_sums``.
+        """
+        import numpy as np
+
+        fails = self.fail_count
+        if exclude is not None:
+            fails = fails - ~self.dimensions[exclude].passes
+        mask = fails == 0
+        sums = np.bincount(keys[mask], weights=self.values[mask], minlength=size)
+        self.groups[name] = _Group(name, list(columns), exclude, keys, sums)
+        return self.groups[name]
+
+    def add_lazy_group(self, name, build):
+        """Defer a group until it is first read: ``build(self)`` must then add the group ``name``"""
+        self._lazy_groups[name] = build
+
+    def _group(self, name):
+        if name not in self.groups and name in self._lazy_groups:
+            self._lazy_groups.pop(name)(self)
+        return self.groups[name]
+
+    def filter(self, name, labels=None):
+        """Keep only rows whose ``name`` label is in ``labels`` (None or empty clears the filter)"""
+        import numpy as np
+        import pandas as pd
+
+        dim = self.dimensions[name]
+        if labels:
+            selected = pd.Index(dim.column.labels).isin(list(labels))
+        else:
+            selected = np.ones(len(dim.column.labels), dtype=bool)
+        changed = np.flatnonzero(selected != dim.selected)
+        if not len(changed):
+            return
+
+        rows = dim.column.rows(changed)
+        count = getattr(self._scans, 'count', None)
+        if count is not None:
+            count.rows += len(rows)
+        entering = selected[dim.column.codes[rows]]
+        before = self.fail_count[rows]
+        after = before + np.where(entering, -1, 1).astype(before.dtype)
+        weights = self.values[rows]
+
+        self.total += float(weights[after == 0].sum() - weights[before == 0].sum())
+        self.count += int(np.count_nonzero(after == 0) - np.count_nonzero(before == 0))
+        self.version += 1
+        for group in self.groups.values():
+            if group.exclude == name:
+                continue
+            excluded = 0 if group.exclude is None else ~self.dimensions[group.exclude].passes[rows]
+            sign = (after - excluded == 0).astype(np.int8) - (before - excluded == 0).astype(np.int8)
+            moved = np.flatnonzero(sign)
+            if len(moved):
+                group.sums += np.bincount(group.keys[rows[moved]], weights=weights[moved] * sign[moved],
+                                          minlength=len(group.sums))
+
+        self.fail_count[rows] = after
+        dim.passes[rows] = entering
+        dim.selected = selected
+
+    @contextlib.contextmanager
+    def count_scans(self):
+        """Count the rows visited by the filter changes of this thread inside the block (``.rows``)"""
+        count, previous = _ScanCount(), getattr(self._scans, 'count', None)
+        self._scans.count = count
+        try:
+            yield count
+        finally:
+            self._scans.count = previous
+
+    def passes(self, rows):
+        """Whether each of ``rows`` passes every filter"""
+        return self.fail_count[rows] == 0
+
+    def group_sums(self, name):
+        """Copy of the sums of a group, one per key"""
+        import numpy as np
+
+        sums = self._group(name).sums
+        return np.rint(sums).astype(np.int64) if self._integer else sums.copy()
+
+    def group_frame(self, name):
+        """Non-zero sums of a group as a frame with one column per key plus ``value``"""
+        import numpy as np
+        import pandas as pd
+
+        group = self._group(name)
+        nonzero = np.flatnonzero(group.sums)
+        shape = tuple(len(col.labels) for col in group.columns)
+        frame = {}
+        for col, codes in zip(group.columns, np.unravel_index(nonzero, shape)):
+            frame[col.name] = np.asarray(col.labels, dtype=object)[codes]
+        sums = group.sums[nonzero]
+        frame[self.value] = np.rint(sums).astype(np.int64) if self._integer else sums
+        return pd.DataFrame(frame)
@@ -0,0 +1,1200 @@
+#!/usr/bin/env python3
+"""
+Interactive Dash application for incident analysis
+
+Importing this module does no work: the dataset and the Dash app are built by
+``create_app()``, and pandas/plotly/dash are imported by the functions that use them.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+import analytics
+import approximate
+import compression
+import crossfilter
+import detail_table
+import export
+import figure_codec
+import figure_templates
+import forecasting
+import hierarchy
+import metrics
+import outofcore
+import prefetch
+import rollups
+import topk
+from generate_dashboard import generate_data, months, severities
+
+# Paleta profissional (PatternFly/Plotly)
+COLORS = {
+    'primary': '#1f77b4',   # Azul
+    'success': '#2ca02c',   # Verde
+    'warning': '#ff7f0e',   # Laranja
+    'danger': '#d62728',    # Vermelho
+    'info': '#17becf',      # Ciano
+    'secondary': '#7f7f7f', # Cinza
+    'background': '#f8f9fa',
+    'card_bg': '#fff',
+    'text_primary': '#212529',
+    'text_secondary': '#6c757d'
+}
+
+FILTER_COLUMNS = ['Category', 'Site', 'Month', 'Cause', 'Severity', 'Year', 'Status']
+# Colunas da tabela de registros
+DETAIL_COLUMNS = FILTER_COLUMNS + ['Count']
+
+# Seleção cruzada: id do gráfico -> (dimensão, chave do ponto em clickData/selectedData)
+CROSSFILTER_CHARTS = {
+    'bar-category': ('Category', 'x'),
+    'bar-cause': ('Cause', 'x'),
+    'line-month': ('Period', 'x'),
+    'bar-site': ('Site', 'y'),
+    'bar-trend': ('Month', 'y'),
+    'pie-severity': ('Severity', 'label'),
+}
+# Margens de todos os gráficos
+FIGURE_MARGIN = dict(t=18, b=6, l=2, r=2)
+# Colunas agregadas por cada gráfico (a primeira é a dimensão selecionável)
+CHART_GROUPS = {
+    'bar-category': ['Category', 'Severity'],
+    'bar-cause': ['Cause', 'Severity'],
+    'line-month': ['Period', 'Category'],
+    'bar-site': ['Site', 'Severity'],
+    'bar-trend': ['Month', 'Severity'],
+    'pie-severity': ['Severity'],
+}
+
+
+def create_layout():
+    """Build the dashboard layout: six graphs plus the filter sidebar"""
+    import dash_bootstrap_components as dbc
+    from dash import dash_table, dcc, html
+
+    return dbc.Container(fluid=True, style={'backgroundColor': COLORS['background'], 'padding': '12px'}, children=[
+        # Figuras codificadas pelo servidor; decodificadas no navegador por assets/figure_codec.js
+        dcc.Store(id='figures-store'),
+        # Resposta aproximada (amostra estratificada), substituída pela exata quando pronta
+        dcc.Store(id='approx-store'),
+        # Seleções feitas nos gráficos (clique ou seleção em caixa): id do gráfico -> rótulos
+        dcc.Store(id='selection-store', data={}),
+        # Zoom do gráfico de tendência: grão e buckets visíveis (None = período inteiro, por mês)
+        dcc.Store(id='trend-zoom'),
+        # Raiz da hierarquia detalhada (Site → Category → Cause → Severity); [] = todos os sites
+        dcc.Store(id='drill-path', data=[]),
+        dbc.Row([
+            dbc.Col([
+                dbc.Row([
+                    dbc.Col([
+                        html.Div([
+                            html.H4("Category", className="text-center", style={'fontWeight': 'bold'}),
+                            dcc.Graph(id='bar-category')
+                        ])
+                    ], width=4),
+                    dbc.Col([
+                        html.Div([
+                            html.H4("Cause", className="text-center", style={'fontWeight': 'bold'}),
+                            dcc.Graph(id='bar-cause')
+                        ])
+                    ], width=4),
+                    dbc.Col([
+                        html.Div([
+                            html.H4("Month", className="text-center", style={'fontWeight': 'bold'}),
+                            dcc.Graph(id='line-month')
+                        ])
+                    ], width=4),
+                ])
+            ], width=10),
+            dbc.Col([
+                html.Div([
+                    html.H5("Filtros", style={'fontWeight': 'bold', 'marginBottom': '8px'}),
+                    html.Label("Category"), dcc.Dropdown(id="filter-category", multi=True),
+                    html.Label("Site"), dcc.Dropdown(id="filter-site", multi=True),
+                    html.Label("Month"), dcc.Dropdown(id="filter-month", multi=True),
+                    html.Label("Cause"), dcc.Dropdown(id="filter-cause", multi=True),
+                    html.Label("Severity"), dcc.Dropdown(id="filter-severity", multi=True),
+                    html.Label("Year"), dcc.Dropdown(id="filter-year", multi=True),
+                    html.Label("Status"), dcc.Dropdown(id="filter-status", multi=True),
+                    dbc.Button("Limpar seleção dos gráficos", id="clear-selection", size="sm",
+                               color="secondary", outline=True, style={'marginTop': '8px', 'width': '100%'}),
+                    html.Hr(),
+                    html.Label("Modo de consulta"),
+                    dcc.Dropdown(id="sampling-rate", clearable=False, value=0,
+                                 options=[{'label': 'Exato', 'value': 0}] +
+                                         [{'label': f"Aproximado ({approximate.format_rate(rate)})", 'value': rate}
+                                          for rate in approximate.SAMPLE_RATES]),
+                    html.Div("Total de registros filtrados:", style={'marginTop':'12px'}),
+                    html.H5(id="filtered-count", style={'color': COLORS['primary'], 'fontWeight': 'bold'}),
+                    # Download em streaming dos registros filtrados
+                    html.Div(["Exportar: "] + [html.A(fmt.upper(), id=f"export-{fmt}", href=f"/export/{fmt}",
+                                                      style={'marginRight': '8px'})
+                                               for fmt in export.available_formats()])
+                ], style={'background': COLORS['card_bg'], 'padding': '16px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px #e3e3e3'})
+            ], width=2)
+        ]),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Row([
+                    dbc.Col([
+                        html.Div([
+                            html.H4("Site", className="text-center", style={'fontWeight': 'bold'}),
+                            dcc.Graph(id='bar-site')
+                        ])
+                    ], width=4),
+                    dbc.Col([
+                        html.Div([
+                            html.H4("Trend", className="text-center", style={'fontWeight': 'bold'}),
+                            dcc.Graph(id='bar-trend')
+                        ])
+                    ], width=4),
+                    dbc.Col([
+                        html.Div([
+                            html.H4("Severity", className="text-center", style={'fontWeight': 'bold'}),
+                            dcc.Graph(id='pie-severity')
+                        ])
+                    ], width=4),
+                ])
+            ], width=10),
+            dbc.Col([], width=2)  # Sidebar ocupa somente a linha de cima
+        ]),
+
+        # Hierarquia: clicar em um nó busca os níveis abaixo dele; clicar no centro volta um nível
+        dbc.Row([
+            dbc.Col([
+                html.H4("Site → Category → Cause → Severity", className="text-center", style={'fontWeight': 'bold'}),
+                dcc.Graph(id='hierarchy', style={'height': '520px'})
+            ], width=10),
+            dbc.Col([], width=2)
+        ]),
+
+        # Registros filtrados: paginação, ordenação e filtro por coluna feitos no servidor
+        dbc.Row([
+            dbc.Col([
+                html.H4("Registros", className="text-center", style={'fontWeight': 'bold'}),
+                dash_table.DataTable(
+                    id='detail-table',
+                    columns=[{'name': col, 'id': col, 'type': 'numeric' if col in ('Year', 'Count') else 'text'}
+                             for col in DETAIL_COLUMNS],
+                    page_current=0,
+                    page_size=detail_table.PAGE_SIZE,
+                    page_action='custom',
+                    sort_action='custom',
+                    sort_mode='single',
+                    sort_by=[],
+                    filter_action='custom',
+                    filter_query='',
+                    style_table={'overflowX': 'auto'},
+                    style_header={'fontWeight': 'bold', 'backgroundColor': COLORS['card_bg']},
+                    style_cell={'textAlign': 'left', 'padding': '4px 8px'}
+                )
+            ], width=10),
+            dbc.Col([], width=2)
+        ])
+    ])
+
+
+# Preencher opções dos filtros com base nos dados
+def get_dropdown_options(df, col):
+    opts = [{'label': str(i), 'value': i} for i in sorted(df[col].unique())]
+    return opts
+
+
+def fill_filter_options(df):
+    """Dropdown options for every filter column"""
+    return tuple(get_dropdown_options(df, col) for col in FILTER_COLUMNS)
+
+
+def filter_data(df, cat, site, month, cause, severity, year, stat):
+    """Apply the sidebar selections to the dataset"""
+    dff = df.copy()
+    if cat:      dff = dff[dff['Category'].isin(cat)]
+    if site:     dff = dff[dff['Site'].isin(site)]
+    if month:    dff = dff[dff['Month'].isin(month)]
+    if cause:    dff = dff[dff['Cause'].isin(cause)]
+    if severity: dff = dff[dff['Severity'].isin(severity)]
+    if year:     dff = dff[dff['Year'].isin(year)]
+    if stat:     dff = dff[dff['Status'].isin(stat)]
+    return dff
+
+
+def period_labels(year, month):
+    """``2007-Jan`` style labels of the monthly trend axis"""
+    return year.astype(str) + '-' + month.astype(str)
+
+
+def apply_selection(dff, selection, exclude=None):
+    """Filter by the chart selections, except the one made on ``exclude``"""
+    for chart, labels in (selection or {}).items():
+        if chart == exclude or not labels:
+            continue
+        column = CROSSFILTER_CHARTS[chart][0]
+        values = period_labels(dff['Year'], dff['Month']) if column == 'Period' else dff[column]
+        dff = dff[values.isin(labels)]
+    return dff
+
+
+def chart_frame(dff, chart, aggregate=None):
+    """Sums of ``Count`` for one chart's grouping columns"""
+    if aggregate is None:
+        aggregate = lambda data, columns: data.groupby(columns, as_index=False, observed=True)['Count'].sum()
+    columns = CHART_GROUPS[chart]
+    if columns[0] != 'Period':
+        return aggregate(dff, columns)
+    frame = aggregate(dff, ['Year', 'Month'] + columns[1:])
+    frame['MonthNum'] = frame['Month'].apply(lambda m: months.index(m))
+    frame = frame.sort_values(['Year', 'MonthNum'])
+    frame.insert(0, 'Period', period_labels(frame['Year'], frame['Month']))
+    return frame.drop(columns=['Year', 'Month', 'MonthNum'])
+
+
+def collapse_frame(frame, top_k):
+    """Fold the groups outside the top K of each high-cardinality column into "Other" """
+    for col in ('Category', 'Cause', 'Site'):
+        k = topk.limit_for(top_k, col)
+        if col in frame and k is not None and frame[col].nunique() > k:
+            keys = [c for c in frame.columns if c != 'Count']
+            frame = topk.collapse_other(frame, col, k).groupby(keys, as_index=False, sort=False)['Count'].sum()
+    return frame
+
+
+def build_figures(frames, count, selection=None, intervals=None, anomalies=None, forecast=None, trend_axis=None):
+    """Build the six figures (plain dicts) from per-chart aggregated frames
+
+    ``frames`` maps each graph id to its ``CHART_GROUPS`` sums; frames with an
+    ``Error`` column and the per-bar ``intervals`` add confidence intervals,
+    ``anomalies`` (from ``anomaly_markers``) marks the trend lines and
+    ``forecast`` (from ``forecast_lines``) extends them. ``trend_axis`` fixes
+    the buckets of a zoomed trend chart (see ``trend_frame``).
+    """
+    selection = selection or {}
+    intervals = intervals or {}
+    figures = {
+        # Gráfico 1: Category
+        'bar-category': stacked_bar_figure(frames['bar-category'], 'bar-category', intervals.get('bar-category')),
+        # Gráfico 2: Cause
+        'bar-cause': stacked_bar_figure(frames['bar-cause'], 'bar-cause', intervals.get('bar-cause')),
+        # Gráfico 3: Linha temporal (Month)
+        'line-month': line_figure(frames['line-month'], anomalies, forecast, trend_axis),
+        # Gráfico 4: Barra empilhada horizontal (Site)
+        'bar-site': stacked_bar_figure(frames['bar-site'], 'bar-site', intervals.get('bar-site'), orientation='h'),
+        # Gráfico 5: Barra empilhada horizontal (Trend por mês)
+        'bar-trend': stacked_bar_figure(frames['bar-trend'], 'bar-trend', intervals.get('bar-trend'),
+                                        orientation='h'),
+        # Gráfico 6: Pizza (Severity)
+        'pie-severity': pie_figure(frames['pie-severity']),
+    }
+    for chart, fig in figures.items():
+        select_points(fig, chart, selection.get(chart))
+    return (*figures.values(), count)
+
+
+def severity_order(data):
+    """Severities of ``data`` in legend order (the known ones first), as plotly express orders them"""
+    present = list(dict.fromkeys(data['Severity']))
+    return tuple(sorted(present, key=lambda s: severities.index(s) if s in severities else len(severities)))
+
+
+def stacked_bar_figure(data, chart, totals=None, orientation='v'):
+    """Bars of ``chart`` stacked by Severity, filled into a ``px.bar`` template per set of severities
+
+    ``totals`` (with an ``Error`` column) adds the confidence interval of each bar.
+    """
+    x = CHART_GROUPS[chart][0]
+    order = severity_order(data)
+
+    def build():
+        import plotly.express as px
+
+        # Uma linha por severidade basta: os dados são substituídos a cada chamada
+        sample = data.drop_duplicates('Severity')
+        category_orders = {'Severity': severities, 'Month': months}
+        if orientation == 'v':
+            fig = px.bar(sample, x=x, y='Count', color='Severity', barmode='stack', category_orders=category_orders,
+                         color_discrete_sequence=px.colors.qualitative.Plotly)
+        else:
+            fig = px.bar(sample, y=x, x='Count', color='Severity', barmode='stack', category_orders=category_orders,
+                         orientation='h', color_discrete_sequence=px.colors.qualitative.Plotly)
+        fig.update_layout(title='', legend_title='', margin=FIGURE_MARGIN)
+        return fig
+
+    template = figure_templates.template(('stacked_bar', chart, order), build)
+    labels, counts = data[x].to_numpy(), data['Count'].to_numpy()
+    severity = data['Severity'].to_numpy()
+    traces = {}
+    for i, trace in enumerate(template['data']):
+        rows = severity == trace['name']
+        axes = ('x', 'y') if orientation == 'v' else ('y', 'x')
+        traces[i] = {axes[0]: labels[rows], axes[1]: counts[rows]}
+    fig = figure_templates.fill(template, traces)
+    if totals is not None:
+        # Intervalo de confiança do total de cada barra
+        axes = ('x', 'y') if orientation == 'v' else ('y', 'x')
+        fig['data'].append({
+            'type': 'scatter', axes[0]: totals[x].to_numpy(), axes[1]: totals['Count'].to_numpy(),
+            'mode': 'markers', 'name': 'IC 95%', 'marker': {'color': COLORS['text_primary'], 'size': 4},
+            f'error_{axes[1]}': {'type': 'data', 'array': totals['Error'].to_numpy()},
+        })
+    return fig
+
+
+def pie_figure(data):
+    """Severity pie, filled into a ``px.pie`` template per set of severities"""
+    import numpy as np
+
+    has_error = 'Error' in data
+
+    def build():
+        import plotly.express as px
+
+        fig = px.pie(data, names='Severity', values='Count', color='Severity',
+                     category_orders={'Severity': severities}, color_discrete_sequence=px.colors.qualitative.Plotly,
+                     custom_data=['Error'] if has_error else None)
+        if has_error:
+            fig.update_traces(hovertemplate='%{label}: %{value:,.0f} ± %{customdata[0]:,.0f}<extra></extra>')
+        fig.update_layout(title='', legend_title='', margin=FIGURE_MARGIN)
+        return fig
+
+    template = figure_templates.template(('pie', severity_order(data), has_error), build)
+    if not template['data']:
+        return figure_templates.fill(template)
+    # Fatias na ordem do modelo (ordem das severidades)
+    rows = data.set_index('Severity').loc[list(template['data'][0]['labels'])]
+    values = {'values': rows['Count'].to_numpy()}
+    if has_error:
+        values['customdata'] = np.column_stack([rows['Error'].to_numpy(dtype=object), rows.index.to_numpy()])
+    elif 'customdata' in template['data'][0]:
+        values['customdata'] = rows.index.to_numpy()[:, None]
+    return figure_templates.fill(template, {0: values})
+
+
+def line_figure(frame, anomalies=None, forecast=None, axis=None, margin=FIGURE_MARGIN):
+    """Trend chart: one line per Category over ``Period`` (months, or the buckets of a zoomed view)
+
+    ``axis`` lists the buckets of the x axis in order, so that axis positions
+    stay bucket positions even where there are no incidents.
+    """
+    import plotly.colors
+
+    data = []
+    categories = frame['Category'].unique()
+    for cat_name in categories:
+        sub = frame[frame['Category'] == cat_name]
+        trace = {'type': 'scatter', 'x': sub['Period'].to_numpy(), 'y': sub['Count'].to_numpy(),
+                 'mode': 'lines+markers', 'name': cat_name, 'legendgroup': cat_name}
+        if 'Error' in sub:
+            trace['error_y'] = {'type': 'data', 'array': sub['Error'].to_numpy(), 'thickness': 1}
+        data.append(trace)
+    if forecast is not None and len(forecast):
+        # Previsão tracejada na cor da linha de cada categoria, com intervalo de 95%
+        colorway = plotly.colors.qualitative.Plotly
+        for i, cat_name in enumerate(categories):
+            sub = forecast[forecast['Category'] == cat_name]
+            if sub.empty:
+                continue
+            data.append({
+                'type': 'scatter', 'x': sub['Period'].to_numpy(), 'y': sub['Forecast'].to_numpy(),
+                'mode': 'lines+markers', 'name': f'{cat_name} (previsão)', 'legendgroup': cat_name,
+                'showlegend': False, 'line': {'color': colorway[i % len(colorway)], 'dash': 'dash'},
+                'error_y': {'type': 'data', 'array': (sub['High'] - sub['Forecast']).to_numpy(),
+                            'arrayminus': (sub['Forecast'] - sub['Low']).to_numpy(), 'thickness': 1},
+                'customdata': sub[['Low', 'High']].to_numpy(),
+                'hovertemplate': '<b>%{x}</b><br>Previsão: %{y:,.0f}'
+                                 '<br>95%: %{customdata[0]:,.0f} - %{customdata[1]:,.0f}<extra></extra>',
+            })
+    if anomalies is not None and len(anomalies):
+        # Séries (Site, Category, Cause) anômalas, marcadas sobre a linha da sua categoria
+        points = anomalies.merge(frame[['Period', 'Category', 'Count']], on=['Period', 'Category'])
+        data.append({
+            'type': 'scatter', 'x': points['Period'].to_numpy(), 'y': points['Count'].to_numpy(),
+            'mode': 'markers', 'name': 'Anomalias', 'marker': {'color': COLORS['danger'], 'size': 11, 'symbol': 'x'},
+            'customdata': points['Anomalies'].to_numpy(), 'hovertext': points['Text'].to_numpy(),
+            'hovertemplate': '<b>%{x}</b><br>%{customdata} séries anômalas<br>%{hovertext}<extra></extra>',
+        })
+    xaxis = {'title': {'text': ''}}
+    if axis is not None:
+        xaxis.update(type='category', categoryorder='array', categoryarray=list(axis))
+    return figure_templates.figure(data, {'title': {'text': ''}, 'xaxis': xaxis, 'yaxis': {'title': {'text': 'Count'}},
+                                          'legend': {'title': {'text': ''}}, 'margin': dict(margin)})
+
+
+def select_points(fig, chart, labels):
+    """Make ``fig`` emit selections and dim its points outside ``labels``"""
+    # Clique ou seleção em caixa emitem selectedData
+    fig['layout'] = dict(fig['layout'], clickmode='event+select')
+    if labels:
+        highlight_selection(fig, CROSSFILTER_CHARTS[chart][1], set(labels))
+
+
+def highlight_selection(fig, key, labels):
+    """Dim the points of ``fig`` outside its own selection"""
+    data = []
+    for trace in fig['data']:
+        if key == 'label':
+            trace = dict(trace, pull=[0.08 if label in labels else 0 for label in trace['labels']])
+        else:
+            trace = dict(trace, selectedpoints=[i for i, label in enumerate(trace[key]) if label in labels])
+        data.append(trace)
+    fig['data'] = data
+
+
+def anomaly_markers(anomalies, cat, site, month, cause, year, selection=None):
+    """Flagged points matching the filters, summarized per trend point (Period, Category)
+
+    Each series spans every Severity and Status, so those filters do not apply.
+    """
+    if anomalies is None or anomalies.empty:
+        return None
+    flagged = anomalies
+    for column, labels in (('Category', cat), ('Site', site), ('Month', month), ('Cause', cause), ('Year', year)):
+        if labels:
+            flagged = flagged[flagged[column].isin(labels)]
+    for chart, labels in (selection or {}).items():
+        column = CROSSFILTER_CHARTS[chart][0]
+        if labels and chart != 'line-month' and column in flagged:
+            flagged = flagged[flagged[column].isin(labels)]
+    summary = analytics.summarize_by_period(flagged, by=['Category'])
+    summary['Period'] = period_labels(summary['Year'], summary['Month'])
+    return summary
+
+
+def forecast_lines(forecaster, cat, site, month, cause, severity, year, stat, selection=None):
+    """Forecast of every Category for the trend chart, summed over the matching (Site, Category) series
+
+    Cause, Severity and Status split the series, so there is no forecast
+    while they filter the data; nor when the years shown end before the
+    forecast starts.
+    """
+    if forecaster is None:
+        return None
+    selection = selection or {}
+    if cause or severity or stat or selection.get('bar-cause') or selection.get('pie-severity'):
+        return None
+    if year and max(year) < forecaster.last_period // len(months):
+        return None
+    where = {}
+    for column, labels, chart in (('Category', cat, 'bar-category'), ('Site', site, 'bar-site')):
+        chosen = selection.get(chart)
+        if labels and chosen:
+            labels = [label for label in labels if label in chosen]
+            if not labels:
+                return None
+        where[column] = labels or chosen
+    frame = forecaster.forecast_frame(by=['Category'], where=where)
+    for labels in (month, selection.get('bar-trend')):
+        if labels:
+            frame = frame[frame['Month'].isin(labels)]
+    frame['Period'] = period_labels(frame['Year'], frame['Month'])
+    return frame
+
+
+def update_all_graphs(df, cat, site, month, cause, severity, year, stat, top_k=None, selection=None,
+                      anomalies=None, forecast=None):
+    """Build the six figures and the filtered total for a filter selection"""
+    dff = filter_data(df, cat, site, month, cause, severity, year, stat)
+    total_count = int(apply_selection(dff, selection)['Count'].sum())
+    # Cada gráfico é filtrado pelas seleções dos outros gráficos, mas não pela sua
+    frames = {chart: collapse_frame(chart_frame(apply_selection(dff, selection, exclude=chart), chart), top_k)
+              for chart in CROSSFILTER_CHARTS}
+    markers = anomaly_markers(anomalies, cat, site, month, cause, year, selection)
+    return build_figures(frames, f"{total_count:,}", selection, anomalies=markers,
+                         forecast=forecast_lines(forecast, cat, site, month, cause, severity, year, stat, selection))
+
+
+def trend_group(grain):
+    """Crossfilter group of the trend chart at ``grain`` (the monthly one is the chart's own group)"""
+    return 'line-month' if grain == 'month' else f'line-month:{grain}'
+
+
+def _add_grain_group(engine, grain):
+    engine.add_column(f'Period:{grain}', engine.grains.codes(grain), engine.grains.labels(grain))
+    engine.add_group(trend_group(grain), [f'Period:{grain}', 'Category'], exclude='line-month')
+
+
+def _add_hierarchy_group(engine):
+    engine.hierarchy = hierarchy.HierarchyIndex(engine.df)
+    engine.add_keyed_group('hierarchy', engine.hierarchy.row_leaf, engine.hierarchy.n_leaves)
+
+
+def create_crossfilter(df, grains=None):
+    """Crossfilter engine over ``df``: one dimension per sidebar filter and per chart selection
+
+    The trend chart gets one group per time grain of ``grains`` (a
+    ``rollups.TimeGrains``), so a zoom reads the sums of any grain. The
+    groups of the other grains and of the drill-down view are built on their
+    first read, so a session that never zooms or drills does not pay for them.
+    """
+    engine = crossfilter.Crossfilter(df)
+    month = engine.column('Month', categories=months)
+    if grains is None:
+        grains = rollups.TimeGrains(df, months, month.codes)
+    engine.grains = grains
+    engine.add_column('Period', grains.codes('month'), grains.labels('month'))
+    for col in FILTER_COLUMNS:
+        engine.add_dimension(col)
+    for chart, (column, _) in CROSSFILTER_CHARTS.items():
+        engine.add_dimension(chart, column)
+    for chart in CROSSFILTER_CHARTS:
+        engine.add_group(chart, CHART_GROUPS[chart], exclude=chart)
+    for grain in grains.names:
+        if grain != 'month':
+            engine.add_lazy_group(trend_group(grain), lambda engine, grain=grain: _add_grain_group(engine, grain))
+    # Somas por folha da hierarquia, para a visão detalhada (engine.hierarchy existe após a primeira leitura)
+    engine.add_lazy_group('hierarchy', _add_hierarchy_group)
+    return engine
+
+
+def apply_filters(engine, cat, site, month, cause, severity, year, stat, selection=None):
+    """Set every engine dimension to the sidebar filters and chart selections (call with ``engine.lock`` held)"""
+    selection = selection or {}
+    for col, labels in zip(FILTER_COLUMNS, (cat, site, month, cause, severity, year, stat)):
+        engine.filter(col, labels)
+    for chart in CROSSFILTER_CHARTS:
+        engine.filter(chart, selection.get(chart))
+
+
+def trend_frame(engine, view):
+    """Trend sums of a zoomed ``view`` (from ``TimeGrains.view``) and its axis buckets (call with ``engine.lock`` held)
+
+    Only the roll-up group of the view's grain is read, never the rows.
+    """
+    labels = engine.grains.labels(view['grain'])[view['start']:view['stop']]
+    frame = engine.group_frame(trend_group(view['grain']))
+    frame = frame.rename(columns={f"Period:{view['grain']}": 'Period'})
+    return frame[frame['Period'].isin(labels)].reset_index(drop=True), labels
+
+
+def trend_overlays(engine, view, anomalies, forecast):
+    """Anomaly and forecast overlays that fit a zoomed ``view``
+
+    Both are monthly, so they are only drawn at the month grain; the forecast
+    only when the view reaches the last month.
+    """
+    if view is None:
+        return anomalies, forecast
+    if view['grain'] != 'month':
+        return None, None
+    if view['stop'] < len(engine.grains.labels('month')):
+        forecast = None
+    return anomalies, forecast
+
+
+def trend_selection(engine, view, labels):
+    """Buckets of a zoomed ``view`` covering the selected months ``labels``"""
+    if view is None or not labels or view['grain'] == 'month':
+        return labels
+    grains = engine.grains
+    chosen = set(labels)
+    return [bucket for bucket in grains.labels(view['grain'])[view['start']:view['stop']]
+            if chosen.intersection(grains.month_labels([bucket]))]
+
+
+def update_all_graphs_crossfilter(engine, cat, site, month, cause, severity, year, stat, top_k=None, selection=None,
+                                  anomalies=None, forecast=None, trend_view=None):
+    """Same figures as ``update_all_graphs``, from the incremental crossfilter engine
+
+    With a ``trend_view`` (the zoom of the trend chart) the trend is read from
+    the roll-up of the view's grain.
+    """
+    axis = None
+    with engine.lock:
+        apply_filters(engine, cat, site, month, cause, severity, year, stat, selection)
+        frames = {chart: engine.group_frame(chart) for chart in CROSSFILTER_CHARTS}
+        if trend_view is not None:
+            frames['line-month'], axis = trend_frame(engine, trend_view)
+        total_count = int(round(engine.total))
+    frames = {chart: collapse_frame(frame, top_k) for chart, frame in frames.items()}
+    markers = anomaly_markers(anomalies, cat, site, month, cause, year, selection)
+    markers, forecast = trend_overlays(engine, trend_view, markers, forecast)
+    if trend_view is not None:
+        selection = dict(selection or {})
+        selection['line-month'] = trend_selection(engine, trend_view, selection.get('line-month'))
+    return build_figures(frames, f"{total_count:,}", selection, anomalies=markers,
+                         forecast=forecast_lines(forecast, cat, site, month, cause, severity, year, stat, selection),
+                         trend_axis=axis)
+
+
+def zoom_view(grains, view, relayout):
+    """Trend view after a zoom or pan of the trend chart (``relayoutData``), or None when it did not move
+
+    The x range is in category positions of the current ``view`` (the
+    whole period by month when None); resetting the axes goes back to it.
+    """
+    if not relayout:
+        return None
+    if relayout.get('xaxis.autorange'):
+        return grains.view()
+    if 'xaxis.range[0]' in relayout and 'xaxis.range[1]' in relayout:
+        low, high = relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    elif isinstance(relayout.get('xaxis.range'), list):
+        low, high = relayout['xaxis.range']
+    else:
+        return None
+    return grains.view(grains.window(view or grains.view(), low, high))
+
+
+def update_trend_zoom(engine, view, cat, site, month, cause, severity, year, stat, top_k=None, selection=None,
+                      anomalies=None, forecast=None):
+    """Trend chart of a zoomed ``view`` under the current filters, from the roll-ups alone"""
+    with engine.lock:
+        apply_filters(engine, cat, site, month, cause, severity, year, stat, selection)
+        frame, axis = trend_frame(engine, view)
+    frame = collapse_frame(frame, top_k)
+    markers = anomaly_markers(anomalies, cat, site, month, cause, year, selection)
+    markers, forecast = trend_overlays(engine, view, markers, forecast)
+    fig = line_figure(frame, markers, forecast_lines(forecast, cat, site, month, cause, severity, year, stat,
+                                                     selection), axis, FIGURE_MARGIN)
+    select_points(fig, 'line-month', trend_selection(engine, view, (selection or {}).get('line-month')))
+    return fig
+
+
+def hierarchy_figure(nodes):
+    """Sunburst of a drill-down view (from ``HierarchyIndex.sunburst``)"""
+    trace = {
+        'type': 'sunburst', 'ids': nodes['ids'], 'labels': nodes['labels'], 'parents': nodes['parents'],
+        'values': nodes['values'], 'branchvalues': 'total',
+        # Caminho de cada nó, lido de volta no clickData
+        'customdata': nodes['paths'],
+        'hovertemplate': '<b>%{label}</b><br>Count: %{value:,.0f}<br>%{percentRoot:.1%} do nível<extra></extra>',
+    }
+    return figure_templates.figure([trace], {'margin': dict(t=4, b=4, l=4, r=4)})
+
+
+def update_hierarchy(engine, path, cat, site, month, cause, severity, year, stat, selection=None):
+    """Drill-down view rooted at ``path`` under the current filters, from the leaf sums alone"""
+    with engine.lock:
+        apply_filters(engine, cat, site, month, cause, severity, year, stat, selection)
+        sums = engine.group_sums('hierarchy')
+        index = engine.hierarchy
+    return hierarchy_figure(index.sunburst(sums, path or ()))
+
+
+def drill_path(path, event):
+    """Root of the drill-down view after a click (clickData), or None when it does not move
+
+    Clicking a node makes it the root and fetches the levels below it;
+    clicking the root goes back up one level.
+    """
+    points = (event or {}).get('points') or []
+    if not points or not isinstance(points[0].get('customdata'), list):
+        return None
+    clicked, path = points[0]['customdata'], list(path or [])
+    if clicked == path:
+        return path[:-1] if path else None
+    if clicked[-1:] == [topk.OTHER_LABEL] or len(clicked) >= len(hierarchy.LEVELS):
+        return None
+    return clicked
+
+
+def update_all_graphs_approx(sample, cat, site, month, cause, severity, year, stat, top_k=None, selection=None,
+                             anomalies=None, forecast=None):
+    """Estimate the six figures from a stratified sample, with 95% confidence intervals"""
+    dff = filter_data(sample.rows, cat, site, month, cause, severity, year, stat)
+    total, total_error = sample.estimate_total(apply_selection(dff, selection))
+    for col in ('Category', 'Cause', 'Site'):
+        dff = topk.collapse_other(dff, col, topk.limit_for(top_k, col))
+
+    frames, intervals = {}, {}
+    for chart in CROSSFILTER_CHARTS:
+        rows = apply_selection(dff, selection, exclude=chart)
+        frames[chart] = chart_frame(rows, chart, aggregate=sample.estimate)
+        if chart.startswith('bar-'):
+            intervals[chart] = sample.estimate(rows, CHART_GROUPS[chart][:1])
+
+    count = f"≈ {total:,.0f} ± {total_error:,.0f} (amostra {approximate.format_rate(sample.rate)})"
+    markers = anomaly_markers(anomalies, cat, site, month, cause, year, selection)
+    return build_figures(frames, count, selection, intervals, anomalies=markers,
+                         forecast=forecast_lines(forecast, cat, site, month, cause, severity, year, stat, selection))
+
+
+def update_detail_table(table, cat, site, month, cause, severity, year, stat, selection=None, page_current=0,
+                        page_size=detail_table.PAGE_SIZE, sort_by=None, filter_query=''):
+    """One page of the filtered records: ``(records, page_count, page_current, rows scanned)``
+
+    Past the last page (e.g. after a filter shrank the result) the last page is served instead.
+    """
+    engine = table.engine
+    with engine.lock:
+        apply_filters(engine, cat, site, month, cause, severity, year, stat, selection)
+        n_matching = table.count(filter_query)
+        page_count = max(1, -(-n_matching // page_size))
+        page_current = min(page_current or 0, page_count - 1)
+        records, _, scanned = table.page(page_current, page_size, sort_by, filter_query)
+    return records, page_count, page_current, scanned
+
+
+def export_query(cat, site, month, cause, severity, year, stat, selection=None):
+    """Query string for the /export endpoint: one pair per sidebar filter value and chart selection label"""
+    from urllib.parse import urlencode
+
+    params = [(col, label) for col, labels in zip(FILTER_COLUMNS, (cat, site, month, cause, severity, year, stat))
+              for label in labels or ()]
+    params += [(chart, label) for chart, labels in (selection or {}).items() for label in labels or ()]
+    return urlencode(params)
+
+
+def export_where(args):
+    """``(column, labels)`` conditions from the /export query arguments (a werkzeug MultiDict)"""
+    conditions = []
+    for name in args:
+        if name in FILTER_COLUMNS:
+            conditions.append((name, args.getlist(name)))
+        elif name in CROSSFILTER_CHARTS:
+            conditions.append((CROSSFILTER_CHARTS[name][0], args.getlist(name)))
+    return conditions
+
+
+def export_response(df, fmt, args):
+    """Streaming HTTP response with the filtered rows of ``df`` encoded as ``fmt``"""
+    from flask import Response, abort, stream_with_context
+
+    if fmt not in export.available_formats():
+        abort(404)
+    mimetype, extension = export.FORMATS[fmt]
+    try:
+        chunks = export.stream_export(df, fmt, export_where(args))
+    except ValueError as error:
+        # Antes do streaming: depois do status 200 o cliente só veria um arquivo truncado
+        abort(400, description=str(error))
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="incidents{extension}"'})
+
+
+def selected_labels(event, key):
+    """Labels picked by a clickData/selectedData event"""
+    if not event:
+        return []
+    return list(dict.fromkeys(point[key] for point in event.get('points', []) if key in point))
+
+
+def update_selection(selection, chart, prop, event, grains=None):
+    """New chart selections after a click or box/lasso select on ``chart``
+
+    Points of a zoomed trend chart are weeks, quarters...: with ``grains``
+    they are stored as the months they cover. The top-K "Other" bar is not a
+    label of the data, so it is never selected.
+    """
+    selection = dict(selection or {})
+    picked = selected_labels(event, CROSSFILTER_CHARTS[chart][1])
+    labels = [label for label in picked if label != topk.OTHER_LABEL]
+    if picked and not labels:
+        # Só a barra "Other": a seleção não muda
+        return selection
+    if chart == 'line-month' and grains is not None:
+        labels = grains.month_labels(labels)
+    # Clicar de novo na mesma barra limpa a seleção do gráfico
+    if not labels or (prop == 'clickData' and selection.get(chart) == labels):
+        selection.pop(chart, None)
+    else:
+        selection[chart] = labels
+    return selection
+
+
+def filter_key(*values):
+    """Identify a filter selection, so stale results can be told apart in the browser"""
+    return json.dumps(values, default=str)
+
+
+def encode_outputs(outputs):
+    """Compact payload for the figures store: encoded figures plus the filtered total"""
+    *figures, count = outputs
+    return {'figures': [figure_codec.encode_figure(fig) for fig in figures], 'count': count}
+
+
+def create_app(df=None, top_k=None, sample_rate=0, flag_anomalies=False, forecast_horizon=0, access_log=None,
+               warm=prefetch.WARM_STATES, prefetch_idle=True, compress_level=compression.DEFAULT_LEVEL,
+               compress_min_size=compression.MIN_SIZE):
+    """Create the Dash app, its /metrics endpoint and callbacks over ``df``
+
+    The exact figures are cached per filter state (see ``prefetch``): the
+    ``warm`` most frequent states of the ``access_log`` file are computed at
+    startup and, with ``prefetch_idle``, the states one dropdown change away
+    from the last request are computed while the server is idle.
+
+    Responses of at least ``compress_min_size`` bytes are compressed at
+    ``compress_level`` (0 = uncompressed, see ``compression``).
+    """
+    from dash import ClientsideFunction, Dash, Input, Output, State, callback_context
+    from dash.exceptions import PreventUpdate
+    import dash_bootstrap_components as dbc
+
+    if df is None:
+        df = generate_data()
+
+    # Amostras estratificadas por taxa, construídas sob demanda
+    samples = {}
+    samples_lock = threading.Lock()
+
+    def get_sample(rate):
+        with samples_lock:
+            if rate not in samples:
+                samples[rate] = approximate.StratifiedSample(df, rate)
+            return samples[rate]
+
+    if sample_rate:
+        get_sample(sample_rate)
+
+    # Motor de filtragem cruzada incremental (somas por grupo atualizadas por delta)
+    engine = create_crossfilter(df)
+    table = detail_table.DetailTable(engine, DETAIL_COLUMNS)
+    # Anomalias detectadas uma vez sobre todas as séries (Site, Category, Cause)
+    anomalies = analytics.find_anomalies(df) if flag_anomalies else None
+    # Previsão de todas as séries (Site, Category), ajustada uma vez
+    forecaster = forecasting.SeriesForecaster(horizon=forecast_horizon).fit(df) if forecast_horizon else None
+
+    def compute_figures(filters, selection, view):
+        return encode_outputs(update_all_graphs_crossfilter(
+            engine, *filters, top_k=top_k, selection=selection, anomalies=anomalies, forecast=forecaster,
+            trend_view=view))
+
+    # Cache das figuras exatas por estado dos filtros, aquecido com os estados mais pedidos
+    options = [[option['value'] for option in column_options] for column_options in fill_filter_options(df)]
+    prefetcher = prefetch.Prefetcher(compute_figures, options, prefetch.AccessLog(access_log), warm=warm,
+                                     max_adjacent=prefetch.MAX_ADJACENT if prefetch_idle else 0)
+    if warm or prefetch_idle:
+        prefetcher.start()
+
+    app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+    # Métricas de desempenho em /metrics (formato de exposição de texto Prometheus)
+    metrics.install(app.server)
+    # Respostas JSON e JS comprimidas (gzip/brotli), depois das métricas para que meçam os dois tamanhos
+    compression.install(app.server, level=compress_level, min_size=compress_min_size)
+    app.layout = create_layout()
+    if sample_rate:
+        app.layout['sampling-rate'].value = sample_rate
+
+    @app.callback(
+        [Output("filter-category", "options"),
+         Output("filter-site", "options"),
+         Output("filter-month", "options"),
+         Output("filter-cause", "options"),
+         Output("filter-severity", "options"),
+         Output("filter-year", "options"),
+         Output("filter-status", "options")],
+        Input("filter-category", "options")  # Fake input apenas para trigger inicial
+    )
+    @metrics.timed("fill_filter_options")
+    def _fill_filter_options(_):
+        return fill_filter_options(df)
+
+    filter_inputs = [Input('filter-category', 'value'),
+                     Input('filter-site', 'value'),
+                     Input('filter-month', 'value'),
+                     Input('filter-cause', 'value'),
+                     Input('filter-severity', 'value'),
+                     Input('filter-year', 'value'),
+                     Input('filter-status', 'value')]
+
+    # Seleção cruzada: clique ou seleção em caixa em qualquer gráfico
+    @app.callback(
+        Output('selection-store', 'data'),
+        [Input(chart, 'clickData') for chart in CROSSFILTER_CHARTS] +
+        [Input(chart, 'selectedData') for chart in CROSSFILTER_CHARTS] +
+        [Input('clear-selection', 'n_clicks')],
+        State('selection-store', 'data'),
+        prevent_initial_call=True
+    )
+    @metrics.timed("update_selection")
+    def _update_selection(*args):
+        selection = args[-1]
+        triggered = callback_context.triggered[0]
+        chart, prop = triggered['prop_id'].rsplit('.', 1)
+        if chart == 'clear-selection':
+            return {}
+        return update_selection(selection, chart, prop, triggered['value'], engine.grains)
+
+    # Resposta rápida a partir da amostra (apenas no modo aproximado)
+    @app.callback(
+        Output('approx-store', 'data'),
+        filter_inputs + [Input('selection-store', 'data'), Input('sampling-rate', 'value')]
+    )
+    @metrics.timed("update_all_graphs_approx")
+    def _update_all_graphs_approx(cat, site, month, cause, severity, year, stat, selection, rate):
+        payload = {'key': filter_key(cat, site, month, cause, severity, year, stat, selection)}
+        if rate:
+            sample = get_sample(rate)
+            metrics.record_rows_scanned("update_all_graphs_approx", len(sample))
+            payload.update(encode_outputs(update_all_graphs_approx(
+                sample, cat, site, month, cause, severity, year, stat, top_k=top_k, selection=selection,
+                anomalies=anomalies, forecast=forecaster)))
+        return payload
+
+    # Callback para filtrar o DataFrame conforme os filtros; roda depois da resposta aproximada
+    @app.callback(
+        Output('figures-store', 'data'),
+        Input('approx-store', 'data'),
+        [State(item.component_id, item.component_property) for item in filter_inputs] +
+        [State('selection-store', 'data'), State('trend-zoom', 'data')]
+    )
+    @metrics.timed("update_all_graphs")
+    def _update_all_graphs(approx, cat, site, month, cause, severity, year, stat, selection, view):
+        # Linhas visitadas pelas mudanças de filtro do motor (nenhuma quando a resposta vem do cache)
+        with engine.count_scans() as scans:
+            payload, _ = prefetcher.lookup((cat, site, month, cause, severity, year, stat), selection, view)
+        metrics.record_rows_scanned("update_all_graphs", scans.rows)
+        return dict(payload, key=filter_key(cat, site, month, cause, severity, year, stat, selection))
+
+    # Zoom do gráfico de tendência: responde do roll-up mais grosso com pontos suficientes, sem reler as linhas
+    @app.callback(
+        [Output('trend-zoom', 'data'),
+         Output('line-month', 'figure', allow_duplicate=True)],
+        Input('line-month', 'relayoutData'),
+        [State('trend-zoom', 'data')] +
+        [State(item.component_id, item.component_property) for item in filter_inputs] +
+        [State('selection-store', 'data')],
+        prevent_initial_call=True
+    )
+    @metrics.timed("zoom_trend")
+    def _zoom_trend(relayout, view, cat, site, month, cause, severity, year, stat, selection):
+        new_view = zoom_view(engine.grains, view, relayout)
+        if new_view is None:
+            raise PreventUpdate
+        with engine.count_scans() as scans:
+            figure = update_trend_zoom(engine, new_view, cat, site, month, cause, severity, year, stat, top_k=top_k,
+                                       selection=selection, anomalies=anomalies, forecast=forecaster)
+        metrics.record_rows_scanned("zoom_trend", scans.rows)
+        return new_view, figure
+
+    # Hierarquia: só a raiz e dois níveis abaixo saem do servidor; os seguintes vêm a cada clique
+    @app.callback(
+        Output('drill-path', 'data'),
+        Input('hierarchy', 'clickData'),
+        State('drill-path', 'data'),
+        prevent_initial_call=True
+    )
+    @metrics.timed("drill_hierarchy")
+    def _drill_hierarchy(event, path):
+        new_path = drill_path(path, event)
+        if new_path is None:
+            raise PreventUpdate
+        return new_path
+
+    @app.callback(
+        Output('hierarchy', 'figure'),
+        filter_inputs + [Input('selection-store', 'data'), Input('drill-path', 'data')]
+    )
+    @metrics.timed("update_hierarchy")
+    def _update_hierarchy(cat, site, month, cause, severity, year, stat, selection, path):
+        with engine.count_scans() as scans:
+            figure = update_hierarchy(engine, path, cat, site, month, cause, severity, year, stat, selection)
+        metrics.record_rows_scanned("update_hierarchy", scans.rows)
+        return figure
+
+    # Tabela de registros: só a página visível sai do servidor
+    @app.callback(
+        [Output('detail-table', 'data'),
+         Output('detail-table', 'page_count'),
+         Output('detail-table', 'page_current')],
+        filter_inputs + [Input('selection-store', 'data'),
+                         Input('detail-table', 'page_current'),
+                         Input('detail-table', 'page_size'),
+                         Input('detail-table', 'sort_by'),
+                         Input('detail-table', 'filter_query')]
+    )
+    @metrics.timed("update_detail_table")
+    def _update_detail_table(cat, site, month, cause, severity, year, stat, selection, page_current, page_size,
+                             sort_by, filter_query):
+        with engine.count_scans() as scans:
+            records, page_count, page_current, scanned = update_detail_table(
+                table, cat, site, month, cause, severity, year, stat, selection, page_current, page_size, sort_by,
+                filter_query)
+        metrics.record_rows_scanned("update_detail_table", scanned + scans.rows)
+        return records, page_count, page_current
+
+    # Exportação em streaming: /export/<csv|parquet|jsonl>?Site=Weston&bar-category=Spill
+    @app.server.route('/export/<fmt>')
+    def _export(fmt):
+        from flask import request
+
+        return export_response(df, fmt, request.args)
+
+    # Links de exportação seguem os filtros e as seleções atuais
+    @app.callback(
+        [Output(f'export-{fmt}', 'href') for fmt in export.available_formats()],
+        filter_inputs + [Input('selection-store', 'data')]
+    )
+    def _update_export_links(cat, site, month, cause, severity, year, stat, selection):
+        query = export_query(cat, site, month, cause, severity, year, stat, selection)
+        return [app.get_relative_path(f'/export/{fmt}') + (f'?{query}' if query else '')
+                for fmt in export.available_formats()]
+
+    # Decodificar as figuras no navegador e preencher os gráficos
+    app.clientside_callback(
+        ClientsideFunction(namespace='figure_codec', function_name='decode_outputs'),
+        [Output('bar-category', 'figure'),
+         Output('bar-cause', 'figure'),
+         Output('line-month', 'figure'),
+         Output('bar-site', 'figure'),
+         Output('bar-trend', 'figure'),
+         Output('pie-severity', 'figure'),
+         Output('filtered-count', 'children')],
+        [Input('figures-store', 'data'),
+         Input('approx-store', 'data')]
+    )
+
+    app.df = df
+    app.anomalies = anomalies
+    app.forecaster = forecaster
+    app.prefetcher = prefetcher
+    return app
+
+
+def create_server():
+    """WSGI entry point, e.g. ``gunicorn 'dash_app:create_server()'``"""
+    return create_app().server
+
+
+# Criar dashboard simplificado
+def create_simple_dashboard(df):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    # Dados
+    dff = df.copy()
+    
+    # Criar figura com 2x3 subplots
+    fig = make_subplots(
+        rows=2, cols=3,
+        subplot_titles=(
+            'Incidentes por Categoria', 'Incidentes por Causa', 'Tendencia Mensal',
+            'Incidentes por Local', 'Distribuicao Mensal', 'Severidade'
+        ),
+        specs=[
+            [{"type": "bar"}, {"type": "bar"}, {"type": "scatter"}],
+            [{"type": "bar"}, {"type": "bar"}, {"type": "pie"}]
+        ],
+        vertical_spacing=0.15
+    )
+    
+    # 1. Categoria
+    cat_data = dff.groupby('Category')['Count'].sum().reset_index().sort_values('Count', ascending=False)
+    fig.add_trace(go.Bar(x=cat_data['Category'], y=cat_data['Count'], name='Cat', showlegend=False), row=1, col=1)
+    
+    # 2. Causa
+    cause_data = dff.groupby('Cause')['Count'].sum().reset_index().sort_values('Count', ascending=False)
+    fig.add_trace(go.Bar(x=cause_data['Cause'], y=cause_data['Count'], name='Causa', showlegend=False), row=1, col=2)
+    
+    # 3. Linha temporal
+    line_data = dff.groupby(['Year', 'Month'])['Count'].sum().reset_index()
+    line_data['MonthNum'] = line_data['Month'].apply(lambda m: months.index(m))
+    line_data = line_data.sort_values(['Year', 'MonthNum'])
+    line_data['Date'] = line_data['Year'].astype(str) + '-' + line_data['Month']
+    fig.add_trace(go.Scatter(x=line_data['Date'], y=line_data['Count'], mode='lines+markers', name='Tend', showlegend=False), row=1, col=3)
+    
+    # 4. Local
+    site_data = dff.groupby('Site')['Count'].sum().reset_index().sort_values('Count', ascending=True)
+    fig.add_trace(go.Bar(y=site_data['Site'], x=site_data['Count'], orientation='h', name='Site', showlegend=False), row=2, col=1)
+    
+    # 5. Mes
+    month_data = dff.groupby('Month')['Count'].sum().reset_index()
+    month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    month_data['MonthOrder'] = month_data['Month'].apply(lambda x: month_order.index(x))
+    month_data = month_data.sort_values('MonthOrder')
+    fig.add_trace(go.Bar(x=month_data['Month'], y=month_data['Count'], name='Mes', showlegend=False), row=2, col=2)
+    
+    # 6. Pizza
+    sev_data = dff.groupby('Severity')['Count'].sum().reset_index()
+    fig.add_trace(go.Pie(labels=sev_data['Severity'], values=sev_data['Count'], name='Sev', showlegend=False), row=2, col=3)
+    
+    fig.update_layout(
+        title='Dashboard de Analise de Incidentes',
+        height=800,
+        font=dict(size=12)
+    )
+    
+    return fig
+
+
+def export_simple_dashboard(df):
+    """Exportar o dashboard simplificado para um arquivo HTML"""
+    # Gerar dashboard
+    print("Criando dashboard HTML...")
+    dashboard_fig = create_simple_dashboard(df)
+
+    # Estatisticas
+    total_records = outofcore.record_count(df)
+    total_incidents = df['Count'].sum()
+    period = f"{df['Year'].min()} - {df['Year'].max()}"
+    sites_count = df['Site'].nunique()
+
+    # Nome do arquivo
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"dashboard_{timestamp}.html"
+
+    # HTML simples
+    html_content = f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Dashboard de Incidentes</title>
+    <meta charset="utf-8">
+    <style>
+        body {{ font-family: Arial; margin: 20px; background: #f5f5f5; }}
+        .header {{ text-align: center; background: #2c3e50; color: white; padding: 20px; margin-bottom: 20px; }}
+        .stats {{ display: flex; justify-content: space-around; margin: 20px 0; }}
+        .stat {{ background: white; padding: 15px; border-radius: 5px; text-align: center; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }}
+        .number {{ font-size: 24px; font-weight: bold; color: #2c3e50; }}
+        .label {{ color: #7f8c8d; font-size: 12px; }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>Dashboard de Analise de Incidentes</h1>
+        <p>Relatorio gerado em {datetime.now().strftime('%d/%m/%Y as %H:%M:%S')}</p>
+    </div>
+    
+    <div class="stats">
+        <div class="stat">
+            <div class="number">{total_records:,}</div>
+            <div class="label">Total de Registros</div>
+        </div>
+        <div class="stat">
+            <div class="number">{total_incidents:,}</div>
+            <div class="label">Total de Incidentes</div>
+        </div>
+        <div class="stat">
+            <div class="number">{sites_count}</div>
+            <div class="label">Locais</div>
+        </div>
+        <div class="stat">
+            <div class="number">{period}</div>
+            <div class="label">Periodo</div>
+        </div>
+    </div>
+    
+    {figure_codec.figure_div(dashboard_fig, include_plotlyjs=True)}
+    
+    <div style="text-align: center; margin-top: 20px; color: #666;">
+        <p>Dashboard gerado automaticamente</p>
+    </div>
+</body>
+</html>
+    """
+
+    # Salvar arquivo
+    try:
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+    
+        if os.path.exists(filename):
+            file_size = os.path.getsize(filename) / 1024
+            print(f"SUCESSO! Dashboard exportado:")
+            print(f"Arquivo: {filename}")
+            print(f"Tamanho: {file_size:.1f} KB")
+            print(f"Local: {os.getcwd()}")
+        
+            # Tentar abrir
+            try:
+                os.startfile(filename)
+                print("Arquivo aberto no navegador!")
+            except:
+                print("Abra manualmente o arquivo HTML")
+        else:
+            print("Erro: arquivo nao foi criado")
+        
+    except Exception as e:
+        print(f"Erro: {e}")
+
+    print("Dashboard HTML criado com sucesso!")
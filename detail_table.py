@@ -0,0 +1,166 @@
+"""
+Server-side paging, sorting and column filtering of the filtered records
+
+A ``DetailTable`` serves one page of the rows that pass every crossfilter
+filter without building the filtered frame. Each sortable column already has
+a sorted row index in the crossfilter engine (``_Column.order``), so a page
+is found by walking that index in growing chunks, keeping the rows that
+pass, and taking only the page rows from the frame. The work depends on the
+page position and the filter selectivity, not on the dataset size.
+
+Column filters use the DataTable ``filter_query`` syntax (``{Site} contains
+Wes && {Count} > 5``), including the case-sensitive (``s=``, ``scontains``)
+and case-insensitive (``ieq``, ``icontains``) operators and
+``datestartswith`` the native filter row sends. They are evaluated once per
+distinct label, then looked up by the rows' integer codes.
+"""
+
+import re
+
+PAGE_SIZE = 25
+# Smallest number of sorted rows examined per scan step
+MIN_CHUNK = 4096
+
+# DataTable filter operators: symbol -> name. Every operator also comes with an
+# "s" (case-sensitive) or "i" (case-insensitive) prefix, e.g. "s=", "ieq", "icontains"
+SYMBOLS = {'>=': 'ge', '<=': 'le', '!=': 'ne', '<': 'lt', '>': 'gt', '=': 'eq'}
+NAMES = ('eq', 'ne', 'lt', 'le', 'gt', 'ge', 'contains', 'datestartswith')
+
+# Symbols longest first so ">=" is not read as ">"; named operators need spaces around them
+_CLAUSE = re.compile(
+    r'^\s*(?P<name>\{[^}]*\}|[^\s{}]+)\s*(?:'
+    r'(?P<case>[si]?)(?P<symbol>>=|<=|!=|<|>|=)\s*'
+    r'|\s(?P<word_case>[si]?)(?P<word>' + '|'.join(NAMES) + r')(?:\s+|$))'
+    r'(?P<value>.*?)\s*$', re.DOTALL)
+
+
+def split_filter_part(part):
+    """``(column, operator, value)`` of one ``{column} operator value`` clause
+
+    ``operator`` is one of ``NAMES``, prefixed with ``i`` when the clause is
+    case-insensitive (no prefix and ``s`` are case-sensitive, the DataTable
+    default).
+    """
+    match = _CLAUSE.match(part)
+    if match is None:
+        return None
+    name = match.group('name')
+    if name.startswith('{') and name.endswith('}'):
+        name = name[1:-1]
+    if match.group('symbol'):
+        operator, case = SYMBOLS[match.group('symbol')], match.group('case')
+    else:
+        operator, case = match.group('word'), match.group('word_case')
+    value = match.group('value')
+    if value[:1] == value[-1:] and value[:1] in ('"', "'", '`') and len(value) > 1:
+        value = value[1:-1]
+    return name.strip(), ('i' if case == 'i' else '') + operator, value
+
+
+def parse_filter_query(query):
+    """Clauses of a DataTable ``filter_query``, ignoring ones that do not parse"""
+    if not query:
+        return []
+    parts = (split_filter_part(part) for part in query.split(' && '))
+    return [part for part in parts if part is not None]
+
+
+def _label_mask(labels, operator, value):
+    import pandas as pd
+
+    labels = pd.Series(labels)
+    insensitive = operator.startswith('i')
+    operator = operator[1:] if insensitive else operator
+    if operator in ('contains', 'datestartswith'):
+        text = labels.astype(str)
+        if insensitive:
+            text, value = text.str.lower(), value.lower()
+        if operator == 'datestartswith':
+            return text.str.startswith(value).to_numpy()
+        return text.str.contains(value, regex=False).to_numpy()
+    if labels.dtype.kind in 'iuf':
+        try:
+            value = float(value)
+        except ValueError:
+            return (labels != labels).to_numpy()
+    else:
+        labels = labels.astype(str)
+        if insensitive:
+            labels, value = labels.str.lower(), value.lower()
+    compare = {'eq': labels.eq, 'ne': labels.ne, 'lt': labels.lt, 'le': labels.le, 'gt': labels.gt, 'ge': labels.ge}
+    return compare[operator](value).to_numpy()
+
+
+class DetailTable:
+    """Pages of the rows of a ``Crossfilter`` that pass its current filters"""
+
+    def __init__(self, engine, columns=None):
+        self.engine = engine
+        self.columns = list(columns or engine.df.columns)
+        # (engine version, filter query) -> number of matching rows
+        self._counts = {}
+
+    def _masks(self, filter_query):
+        """Per-label match masks of the ``filter_query`` clauses, with the row codes to look them up"""
+        masks = []
+        for column, operator, value in parse_filter_query(filter_query):
+            if column in self.columns:
+                col = self.engine.column(column)
+                masks.append((col.codes, _label_mask(col.labels, operator, value)))
+        return masks
+
+    def _matches(self, rows, masks):
+        keep = self.engine.passes(rows)
+        for codes, mask in masks:
+            keep &= mask[codes[rows]]
+        return keep
+
+    def count(self, filter_query=''):
+        """Rows passing the engine filters and ``filter_query``"""
+        import numpy as np
+
+        masks = self._masks(filter_query)
+        if not masks:
+            return self.engine.count
+        key = (self.engine.version, filter_query)
+        if key not in self._counts:
+            if len(self._counts) > 64:
+                self._counts.clear()
+            self._counts[key] = int(np.count_nonzero(self._matches(np.arange(self.engine.n_rows), masks)))
+        return self._counts[key]
+
+    def page(self, page_current=0, page_size=PAGE_SIZE, sort_by=None, filter_query=''):
+        """``(records, matching rows, rows scanned)`` for one page
+
+        ``sort_by`` is the DataTable ``sort_by`` list; only its first entry is
+        used. Must be called with the engine filters already applied (and
+        its lock held when the engine is shared).
+        """
+        import numpy as np
+
+        masks = self._masks(filter_query)
+        n_matching = self.count(filter_query)
+        n_rows = self.engine.n_rows
+        order = None
+        if sort_by and sort_by[0].get('column_id') in self.columns:
+            order = self.engine.column(sort_by[0]['column_id']).order
+            if sort_by[0].get('direction') == 'desc':
+                order = order[::-1]
+
+        start_row = page_current * page_size
+        need = min(start_row + page_size, n_matching)
+        found, total, start = [], 0, 0
+        # Expected scan length from the selectivity, doubled each time it falls short
+        chunk = max(MIN_CHUNK, int(need * n_rows / max(n_matching, 1) * 1.1))
+        while total < need and start < n_rows:
+            stop = min(start + chunk, n_rows)
+            rows = order[start:stop] if order is not None else np.arange(start, stop)
+            rows = rows[self._matches(rows, masks)]
+            found.append(rows)
+            total += len(rows)
+            start = stop
+            chunk *= 2
+
+        rows = np.concatenate(found)[start_row:need] if found else np.array([], dtype=np.int64)
+        records = self.engine.df.take(rows)[self.columns].to_dict('records')
+        return records, n_matching, start
@@ -3,54 +3,158 @@
 Enhanced Dashboard Generator with Interactive Filters
 """
 
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import plotly.offline as pyo
 from datetime import datetime
+import argparse
 import os
 
-def generate_data():
-    """Generate synthetic incident data"""
+# pandas, numpy and plotly are imported inside the functions that need them,
+# so importing this module (or running it with --help) stays fast
+import instrumentation
+import outofcore
+import partitioned
+import snapshot
+import synthetic
+import topk
+import watch
+from instrumentation import span
+
+categories = ['Security', 'Equipment', 'Customer', 'Transport', 'Complaint', 'Spill', 'Injury', 'Divergence']
+causes = ['Procedure', 'Design', 'Training', 'External', 'Management', 'Equipment', 'Personnel', 'Material']
+sites = ['Weston', 'Shirley', 'Lincoln', 'Hudson', 'Concord', 'Bolton', 'Maynard', 'Acton']
+months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+years = [2007, 2008, 2009]
+severities = ['Critical', 'Major', 'Medium', 'Near Miss']
+
+def _generate_shard(rng, year, site, scale=1):
+    """Codes of one Year x Site shard: every (month, category) pair ``scale`` times, with two distinct causes each"""
+    import numpy as np
+
+    pairs = len(months) * len(categories) * scale
+    month = np.repeat(np.repeat(np.arange(len(months), dtype=np.int8), len(categories) * scale), 2)
+    category = np.repeat(np.tile(np.repeat(np.arange(len(categories), dtype=np.int8), scale), len(months)), 2)
+    cause = synthetic.choose_distinct(rng, pairs, len(causes), 2).ravel().astype(np.int8)
+    severity = rng.choice(len(severities), size=len(cause), p=[0.05, 0.15, 0.35, 0.45]).astype(np.int8)
+    return {
+        'Category': category,
+        'Cause': cause,
+        'Site': np.full(len(cause), sites.index(site), dtype=np.int8),
+        'Month': month,
+        'Year': np.full(len(cause), year, dtype=np.int64),
+        'Severity': severity,
+        'Count': rng.poisson(lam=6, size=len(cause)).astype(np.int64) + 1,
+    }
+
+@span('generate_data')
+def generate_data(seed=synthetic.DEFAULT_SEED, workers=1, scale=1):
+    """Generate synthetic incident data, one shard per Year x Site (independent of ``workers``)"""
     print("🔄 Generating synthetic incident data...")
-    
-    categories = ['Security', 'Equipment', 'Customer', 'Transport', 'Complaint', 'Spill', 'Injury', 'Divergence']
-    causes = ['Procedure', 'Design', 'Training', 'External', 'Management', 'Equipment', 'Personnel', 'Material']
-    sites = ['Weston', 'Shirley', 'Lincoln', 'Hudson', 'Concord', 'Bolton', 'Maynard', 'Acton']
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    years = [2007, 2008, 2009]
-    severities = ['Critical', 'Major', 'Medium', 'Near Miss']
-    
-    np.random.seed(42)
-    records = []
-    
-    for year in years:
-        for month in months:
-            for site in sites:
-                for category in categories:
-                    for cause in np.random.choice(causes, size=2, replace=False):
-                        severity = np.random.choice(severities, p=[0.05, 0.15, 0.35, 0.45])
-                        count = np.random.poisson(lam=6) + 1
-                        records.append({
-                            'Category': category,
-                            'Cause': cause,
-                            'Site': site,
-                            'Month': month,
-                            'Year': year,
-                            'Severity': severity,
-                            'Count': count
-                        })
-    
-    df = pd.DataFrame(records)
+
+    shards = [(year, site, scale) for year in years for site in sites]
+    columns = synthetic.generate_shards(_generate_shard, shards, seed=seed, workers=workers)
+    df = synthetic.decode(columns, {'Category': categories, 'Cause': causes, 'Site': sites, 'Month': months,
+                                    'Severity': severities})
     print(f"✅ Generated {len(df)} records with {df['Count'].sum()} total incidents")
     return df
 
-def create_enhanced_dashboard(df):
-    """Create enhanced dashboard with modern styling"""
+@span('create_enhanced_dashboard')
+def create_enhanced_dashboard(df, top_k=None, anomalies=None, forecast=None, workers=1):
+    """Create enhanced dashboard with modern styling, keeping the ``top_k`` largest groups per chart
+
+    With ``workers`` > 1 the rows are first summed in that many processes.
+    The figure is a plain dict: the styled subplot grid is built through
+    plotly once (see ``figure_templates``) and only its data arrays change.
+    """
+    import analytics
+    import figure_templates
+
     print("🔄 Creating enhanced dashboard visualizations...")
-    
+
+    # Partial sums per row range in a process pool; the charts then group the much smaller sums
+    if workers and workers > 1:
+        with span('partitioned.aggregate'):
+            df = partitioned.aggregate_frame(df, workers=workers)
+
+    # 1. Category chart
+    with span('category.aggregate'):
+        cat_data = topk.top_k(df, 'Category', topk.limit_for(top_k, 'Category'))
+
+    # 2. Cause chart
+    with span('cause.aggregate'):
+        cause_data = topk.top_k(df, 'Cause', topk.limit_for(top_k, 'Cause'))
+
+    # 3. Time series
+    with span('trend.aggregate'):
+        line_data = df.groupby(['Year', 'Month'])['Count'].sum().reset_index()
+        line_data['MonthOrder'] = line_data['Month'].apply(lambda x: months.index(x))
+        line_data = line_data.sort_values(['Year', 'MonthOrder'])
+        line_data['Date'] = line_data['Year'].astype(str) + '-' + line_data['Month']
+
+    # Flagged (Site, Category, Cause) series on top of the trend line
+    flagged = None
+    if anomalies is not None and len(anomalies):
+        with span('anomalies.overlay'):
+            flagged = analytics.summarize_by_period(anomalies).merge(
+                line_data[['Year', 'Month', 'Date', 'Count']], on=['Year', 'Month'])
+
+    # Forecast of the total (summed over every Site x Category series) with its 95% interval
+    if forecast is not None and not len(forecast):
+        forecast = None
+    dates = None
+    if forecast is not None:
+        dates = forecast['Year'].astype(str) + '-' + forecast['Month']
+
+    # 4. Site chart (horizontal bar)
+    with span('site.aggregate'):
+        site_data = topk.top_k(df, 'Site', topk.limit_for(top_k, 'Site')).iloc[::-1]
+
+    # 5. Monthly distribution
+    with span('month.aggregate'):
+        month_data = df.groupby('Month')['Count'].sum().reset_index()
+        month_data['MonthOrder'] = month_data['Month'].apply(lambda x: months.index(x))
+        month_data = month_data.sort_values('MonthOrder')
+
+    # 6. Severity pie chart
+    with span('severity.aggregate'):
+        sev_data = df.groupby('Severity')['Count'].sum().reset_index()
+
+    # Data arrays of every trace, in the order the template adds them
+    traces = [
+        {'x': cat_data['Category'], 'y': cat_data['Count'], 'text': cat_data['Count'],
+         'marker.color': cat_data['Count']},
+        {'x': cause_data['Cause'], 'y': cause_data['Count'], 'text': cause_data['Count'],
+         'marker.color': cause_data['Count']},
+        {'x': line_data['Date'], 'y': line_data['Count']},
+    ]
+    if flagged is not None:
+        traces.append({'x': flagged['Date'], 'y': flagged['Count'], 'customdata': flagged['Anomalies'],
+                       'hovertext': flagged['Text']})
+    if forecast is not None:
+        traces.append({'x': list(dates) + list(dates[::-1]),
+                       'y': list(forecast['High']) + list(forecast['Low'][::-1])})
+        traces.append({'x': [line_data['Date'].iloc[-1]] + list(dates),
+                       'y': [line_data['Count'].iloc[-1]] + list(forecast['Forecast']),
+                       'customdata': [[None, None]] + forecast[['Low', 'High']].to_numpy().tolist()})
+    traces.append({'y': site_data['Site'], 'x': site_data['Count'], 'text': site_data['Count'],
+                   'marker.color': site_data['Count']})
+    traces.append({'x': month_data['Month'], 'y': month_data['Count'], 'text': month_data['Count']})
+    traces.append({'labels': sev_data['Severity'], 'values': sev_data['Count']})
+    traces = [{path: value.to_numpy() if hasattr(value, 'to_numpy') else value for path, value in trace.items()}
+              for trace in traces]
+
+    template = figure_templates.template(('enhanced_dashboard', flagged is not None, forecast is not None),
+                                         lambda: _enhanced_figure(traces, flagged is not None, forecast is not None))
+    with span('figure.fill'):
+        return figure_templates.fill(template, dict(enumerate(traces)))
+
+
+def _enhanced_figure(traces, anomalies=False, forecast=False):
+    """Styled subplot grid of the enhanced dashboard, with the data arrays of ``traces``
+
+    ``anomalies`` and ``forecast`` add the overlays of the trend chart.
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     # Modern color palette
     colors = {
         'primary': '#667eea',
@@ -62,71 +166,69 @@ def create_enhanced_dashboard(df):
         'info': '#74b9ff',
         'dark': '#2d3436'
     }
+    traces = iter(traces)
+
+    def data():
+        """Arrays of the next trace, as keyword arguments and ``marker`` properties"""
+        values = dict(next(traces))
+        marker = {path.split('.', 1)[1]: values.pop(path) for path in list(values) if path.startswith('marker.')}
+        return values, marker
     
     # Create subplots with updated layout
-    fig = make_subplots(
-        rows=2, cols=3,
-        subplot_titles=(
-            '📊 Incidents by Category', 
-            '🔍 Incidents by Cause', 
-            '📈 Monthly Trend',
-            '🏢 Incidents by Site', 
-            '📅 Monthly Distribution', 
-            '⚠️ Severity Distribution'
-        ),
-        specs=[
-            [{"type": "bar"}, {"type": "bar"}, {"type": "scatter"}],
-            [{"type": "bar"}, {"type": "bar"}, {"type": "pie"}]
-        ],
-        vertical_spacing=0.12,
-        horizontal_spacing=0.08
-    )
+    with span('figure.subplots'):
+        fig = make_subplots(
+            rows=2, cols=3,
+            subplot_titles=(
+                '📊 Incidents by Category', 
+                '🔍 Incidents by Cause', 
+                '📈 Monthly Trend',
+                '🏢 Incidents by Site', 
+                '📅 Monthly Distribution', 
+                '⚠️ Severity Distribution'
+            ),
+            specs=[
+                [{"type": "bar"}, {"type": "bar"}, {"type": "scatter"}],
+                [{"type": "bar"}, {"type": "bar"}, {"type": "pie"}]
+            ],
+            vertical_spacing=0.12,
+            horizontal_spacing=0.08
+        )
     
     # 1. Category chart with gradient colors
-    cat_data = df.groupby('Category')['Count'].sum().reset_index().sort_values('Count', ascending=False)
+    values, marker = data()
     fig.add_trace(go.Bar(
-        x=cat_data['Category'], 
-        y=cat_data['Count'], 
+        **values,
         name='Category',
         showlegend=False,
         marker=dict(
-            color=cat_data['Count'],
+            **marker,
             colorscale='Viridis',
             colorbar=dict(title="Count"),
             line=dict(color='white', width=1)
         ),
-        text=cat_data['Count'],
         textposition='outside',
         hovertemplate='<b>%{x}</b><br>Count: %{y}<extra></extra>'
     ), row=1, col=1)
     
     # 2. Cause chart with custom colors
-    cause_data = df.groupby('Cause')['Count'].sum().reset_index().sort_values('Count', ascending=False)
+    values, marker = data()
     fig.add_trace(go.Bar(
-        x=cause_data['Cause'], 
-        y=cause_data['Count'], 
+        **values,
         name='Cause',
         showlegend=False,
         marker=dict(
-            color=cause_data['Count'],
+            **marker,
             colorscale='Plasma',
             line=dict(color='white', width=1)
         ),
-        text=cause_data['Count'],
         textposition='outside',
         hovertemplate='<b>%{x}</b><br>Count: %{y}<extra></extra>'
     ), row=1, col=2)
     
     # 3. Enhanced time series
-    line_data = df.groupby(['Year', 'Month'])['Count'].sum().reset_index()
-    month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    line_data['MonthOrder'] = line_data['Month'].apply(lambda x: month_order.index(x))
-    line_data = line_data.sort_values(['Year', 'MonthOrder'])
-    line_data['Date'] = line_data['Year'].astype(str) + '-' + line_data['Month']
-    
+    values, _ = data()
     fig.add_trace(go.Scatter(
-        x=line_data['Date'], 
-        y=line_data['Count'], 
+        **values,
         mode='lines+markers+text', 
         name='Trend',
         showlegend=False,
@@ -137,55 +239,84 @@ def create_enhanced_dashboard(df):
         fillcolor='rgba(102, 126, 234, 0.1)',
         hovertemplate='<b>%{x}</b><br>Incidents: %{y}<extra></extra>'
     ), row=1, col=3)
+
+    # Flagged (Site, Category, Cause) series on top of the trend line
+    if anomalies:
+        values, _ = data()
+        fig.add_trace(go.Scatter(
+            **values,
+            mode='markers',
+            name='Anomalies',
+            showlegend=False,
+            marker=dict(size=14, color=colors['danger'], symbol='x',
+                        line=dict(color='white', width=1)),
+            hovertemplate='<b>%{x}</b><br>%{customdata} anomalous series<br>%{hovertext}<extra></extra>'
+        ), row=1, col=3)
+
+    # Forecast of the total with its 95% interval
+    if forecast:
+        values, _ = data()
+        fig.add_trace(go.Scatter(
+            **values,
+            fill='toself',
+            fillcolor='rgba(240, 147, 251, 0.2)',
+            line=dict(width=0),
+            name='Forecast interval',
+            showlegend=False,
+            hoverinfo='skip'
+        ), row=1, col=3)
+        values, _ = data()
+        fig.add_trace(go.Scatter(
+            **values,
+            mode='lines+markers',
+            name='Forecast',
+            showlegend=False,
+            line=dict(color=colors['secondary'], width=3, dash='dash'),
+            marker=dict(size=8, color=colors['secondary']),
+            hovertemplate='<b>%{x}</b><br>Forecast: %{y:.0f}<br>95%: %{customdata[0]:.0f} - '
+                          '%{customdata[1]:.0f}<extra></extra>'
+        ), row=1, col=3)
     
     # 4. Site chart (horizontal bar) with enhanced styling
-    site_data = df.groupby('Site')['Count'].sum().reset_index().sort_values('Count', ascending=True)
+    values, marker = data()
     fig.add_trace(go.Bar(
-        y=site_data['Site'], 
-        x=site_data['Count'], 
+        **values,
         orientation='h', 
         name='Site',
         showlegend=False,
         marker=dict(
-            color=site_data['Count'],
+            **marker,
             colorscale='Blues',
             line=dict(color='white', width=1)
         ),
-        text=site_data['Count'],
         textposition='outside',
         hovertemplate='<b>%{y}</b><br>Count: %{x}<extra></extra>'
     ), row=2, col=1)
     
-    # 5. Monthly distribution with seasonal colors
-    month_data = df.groupby('Month')['Count'].sum().reset_index()
-    month_data['MonthOrder'] = month_data['Month'].apply(lambda x: month_order.index(x))
-    month_data = month_data.sort_values('MonthOrder')
-    
     # Seasonal color mapping
     seasonal_colors = ['#74b9ff', '#74b9ff', '#00b894', '#00b894', '#00b894', 
                       '#fdcb6e', '#fdcb6e', '#fdcb6e', '#e17055', '#e17055', '#6c5ce7', '#74b9ff']
     
+    # 5. Monthly distribution with seasonal colors
+    values, _ = data()
     fig.add_trace(go.Bar(
-        x=month_data['Month'], 
-        y=month_data['Count'], 
+        **values,
         name='Month',
         showlegend=False,
         marker=dict(
             color=seasonal_colors,
             line=dict(color='white', width=1)
         ),
-        text=month_data['Count'],
         textposition='outside',
         hovertemplate='<b>%{x}</b><br>Count: %{y}<extra></extra>'
     ), row=2, col=2)
     
     # 6. Enhanced severity pie chart
-    sev_data = df.groupby('Severity')['Count'].sum().reset_index()
     severity_colors = ['#e74c3c', '#f39c12', '#f1c40f', '#2ecc71']
     
+    values, _ = data()
     fig.add_trace(go.Pie(
-        labels=sev_data['Severity'], 
-        values=sev_data['Count'], 
+        **values,
         name='Severity',
         showlegend=True,
         marker=dict(colors=severity_colors, line=dict(color='white', width=2)),
@@ -195,46 +326,103 @@ def create_enhanced_dashboard(df):
     ), row=2, col=3)
     
     # Update layout with modern styling
-    fig.update_layout(
-        title={
-            'text': '🤖 AI Copilot Dashboard - Advanced Incident Analysis',
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': 28, 'family': 'Inter, sans-serif', 'color': colors['dark']}
-        },
-        height=900,
-        font=dict(size=13, family='Inter, sans-serif'),
-        showlegend=True,
-        plot_bgcolor='rgba(248, 249, 250, 0.8)',
-        paper_bgcolor='white',
-        margin=dict(t=100, b=50, l=50, r=50)
-    )
+    with span('figure.layout'):
+        fig.update_layout(
+            title={
+                'text': '🤖 AI Copilot Dashboard - Advanced Incident Analysis',
+                'x': 0.5,
+                'xanchor': 'center',
+                'font': {'size': 28, 'family': 'Inter, sans-serif', 'color': colors['dark']}
+            },
+            height=900,
+            font=dict(size=13, family='Inter, sans-serif'),
+            showlegend=True,
+            plot_bgcolor='rgba(248, 249, 250, 0.8)',
+            paper_bgcolor='white',
+            margin=dict(t=100, b=50, l=50, r=50)
+        )
     
-    # Style the subplots
-    fig.update_xaxes(tickangle=45, tickfont=dict(size=11))
-    fig.update_yaxes(tickfont=dict(size=11))
+        # Style the subplots
+        fig.update_xaxes(tickangle=45, tickfont=dict(size=11))
+        fig.update_yaxes(tickfont=dict(size=11))
     
-    # Add subtle grid
-    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
-    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
+        # Add subtle grid
+        fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
+        fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
     
     return fig
 
-def generate_enhanced_html(df):
-    """Generate enhanced HTML with modern design"""
+@span('generate_enhanced_html')
+def generate_enhanced_html(df, filename="main_dashboard.html", top_k=None, flag_anomalies=False,
+                           forecast_horizon=0, forecast_cache=None, lazy=False, precompute=False, workers=1):
+    """Generate enhanced HTML with modern design
+
+    With ``lazy`` the charts are written as separate JSON files in a
+    ``<name>_charts`` directory and drawn only when scrolled into view. With
+    ``precompute`` the chart data of every filter combination is written to
+    ``<name>_queries`` and the filters work without a server. ``workers``
+    processes sum the rows for the charts and precompute the filters.
+    """
+    import figure_codec
+    import lazy_charts
+    import static_queries
+
     print("🔄 Generating enhanced HTML dashboard...")
     
+    # Vectorized anomaly detection over every (Site, Category, Cause) series
+    anomalies = None
+    if flag_anomalies:
+        import analytics
+        with span('anomalies'):
+            anomalies = analytics.find_anomalies(df)
+        print(f"🔎 Flagged {len(anomalies)} anomalous points")
+
+    # Seasonal exponential smoothing of every (Site, Category) series, refreshed from the cache
+    forecast = None
+    if forecast_horizon:
+        import forecasting
+        with span('forecast'):
+            forecaster = forecasting.load_or_fit(df, forecast_cache, horizon=forecast_horizon)
+            forecast = forecaster.forecast_frame()
+        print(f"🔮 Forecast {forecast_horizon} months for {len(forecaster.index)} series")
+
     # Create dashboard
-    dashboard_fig = create_enhanced_dashboard(df)
+    dashboard_fig = create_enhanced_dashboard(df, top_k=top_k, anomalies=anomalies, forecast=forecast,
+                                              workers=workers)
     
     # Calculate statistics
-    total_records = len(df)
-    total_incidents = df['Count'].sum()
-    period = f"{df['Year'].min()} - {df['Year'].max()}"
-    sites_count = df['Site'].nunique()
-    categories_count = df['Category'].nunique()
-    avg_incidents = df['Count'].mean()
+    with span('statistics'):
+        total_records = outofcore.record_count(df)
+        total_incidents = df['Count'].sum()
+        period = f"{df['Year'].min()} - {df['Year'].max()}"
+        sites_count = df['Site'].nunique()
+        categories_count = df['Category'].nunique()
+        avg_incidents = total_incidents / total_records
+    
+    # Serialize the figure (compact typed/dictionary-encoded arrays)
+    chart_sizes = None
+    if lazy:
+        # One small JSON file per chart, fetched when its placeholder scrolls into view
+        with span('lazy_charts'):
+            chart_dir = os.path.splitext(filename)[0] + '_charts'
+            plot_div, chart_sizes = lazy_charts.write_lazy_charts(dashboard_fig, chart_dir, rows=2, cols=3)
+    else:
+        with span('figure_div'):
+            plot_div = figure_codec.figure_div(dashboard_fig, include_plotlyjs=True)
     
+    # Chart data of every filter combination, fetched by the page when a filter changes
+    queries_div = ''
+    if precompute:
+        with span('static_queries'):
+            queries_dir = os.path.splitext(filename)[0] + '_queries'
+            manifest = static_queries.write_static_queries(df, queries_dir, months, top_k=top_k, workers=workers)
+        n_files = len(set(manifest['results'].values()))
+        print(f"🗂️ Precomputed {len(manifest['results'])} filter combinations ({n_files} distinct answers) "
+              f"in {queries_dir}")
+        manifest_url = f"{os.path.basename(queries_dir)}/{static_queries.MANIFEST_FILE}"
+        queries_div = (f'<div id="static-queries" data-manifest="{manifest_url}" hidden></div>\n'
+                       f'    <script>{static_queries.script_js()}</script>')
+
     # Generate timestamp
     timestamp = datetime.now().strftime('%d/%m/%Y às %H:%M:%S')
     
@@ -529,7 +717,36 @@ def generate_enhanced_html(df):
             .stats-grid {{ grid-template-columns: 1fr; }}
             .tech-stack {{ flex-direction: column; align-items: center; }}
         }}
+        
+        .lazy-chart-grid {{
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(420px, 1fr));
+            gap: 20px;
+        }}
+        
+        .lazy-chart {{
+            border-radius: 12px;
+            overflow: hidden;
+        }}
+        
+        .lazy-chart-pending {{
+            background: linear-gradient(90deg, #f1f3f5 25%, #e9ecef 50%, #f1f3f5 75%);
+        }}
+        
+        .lazy-chart-error {{
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            padding: 20px;
+            color: #666;
+            text-align: center;
+        }}
+        
+        @media (max-width: 480px) {{
+            .lazy-chart-grid {{ grid-template-columns: 1fr; }}
+        }}
     </style>
+    <script>{lazy_charts.loader_js()}</script>
 </head>
 <body>
     <div class="container">
@@ -630,6 +847,7 @@ def generate_enhanced_html(df):
                 </div>
             </div>
         </div>
+        {queries_div}
         
         <!-- Dashboard Container -->
         <div class="dashboard-container">
@@ -637,7 +855,7 @@ def generate_enhanced_html(df):
                 <div class="dashboard-title">📊 Visualizações Interativas</div>
                 <div class="dashboard-subtitle">Análise multidimensional dos dados de incidentes</div>
             </div>
-            {pyo.plot(dashboard_fig, output_type='div', include_plotlyjs=True)}
+            {plot_div}
         </div>
         
         <!-- Footer -->
@@ -670,7 +888,7 @@ def generate_enhanced_html(df):
                         this.style.borderColor = '#e1e5e9';
                     }}, 1000);
                     
-                    // Here you would typically update the charts based on filters
+                    // With --precompute the charts are refiltered by static_queries.js
                     console.log('Filter changed:', this.id, this.value);
                 }});
             }});
@@ -725,18 +943,53 @@ def generate_enhanced_html(df):
 </html>"""
     
     # Save the enhanced dashboard
-    filename = "main_dashboard.html"
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    with span('write'):
+        watch.write_atomic(filename, html_content)
     
     print(f"✅ Enhanced dashboard saved as: {filename}")
+    if chart_sizes is not None:
+        charts = [size for name, size in chart_sizes.items() if name.startswith('chart-')]
+        print(f"🪶 Page {os.path.getsize(filename) / 1e3:.0f} KB; {len(charts)} charts of {sum(charts) / 1e3:.0f} KB "
+              f"and plotly.js loaded on scroll from {chart_dir}")
+        print("🌐 Serve it over HTTP to load the charts, e.g. python -m http.server")
     print(f"📊 Dashboard contains {total_records:,} records and {total_incidents:,} incidents")
     print(f"📈 Average incidents per record: {avg_incidents:.1f}")
     return filename
 
 if __name__ == "__main__":
+    import forecasting
+
+    parser = argparse.ArgumentParser(description="Generate the enhanced static dashboard")
+    parser.add_argument('--top-k', type=topk.parse_k, metavar='K',
+                        help="Plot only the K largest categories, causes and sites, plus an \"Other\" bar")
+    parser.add_argument('--anomalies', action='store_true',
+                        help="Flag anomalous months of every (Site, Category, Cause) series on the trend chart")
+    parser.add_argument('--forecast', type=forecasting.parse_horizon, default=0, metavar='MONTHS',
+                        help="Forecast the next MONTHS months of every (Site, Category) series on the trend chart")
+    parser.add_argument('--forecast-cache', metavar='PATH',
+                        help="Fitted forecast parameters (.npz), refreshed incrementally with the new months")
+    parser.add_argument('--precompute', action='store_true',
+                        help="Precompute the charts of every filter combination so the filters work without a server")
+    parser.add_argument('--lazy', action='store_true',
+                        help="Write each chart as its own JSON file, loaded when scrolled into view (serve over HTTP)")
+    synthetic.add_arguments(parser)
+    snapshot.add_arguments(parser)
+    watch.add_arguments(parser)
+    instrumentation.add_arguments(parser, default_profile='enhanced_dashboard.prof')
+    args = parser.parse_args()
+    watch.check_arguments(parser, args)
+
+    def build(df):
+        return generate_enhanced_html(df, top_k=args.top_k, flag_anomalies=args.anomalies,
+                                      forecast_horizon=args.forecast, forecast_cache=args.forecast_cache,
+                                      lazy=args.lazy, precompute=args.precompute, workers=args.workers)
+
     # Generate data and create enhanced dashboard
-    df = generate_data()
-    filename = generate_enhanced_html(df)
-    print("🎉 Enhanced dashboard generation complete!")
-    print(f"🌐 Open {filename} in your browser to view the dashboard")
\ No newline at end of file
+    with instrumentation.instrumented(args):
+        if args.watch is not None:
+            # Rebuilt on every data change, from the partitions that changed
+            watch.watch(args.data, build, interval=args.watch, chunk_rows=args.out_of_core or outofcore.CHUNK_ROWS)
+        else:
+            filename = build(snapshot.load_data(generate_data, args))
+            print("🎉 Enhanced dashboard generation complete!")
+            print(f"🌐 Open {filename} in your browser to view the dashboard")
\ No newline at end of file
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Streaming export of the filtered incidents as CSV, Parquet or JSON Lines
+
+The frame is read in fixed-size row chunks; each chunk is filtered and
+encoded on its own and the bytes are yielded as soon as they are ready, so
+memory stays bounded by the chunk size whatever the size of the export.
+``stream_export`` feeds the Dash ``/export/<format>`` endpoint (a streaming
+HTTP response) and ``write_export`` the command line.
+"""
+
+import argparse
+import io
+import os
+import sys
+
+import snapshot
+import synthetic
+
+CHUNK_ROWS = 100_000
+
+# Format -> (MIME type, file extension)
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'jsonl': ('application/x-ndjson', '.jsonl'),
+}
+
+# Columns that can be filtered on without being stored in the frame
+DERIVED_COLUMNS = {
+    'Period': lambda chunk: chunk['Year'].astype(str) + '-' + chunk['Month'].astype(str),
+}
+
+
+def available_formats():
+    """Export formats usable with the installed packages (Parquet needs pyarrow)"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return [fmt for fmt in FORMATS if fmt != 'parquet']
+    return list(FORMATS)
+
+
+def format_for(path):
+    """Export format implied by a file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, (_, ext) in FORMATS.items():
+        if ext == extension:
+            return fmt
+    raise ValueError(f"unknown export extension {extension!r} (expected one of "
+                     f"{', '.join(ext for _, ext in FORMATS.values())})")
+
+
+def parse_where(df, where):
+    """``where`` as ``(column, labels)`` pairs, with the labels converted to the types of ``df``
+
+    ``where`` maps columns to allowed labels, or is a list of ``(column,
+    labels)`` pairs when one column has several conditions. Empty labels
+    mean no condition. Raises ValueError for an unknown column or a label
+    its column cannot hold, so bad filters fail before anything is exported.
+    """
+    conditions = where.items() if isinstance(where, dict) else where or ()
+    parsed = []
+    for column, labels in conditions:
+        if column not in DERIVED_COLUMNS and column not in df:
+            raise ValueError(f"unknown filter column {column!r}")
+        kind = 'O' if column in DERIVED_COLUMNS else df[column].dtype.kind
+        convert = int if kind in 'iu' else float if kind == 'f' else None
+        if convert is not None and labels:
+            try:
+                labels = [convert(label) for label in labels]
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid {column} filter value in {list(labels)!r}") from None
+        parsed.append((column, list(labels or ())))
+    return parsed
+
+
+def chunk_mask(chunk, where):
+    """Rows of ``chunk`` matching every condition of ``where`` (from ``parse_where``)"""
+    import numpy as np
+
+    mask = np.ones(len(chunk), dtype=bool)
+    for column, labels in where:
+        if not labels:
+            continue
+        values = DERIVED_COLUMNS[column](chunk) if column in DERIVED_COLUMNS else chunk[column]
+        mask &= values.isin(labels).to_numpy()
+    return mask
+
+
+def filtered_chunks(df, where=None, chunk_rows=CHUNK_ROWS, columns=None):
+    """Yield the filtered rows of ``df`` one chunk at a time (an empty chunk when nothing matches)"""
+    where = parse_where(df, where)
+    columns = list(columns or df.columns)
+    matched = False
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        mask = chunk_mask(chunk, where)
+        if mask.any():
+            matched = True
+            yield chunk.loc[mask, columns]
+    if not matched:
+        # Keeps the CSV header and the Parquet schema in an empty export
+        yield df.iloc[:0][columns]
+
+
+class _Drain(io.RawIOBase):
+    """Write-only file object whose contents are taken out after every write"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _encode_csv(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+
+def _encode_jsonl(chunks):
+    for chunk in chunks:
+        if len(chunk):
+            yield chunk.to_json(orient='records', lines=True).rstrip('\n').encode('utf-8') + b'\n'
+
+
+def _encode_parquet(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # One row group per chunk, flushed to the output as soon as it is written
+    sink = _Drain()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        yield sink.take()
+    if writer is not None:
+        writer.close()
+        yield sink.take()
+
+
+ENCODERS = {'csv': _encode_csv, 'parquet': _encode_parquet, 'jsonl': _encode_jsonl}
+
+
+def stream_export(df, fmt='csv', where=None, chunk_rows=CHUNK_ROWS, columns=None):
+    """Iterator over the encoded bytes of the filtered rows of ``df``, chunk by chunk
+
+    The format and ``where`` are checked on the call (ValueError), not when
+    the first chunk is taken, so a server can still answer with an error.
+    """
+    if fmt not in available_formats():
+        raise ValueError(f"unsupported export format {fmt!r} (available: {', '.join(available_formats())})")
+    where = parse_where(df, where)
+    return (data for data in ENCODERS[fmt](filtered_chunks(df, where, chunk_rows, columns)) if data)
+
+
+def write_export(df, path, fmt=None, where=None, chunk_rows=CHUNK_ROWS, columns=None):
+    """Stream the filtered rows of ``df`` to ``path`` ("-" for stdout), return the bytes written"""
+    fmt = fmt or format_for(path)
+    chunks = stream_export(df, fmt, where, chunk_rows, columns)
+    written = 0
+    output = sys.stdout.buffer if path == '-' else open(path, 'wb')
+    try:
+        for data in chunks:
+            output.write(data)
+            written += len(data)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    return written
+
+
+def parse_filters(filters):
+    """``COLUMN=VALUE`` arguments as a column -> labels mapping (repeat a column to allow several values)"""
+    where = {}
+    for item in filters or ():
+        column, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"filter {item!r} is not COLUMN=VALUE")
+        where.setdefault(column.strip(), []).append(value.strip())
+    return where
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the filtered incident records")
+    parser.add_argument('--output', '-o', default='incidents.csv',
+                        help="Output file, format taken from its extension (.csv, .parquet, .jsonl); - for stdout")
+    parser.add_argument('--format', choices=list(FORMATS), help="Output format (default: from --output)")
+    parser.add_argument('--filter', action='append', metavar='COLUMN=VALUE',
+                        help="Keep only rows with this value; repeat for several values or columns")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows read and encoded at a time")
+    synthetic.add_arguments(parser)
+    snapshot.add_arguments(parser)
+    args = parser.parse_args()
+
+    import contextlib
+
+    from dash_app import generate_data
+
+    fmt = args.format or ('csv' if args.output == '-' else format_for(args.output))
+    # Progress messages go to stderr when the export itself goes to stdout
+    log = sys.stderr if args.output == '-' else sys.stdout
+    with contextlib.redirect_stdout(log):
+        df = snapshot.load_data(generate_data, args)
+    written = write_export(df, args.output, fmt, parse_filters(args.filter), args.chunk_rows)
+    print(f"✅ Exported {written / 1e6:.2f} MB as {fmt}: {args.output}", file=log)
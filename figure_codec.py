@@ -0,0 +1,175 @@
+"""
+Compact encoding of Plotly figures for the static pages and Dash callbacks
+
+Numeric trace arrays are sent as plotly.js typed-array specs
+(``{"dtype": "i2", "bdata": "<base64>"}``), which plotly.js decodes natively.
+Repeated string arrays (category axes, raw-row labels) are dictionary-encoded
+as ``{"dict": [labels...], "codes": <typed array>}`` and expanded in the
+browser by ``assets/figure_codec.js`` before the figure is drawn. Dates are
+sent as ISO strings, like plotly's own serializer does.
+"""
+
+import base64
+import json
+import os
+import uuid
+
+DECODER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'figure_codec.js')
+
+# Arrays shorter than this are left as plain JSON lists
+MIN_ENCODED_LENGTH = 16
+
+_TYPED_ARRAY_DTYPES = {
+    'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+    'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8',
+}
+# Trace attributes plotly.js only reads as plain lists
+PLAIN_ATTRIBUTES = {'selectedpoints'}
+
+
+def _datetime_strings(arr):
+    """ISO strings for a datetime64 array (None for NaT); ``tolist`` would give nanosecond ints"""
+    import numpy as np
+
+    strings = np.datetime_as_string(arr, unit='auto').astype(object)
+    strings[np.isnat(arr)] = None
+    return strings
+
+
+def typed_array(values):
+    """Encode a numeric array as a plotly.js typed-array spec, or return None"""
+    import numpy as np
+
+    arr = np.asarray(values)
+    if arr.ndim != 1 or arr.dtype.kind not in 'iuf':
+        return None
+    if arr.dtype.kind in 'iu' and arr.size:
+        # plotly.js has no 64-bit integer arrays; use the smallest type that fits
+        low, high = arr.min(), arr.max()
+        for candidate in (np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32):
+            info = np.iinfo(candidate)
+            if info.min <= low and high <= info.max:
+                arr = arr.astype(candidate)
+                break
+        else:
+            arr = arr.astype(np.float64)
+    dtype = _TYPED_ARRAY_DTYPES.get(arr.dtype.name)
+    if dtype is None:
+        arr = arr.astype(np.float64)
+        dtype = 'f8'
+    return {'dtype': dtype, 'bdata': base64.b64encode(np.ascontiguousarray(arr)).decode('ascii')}
+
+
+def dictionary_array(values):
+    """Dictionary-encode a repetitive string array, or return None"""
+    import pandas as pd
+
+    if len(values) < MIN_ENCODED_LENGTH:
+        return None
+    codes, uniques = pd.factorize(pd.Series(values, copy=False), use_na_sentinel=False)
+    labels = list(uniques)
+    if len(labels) * 2 > len(values) or not all(isinstance(label, str) for label in labels):
+        return None
+    return {'dict': labels, 'codes': typed_array(codes)}
+
+
+def _encode_value(value):
+    import numpy as np
+
+    if isinstance(value, dict):
+        return {key: _plain_value(item) if key in PLAIN_ATTRIBUTES else _encode_value(item)
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        arr = value if isinstance(value, np.ndarray) else None
+        if arr is None:
+            if len(value) < MIN_ENCODED_LENGTH or isinstance(value[0], (dict, list, tuple)):
+                return [_encode_value(item) for item in value]
+            arr = np.asarray(value, dtype=object if isinstance(value[0], str) else None)
+        if arr.dtype.kind == 'M':
+            arr = _datetime_strings(arr)
+        if arr.ndim == 1 and arr.size:
+            if arr.dtype.kind in 'iuf':
+                return typed_array(arr)
+            if arr.dtype.kind in 'OUT':
+                encoded = dictionary_array(arr)
+                if encoded is not None:
+                    return encoded
+        return arr.tolist()
+    return _plain_value(value)
+
+
+def _plain_value(value):
+    import numpy as np
+
+    if isinstance(value, dict):
+        return {key: _plain_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain_value(item) for item in value]
+    if isinstance(value, (np.ndarray, np.datetime64)) and value.dtype.kind == 'M':
+        return _datetime_strings(np.asarray(value)).tolist()
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+
+def encode_figure(fig):
+    """Return a JSON-ready dict of ``fig`` with compact trace arrays"""
+    figure = fig if isinstance(fig, dict) else fig.to_plotly_json()
+    return {
+        'data': [_encode_value(trace) for trace in figure.get('data', [])],
+        # Layout arrays are tiny and plotly.js only decodes typed arrays in trace data
+        'layout': _plain_value(figure.get('layout', {})),
+    }
+
+
+def _json_default(value):
+    import numpy as np
+
+    if isinstance(value, (np.ndarray, np.generic)):
+        return _plain_value(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_json(obj):
+    """Serialize with orjson when it is installed, falling back to the stdlib encoder"""
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(obj, separators=(',', ':'), default=_json_default)
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+
+def decoder_js():
+    """Source of the browser-side decoder"""
+    with open(DECODER_PATH, encoding='utf-8') as f:
+        return f.read()
+
+
+def figure_div(fig, include_plotlyjs=True, div_id=None):
+    """Drop-in replacement for ``pyo.plot(fig, output_type='div')`` using the compact encoding"""
+    payload = encode_figure(fig)
+    div_id = div_id or str(uuid.uuid4())
+    height = payload['layout'].get('height')
+    style = f"height:{height}px; width:100%;" if height else "height:100%; width:100%;"
+
+    scripts = []
+    if include_plotlyjs:
+        from plotly.offline import get_plotlyjs
+        scripts.append("<script>window.PlotlyConfig = {MathJaxConfig: 'local'};</script>")
+        scripts.append(f"<script>{get_plotlyjs()}</script>")
+    scripts.append(f"<script>{decoder_js()}</script>")
+
+    # "</" would end the inline <script> early
+    figure_json = to_json(payload).replace('</', '<\\/')
+    return f"""<div style="{style}">
+        {''.join(scripts)}
+        <div id="{div_id}" class="plotly-graph-div" style="height:100%; width:100%;"></div>
+        <script>
+            (function() {{
+                var figure = window.figureCodec.decodeFigure({figure_json});
+                if (document.getElementById("{div_id}")) {{
+                    Plotly.newPlot("{div_id}", figure.data, figure.layout, {{"responsive": true}});
+                }}
+            }})();
+        </script>
+    </div>"""
@@ -0,0 +1,307 @@
+"""
+Batch forecasting of monthly incident counts for every series at once
+
+``SeriesForecaster`` fits additive seasonal exponential smoothing
+(Holt-Winters, ETS(A,A,A)) to every Site x Category series together: the
+recursions run once per month over a vector holding all series, and the
+smoothing parameters of each series are picked from a small grid by
+one-step squared error. Prediction intervals use the analytical ETS
+variance. Fitted parameters and states can be saved, and ``update`` only
+runs the recursions over the months added since the last fit, as long as
+the months already fitted are unchanged (checked with a digest of them).
+"""
+
+import itertools
+import os
+
+from approximate import Z_95
+from generate_dashboard import months
+
+SERIES_KEYS = ('Site', 'Category')
+HORIZON = 6
+SEASON = 12
+
+# Smoothing parameter grid; beta and gamma are fractions of alpha and 1 - alpha,
+# which keeps every combination inside the usual ETS admissible region
+ALPHAS = (0.1, 0.2, 0.4, 0.7)
+BETA_FRACTIONS = (0.0, 0.05, 0.2)
+GAMMA_FRACTIONS = (0.0, 0.1, 0.3)
+
+
+def parse_horizon(text):
+    """``argparse`` type for ``--forecast``: months to forecast, 0 for none"""
+    import argparse
+
+    try:
+        horizon = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number of months: {text!r}") from None
+    if horizon < 0:
+        raise argparse.ArgumentTypeError(f"months must be 0 or more, got {horizon}")
+    return horizon
+
+
+def _initial_state(matrix, season, start=0):
+    """Initial ``(level, trend, seasonal)``, with ``seasonal`` indexed by phase (absolute month % season)"""
+    import numpy as np
+
+    n_series, n_periods = matrix.shape
+    if n_periods >= season:
+        level = matrix[:, :season].mean(axis=1)
+        # Column j of the first season is phase (start + j) % season
+        seasonal = np.roll(matrix[:, :season] - level[:, None], start % season, axis=1)
+    else:
+        level = matrix.mean(axis=1)
+        seasonal = np.zeros((n_series, season))
+    if n_periods >= 2 * season:
+        trend = (matrix[:, season:2 * season].mean(axis=1) - level) / season
+    else:
+        trend = np.zeros(n_series)
+    return level, trend, seasonal
+
+
+def _smooth(matrix, start, level, trend, seasonal, alpha, beta, gamma):
+    """Run the recursions over ``matrix`` (updating the states in place), return the squared one-step errors"""
+    import numpy as np
+
+    season = seasonal.shape[1]
+    sse = np.zeros(len(matrix))
+    for t in range(matrix.shape[1]):
+        phase = (start + t) % season
+        error = matrix[:, t] - (level + trend + seasonal[:, phase])
+        sse += error * error
+        level += trend + alpha * error
+        trend += beta * error
+        seasonal[:, phase] += gamma * error
+    return sse
+
+
+def fit_series(matrix, start=0, season=SEASON):
+    """Grid-search the smoothing parameters of every row of ``matrix``
+
+    ``start`` is the absolute month number of the first column. Returns the
+    per-series parameters ``(alpha, beta, gamma)``, the final states
+    ``(level, trend, seasonal)`` and the sum of squared one-step errors.
+    """
+    import numpy as np
+
+    n_series = len(matrix)
+    best = {name: np.zeros(n_series) for name in ('alpha', 'beta', 'gamma', 'level', 'trend')}
+    best['seasonal'] = np.zeros((n_series, season))
+    best['sse'] = np.full(n_series, np.inf)
+    for alpha, beta, gamma in itertools.product(ALPHAS, BETA_FRACTIONS, GAMMA_FRACTIONS):
+        beta, gamma = alpha * beta, (1 - alpha) * gamma
+        level, trend, seasonal = _initial_state(matrix, season, start)
+        sse = _smooth(matrix, start, level, trend, seasonal, alpha, beta, gamma)
+        better = sse < best['sse']
+        for name, value in (('alpha', alpha), ('beta', beta), ('gamma', gamma), ('sse', sse),
+                            ('level', level), ('trend', trend)):
+            best[name] = np.where(better, value, best[name])
+        best['seasonal'][better] = seasonal[better]
+    return best
+
+
+class SeriesForecaster:
+    """Seasonal exponential smoothing of every ``keys`` series of a frame, fitted as one matrix"""
+
+    def __init__(self, keys=SERIES_KEYS, value='Count', season=SEASON, horizon=HORIZON):
+        self.keys = list(keys)
+        self.value = value
+        self.season = season
+        self.horizon = horizon
+        self.index = None
+        self.state = None
+        self.n_obs = None
+        # Absolute month number (year * 12 + month) of the last fitted month
+        self.last_period = None
+        # Digest of the settings and the fitted months of every series (``_digest``)
+        self.digest = None
+
+    def _matrix(self, df):
+        import analytics
+
+        index, periods, matrix = analytics.monthly_matrix(df, self.keys, self.value)
+        absolute = periods['Year'].to_numpy() * len(months) + periods['Month'].map(months.index).to_numpy()
+        return index.astype(str), absolute, matrix
+
+    def _digest(self, index, absolute, matrix):
+        """Digest of the settings and of the months up to ``last_period`` of every fitted series
+
+        Fitted series missing from ``index`` count as zeros, like in ``update``.
+        """
+        import hashlib
+
+        import numpy as np
+        import pandas as pd
+
+        position = pd.MultiIndex.from_frame(index).get_indexer(pd.MultiIndex.from_frame(self.index))
+        columns = absolute <= self.last_period
+        history = np.zeros((len(self.index), int(columns.sum())))
+        found = position >= 0
+        history[found] = matrix[position[found]][:, columns]
+        digest = hashlib.sha256(repr((self.keys, self.value, self.season, self.horizon)).encode())
+        for column in self.keys:
+            digest.update('\0'.join(self.index[column]).encode())
+        digest.update(absolute[columns].astype(np.int64).tobytes())
+        digest.update(history.astype(np.float64).tobytes())
+        return digest.hexdigest()
+
+    def matches(self, df):
+        """Whether ``df`` holds the same months as the ones already fitted, so ``update`` can resume from them"""
+        return self.state is not None and self._digest(*self._matrix(df)) == self.digest
+
+    def fit(self, df):
+        """Fit every series of ``df`` from scratch"""
+        import numpy as np
+
+        self.index, absolute, matrix = self._matrix(df)
+        self.state = fit_series(matrix, int(absolute[0]), self.season)
+        self.n_obs = np.full(len(matrix), matrix.shape[1])
+        self.last_period = int(absolute[-1])
+        self.digest = self._digest(self.index, absolute, matrix)
+        return self
+
+    def update(self, df):
+        """Advance the cached states over the months of ``df`` newer than the last fit
+
+        Known series keep their parameters, so only the new months are
+        smoothed; series not seen before are fitted on their full history,
+        and cached series missing from ``df`` count as zero in the new months.
+        When the months already fitted differ in ``df`` (or the settings
+        changed), every series is fitted again from scratch.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if self.state is None:
+            return self.fit(df)
+        index, absolute, matrix = self._matrix(df)
+        if self._digest(index, absolute, matrix) != self.digest:
+            return self.fit(df)
+        last_period = int(absolute[-1])
+        position = pd.MultiIndex.from_frame(self.index).get_indexer(pd.MultiIndex.from_frame(index))
+        known = position >= 0
+        if last_period > self.last_period:
+            new_months = np.zeros((len(self.index), last_period - self.last_period))
+            columns = absolute > self.last_period
+            new_months[position[known][:, None], absolute[columns] - self.last_period - 1] = \
+                matrix[known][:, columns]
+            state = self.state
+            sse = _smooth(new_months, self.last_period + 1, state['level'], state['trend'], state['seasonal'],
+                          state['alpha'], state['beta'], state['gamma'])
+            state['sse'] += sse
+            self.n_obs += new_months.shape[1]
+            self.last_period = last_period
+
+        if not known.all():
+            added = fit_series(matrix[~known], int(absolute[0]), self.season)
+            self.state = {name: np.concatenate([self.state[name], added[name]]) for name in self.state}
+            self.n_obs = np.concatenate([self.n_obs, np.full((~known).sum(), matrix.shape[1])])
+            self.index = pd.concat([self.index, index[~known]], ignore_index=True)
+        self.digest = self._digest(index, absolute, matrix)
+        return self
+
+    def forecast(self, horizon=None):
+        """``(mean, variance)`` arrays of shape ``(series, horizon)``"""
+        import numpy as np
+
+        horizon = horizon or self.horizon
+        state = self.state
+        steps = np.arange(1, horizon + 1)
+        phase = (self.last_period + steps) % self.season
+        mean = state['level'][:, None] + steps * state['trend'][:, None] + state['seasonal'][:, phase]
+
+        # ETS(A,A,A): var_h = sigma^2 * (1 + sum_{j<h} c_j^2), c_j = alpha + beta j + gamma [j % m == 0]
+        sigma2 = state['sse'] / np.maximum(self.n_obs, 1)
+        lags = steps[:-1]
+        c = (state['alpha'][:, None] + state['beta'][:, None] * lags
+             + state['gamma'][:, None] * (lags % self.season == 0))
+        cumulative = np.concatenate([np.zeros((len(mean), 1)), np.cumsum(c * c, axis=1)], axis=1)
+        return mean, sigma2[:, None] * (1 + cumulative)
+
+    def forecast_frame(self, horizon=None, by=(), where=None, z=Z_95):
+        """Forecast summed over the matching series by Year/Month and ``by``
+
+        ``where`` maps key columns to the labels to keep. Returns Year, Month,
+        the ``by`` columns, Forecast, Low and High; the intervals treat the
+        series as independent. Counts are clipped at zero.
+        """
+        import numpy as np
+        import pandas as pd
+
+        horizon = horizon or self.horizon
+        by = list(by)
+        mask = np.ones(len(self.index), dtype=bool)
+        for column, labels in (where or {}).items():
+            if labels:
+                mask &= self.index[column].isin([str(label) for label in labels]).to_numpy()
+        if not mask.any():
+            return pd.DataFrame(columns=['Year', 'Month'] + by + ['Forecast', 'Low', 'High'])
+
+        mean, variance = self.forecast(horizon)
+        keys = [self.index.loc[mask, column].reset_index(drop=True) for column in by]
+        keys = keys or [np.zeros(mask.sum(), dtype=int)]
+        mean = pd.DataFrame(mean[mask]).groupby(keys, sort=True).sum()
+        variance = pd.DataFrame(variance[mask]).groupby(keys, sort=True).sum()
+
+        groups = mean.index.to_frame(index=False) if by else pd.DataFrame(index=range(1))
+        frame = groups.loc[groups.index.repeat(horizon)].reset_index(drop=True)
+        period = np.tile(self.last_period + 1 + np.arange(horizon), len(groups))
+        frame.insert(0, 'Year', period // len(months))
+        frame.insert(1, 'Month', np.asarray(months)[period % len(months)])
+        estimate = mean.to_numpy().ravel()
+        error = z * np.sqrt(variance.to_numpy().ravel())
+        frame['Forecast'] = np.maximum(estimate, 0.0)
+        frame['Low'] = np.maximum(estimate - error, 0.0)
+        frame['High'] = np.maximum(estimate + error, 0.0)
+        return frame
+
+    def save(self, path):
+        """Store the index, parameters and states as a ``.npz`` file"""
+        import numpy as np
+
+        arrays = {f'state_{name}': value for name, value in self.state.items()}
+        arrays.update({f'key_{column}': self.index[column].to_numpy(dtype=str) for column in self.keys})
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, keys=np.array(self.keys), value=np.array(self.value), season=self.season,
+                                horizon=self.horizon, last_period=self.last_period, n_obs=self.n_obs,
+                                digest=np.array(self.digest), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+        import pandas as pd
+
+        with np.load(path) as data:
+            forecaster = cls(data['keys'].tolist(), str(data['value']), int(data['season']))
+            forecaster.index = pd.DataFrame({column: data[f'key_{column}'].astype(object)
+                                             for column in forecaster.keys})
+            forecaster.state = {name[len('state_'):]: data[name] for name in data.files if name.startswith('state_')}
+            forecaster.n_obs = data['n_obs']
+            forecaster.last_period = int(data['last_period'])
+            # Caches written before the digest existed are refitted by ``update``
+            if 'digest' in data.files:
+                forecaster.horizon = int(data['horizon'])
+                forecaster.digest = str(data['digest'])
+        return forecaster
+
+
+def load_or_fit(df, cache=None, keys=SERIES_KEYS, horizon=HORIZON):
+    """Forecaster for ``df``, refreshed incrementally from ``cache`` when it exists and saved back to it
+
+    A cache fitted on other data, series keys, seasonality or horizon is
+    replaced by a fresh fit.
+    """
+    forecaster = SeriesForecaster(keys, horizon=horizon)
+    if cache and os.path.exists(cache):
+        cached = SeriesForecaster.load(cache)
+        if (cached.keys == forecaster.keys and cached.season == forecaster.season and cached.horizon == horizon
+                and cached.matches(df)):
+            forecaster = cached.update(df)
+        else:
+            print(f"♻️ Forecast cache {cache} was fitted on other data or settings, refitting")
+    if forecaster.state is None:
+        forecaster.fit(df)
+    if cache:
+        forecaster.save(cache)
+    return forecaster
@@ -3,17 +3,19 @@
 Generate static HTML dashboard for GitHub Pages
 """
 
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import plotly.offline as pyo
 from datetime import datetime
-import os
+import argparse
 
-# Generate synthetic data for the dashboard
-print("🔄 Generating synthetic data...")
+# pandas, numpy and plotly are imported inside the functions that need them,
+# so importing this module (or running it with --help) stays fast
+import instrumentation
+import outofcore
+import partitioned
+import snapshot
+import synthetic
+import topk
+import watch
+from instrumentation import span
 
 categories = ['Customer', 'Spill', 'Injury', 'Transport', 'Equipment', 'Security', 'Divergence', 'Complaint']
 causes = ['Material', 'Procedure', 'Design', 'Training', 'Management', 'External', 'Equipment', 'Personnel']
@@ -23,158 +25,237 @@ years = [2007, 2008, 2009]
 severities = ['Critical', 'Major', 'Medium', 'Near Miss']
 status = ['Open', 'Closed']
 
-np.random.seed(42)
-records = []
-for year in years:
-    for month in months:
-        for site in sites:
-            for category in categories:
-                for cause in np.random.choice(causes, size=2, replace=False):
-                    severity = np.random.choice(severities)
-                    stat = np.random.choice(status, p=[0.3, 0.7])
-                    count = np.random.poisson(lam=8)
-                    if count == 0:
-                        continue
-                    records.append({
-                        'Category': category,
-                        'Cause': cause,
-                        'Site': site,
-                        'Month': month,
-                        'Year': year,
-                        'Severity': severity,
-                        'Status': stat,
-                        'Count': count
-                    })
+def _generate_shard(rng, year, site, scale=1):
+    """Codes of one Year x Site shard: every (month, category) pair ``scale`` times, with two distinct causes each"""
+    import numpy as np
 
-df = pd.DataFrame(records)
-print(f"✅ Data generated! Total records: {len(df)}")
+    pairs = len(months) * len(categories) * scale
+    month = np.repeat(np.repeat(np.arange(len(months), dtype=np.int8), len(categories) * scale), 2)
+    category = np.repeat(np.tile(np.repeat(np.arange(len(categories), dtype=np.int8), scale), len(months)), 2)
+    cause = synthetic.choose_distinct(rng, pairs, len(causes), 2).ravel().astype(np.int8)
+    severity = rng.integers(len(severities), size=len(cause), dtype=np.int8)
+    stat = (rng.random(len(cause)) >= 0.3).astype(np.int8)  # 30% Open, 70% Closed
+    count = rng.poisson(lam=8, size=len(cause))
+
+    keep = count > 0
+    n = int(keep.sum())
+    return {
+        'Category': category[keep],
+        'Cause': cause[keep],
+        'Site': np.full(n, sites.index(site), dtype=np.int8),
+        'Month': month[keep],
+        'Year': np.full(n, year, dtype=np.int64),
+        'Severity': severity[keep],
+        'Status': stat[keep],
+        'Count': count[keep].astype(np.int64),
+    }
+
+@span('generate_data')
+def generate_data(seed=synthetic.DEFAULT_SEED, workers=1, scale=1):
+    """Generate synthetic data for the dashboard, one shard per Year x Site
+
+    The result depends only on ``seed`` and ``scale`` (rows per site-month
+    multiplier), never on the number of ``workers`` processes.
+    """
+    print("🔄 Generating synthetic data...")
+
+    shards = [(year, site, scale) for year in years for site in sites]
+    columns = synthetic.generate_shards(_generate_shard, shards, seed=seed, workers=workers)
+    df = synthetic.decode(columns, {'Category': categories, 'Cause': causes, 'Site': sites, 'Month': months,
+                                    'Severity': severities, 'Status': status})
+    print(f"✅ Data generated! Total records: {len(df)}")
+    return df
+
+@span('create_dashboard')
+def create_dashboard(df, top_k=None, anomalies=None, workers=1):
+    """Create dashboard with multiple visualizations, keeping the ``top_k`` largest groups per chart
+
+    With ``workers`` > 1 the rows are first summed in that many processes.
+    """
+    import analytics
+    import plotly.colors
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
 
-def create_dashboard():
-    """Create dashboard with multiple visualizations"""
     print("🔄 Creating dashboard visualizations...")
-    
+
+    # Partial sums per row range in a process pool; the charts then group the much smaller sums
+    if workers and workers > 1:
+        with span('partitioned.aggregate'):
+            df = partitioned.aggregate_frame(df, workers=workers)
+
     # Create figure with 2x3 subplots
-    fig = make_subplots(
-        rows=2, cols=3,
-        subplot_titles=(
-            'Incidents by Category', 'Incidents by Cause', 'Monthly Trend',
-            'Incidents by Site', 'Monthly Distribution', 'Severity Distribution'
-        ),
-        specs=[
-            [{"type": "bar"}, {"type": "bar"}, {"type": "scatter"}],
-            [{"type": "bar"}, {"type": "bar"}, {"type": "pie"}]
-        ],
-        vertical_spacing=0.15,
-        horizontal_spacing=0.1
-    )
+    with span('figure.subplots'):
+        fig = make_subplots(
+            rows=2, cols=3,
+            subplot_titles=(
+                'Incidents by Category', 'Incidents by Cause', 'Monthly Trend',
+                'Incidents by Site', 'Monthly Distribution', 'Severity Distribution'
+            ),
+            specs=[
+                [{"type": "bar"}, {"type": "bar"}, {"type": "scatter"}],
+                [{"type": "bar"}, {"type": "bar"}, {"type": "pie"}]
+            ],
+            vertical_spacing=0.15,
+            horizontal_spacing=0.1
+        )
     
     # Color palette
-    colors = px.colors.qualitative.Plotly
+    colors = plotly.colors.qualitative.Plotly
     
     # 1. Category chart
-    cat_data = df.groupby('Category')['Count'].sum().reset_index().sort_values('Count', ascending=False)
-    fig.add_trace(go.Bar(
-        x=cat_data['Category'], 
-        y=cat_data['Count'], 
-        name='Category',
-        showlegend=False,
-        marker_color=colors[0]
-    ), row=1, col=1)
+    with span('category.aggregate'):
+        cat_data = topk.top_k(df, 'Category', topk.limit_for(top_k, 'Category'))
+    with span('category.figure'):
+        fig.add_trace(go.Bar(
+            x=cat_data['Category'], 
+            y=cat_data['Count'], 
+            name='Category',
+            showlegend=False,
+            marker_color=colors[0]
+        ), row=1, col=1)
     
     # 2. Cause chart
-    cause_data = df.groupby('Cause')['Count'].sum().reset_index().sort_values('Count', ascending=False)
-    fig.add_trace(go.Bar(
-        x=cause_data['Cause'], 
-        y=cause_data['Count'], 
-        name='Cause',
-        showlegend=False,
-        marker_color=colors[1]
-    ), row=1, col=2)
+    with span('cause.aggregate'):
+        cause_data = topk.top_k(df, 'Cause', topk.limit_for(top_k, 'Cause'))
+    with span('cause.figure'):
+        fig.add_trace(go.Bar(
+            x=cause_data['Cause'], 
+            y=cause_data['Count'], 
+            name='Cause',
+            showlegend=False,
+            marker_color=colors[1]
+        ), row=1, col=2)
     
     # 3. Time series
-    line_data = df.groupby(['Year', 'Month'])['Count'].sum().reset_index()
-    line_data['MonthNum'] = line_data['Month'].apply(lambda m: months.index(m))
-    line_data = line_data.sort_values(['Year', 'MonthNum'])
-    line_data['Date'] = line_data['Year'].astype(str) + '-' + line_data['Month']
-    fig.add_trace(go.Scatter(
-        x=line_data['Date'], 
-        y=line_data['Count'], 
-        mode='lines+markers', 
-        name='Trend',
-        showlegend=False,
-        line=dict(color=colors[2], width=3),
-        marker=dict(size=8)
-    ), row=1, col=3)
+    with span('trend.aggregate'):
+        line_data = df.groupby(['Year', 'Month'])['Count'].sum().reset_index()
+        line_data['MonthNum'] = line_data['Month'].apply(lambda m: months.index(m))
+        line_data = line_data.sort_values(['Year', 'MonthNum'])
+        line_data['Date'] = line_data['Year'].astype(str) + '-' + line_data['Month']
+    with span('trend.figure'):
+        fig.add_trace(go.Scatter(
+            x=line_data['Date'], 
+            y=line_data['Count'], 
+            mode='lines+markers', 
+            name='Trend',
+            showlegend=False,
+            line=dict(color=colors[2], width=3),
+            marker=dict(size=8)
+        ), row=1, col=3)
+
+    # Flagged (Site, Category, Cause) series on top of the trend line
+    if anomalies is not None and len(anomalies):
+        with span('anomalies.overlay'):
+            flagged = analytics.summarize_by_period(anomalies).merge(
+                line_data[['Year', 'Month', 'Date', 'Count']], on=['Year', 'Month'])
+            fig.add_trace(go.Scatter(
+                x=flagged['Date'],
+                y=flagged['Count'],
+                mode='markers',
+                name='Anomalies',
+                showlegend=False,
+                marker=dict(size=12, color='#d62728', symbol='x'),
+                customdata=flagged['Anomalies'],
+                hovertext=flagged['Text'],
+                hovertemplate='<b>%{x}</b><br>%{customdata} anomalous series<br>%{hovertext}<extra></extra>'
+            ), row=1, col=3)
     
     # 4. Site chart (horizontal bar)
-    site_data = df.groupby('Site')['Count'].sum().reset_index().sort_values('Count', ascending=True)
-    fig.add_trace(go.Bar(
-        y=site_data['Site'], 
-        x=site_data['Count'], 
-        orientation='h', 
-        name='Site',
-        showlegend=False,
-        marker_color=colors[3]
-    ), row=2, col=1)
+    with span('site.aggregate'):
+        site_data = topk.top_k(df, 'Site', topk.limit_for(top_k, 'Site')).iloc[::-1]
+    with span('site.figure'):
+        fig.add_trace(go.Bar(
+            y=site_data['Site'], 
+            x=site_data['Count'], 
+            orientation='h', 
+            name='Site',
+            showlegend=False,
+            marker_color=colors[3]
+        ), row=2, col=1)
     
     # 5. Month distribution
-    month_data = df.groupby('Month')['Count'].sum().reset_index()
-    month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    month_data['MonthOrder'] = month_data['Month'].apply(lambda x: month_order.index(x))
-    month_data = month_data.sort_values('MonthOrder')
-    fig.add_trace(go.Bar(
-        x=month_data['Month'], 
-        y=month_data['Count'], 
-        name='Month',
-        showlegend=False,
-        marker_color=colors[4]
-    ), row=2, col=2)
+    with span('month.aggregate'):
+        month_data = df.groupby('Month')['Count'].sum().reset_index()
+        month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+        month_data['MonthOrder'] = month_data['Month'].apply(lambda x: month_order.index(x))
+        month_data = month_data.sort_values('MonthOrder')
+    with span('month.figure'):
+        fig.add_trace(go.Bar(
+            x=month_data['Month'], 
+            y=month_data['Count'], 
+            name='Month',
+            showlegend=False,
+            marker_color=colors[4]
+        ), row=2, col=2)
     
     # 6. Severity pie chart
-    sev_data = df.groupby('Severity')['Count'].sum().reset_index()
-    fig.add_trace(go.Pie(
-        labels=sev_data['Severity'], 
-        values=sev_data['Count'], 
-        name='Severity',
-        showlegend=True
-    ), row=2, col=3)
+    with span('severity.aggregate'):
+        sev_data = df.groupby('Severity')['Count'].sum().reset_index()
+    with span('severity.figure'):
+        fig.add_trace(go.Pie(
+            labels=sev_data['Severity'], 
+            values=sev_data['Count'], 
+            name='Severity',
+            showlegend=True
+        ), row=2, col=3)
     
     # Update layout
-    fig.update_layout(
-        title={
-            'text': 'AI Copilot Dashboard - Incident Analysis',
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': 24, 'family': 'Arial, sans-serif'}
-        },
-        height=800,
-        font=dict(size=12, family='Arial, sans-serif'),
-        showlegend=True,
-        plot_bgcolor='white',
-        paper_bgcolor='#f8f9fa'
-    )
+    with span('figure.layout'):
+        fig.update_layout(
+            title={
+                'text': 'AI Copilot Dashboard - Incident Analysis',
+                'x': 0.5,
+                'xanchor': 'center',
+                'font': {'size': 24, 'family': 'Arial, sans-serif'}
+            },
+            height=800,
+            font=dict(size=12, family='Arial, sans-serif'),
+            showlegend=True,
+            plot_bgcolor='white',
+            paper_bgcolor='#f8f9fa'
+        )
     
-    # Update x-axis labels for category and cause charts
-    fig.update_xaxes(tickangle=45, row=1, col=1)
-    fig.update_xaxes(tickangle=45, row=1, col=2)
-    fig.update_xaxes(tickangle=45, row=1, col=3)
-    fig.update_xaxes(tickangle=45, row=2, col=2)
+        # Update x-axis labels for category and cause charts
+        fig.update_xaxes(tickangle=45, row=1, col=1)
+        fig.update_xaxes(tickangle=45, row=1, col=2)
+        fig.update_xaxes(tickangle=45, row=1, col=3)
+        fig.update_xaxes(tickangle=45, row=2, col=2)
     
     return fig
 
-def generate_html():
+@span('generate_html')
+def generate_html(df=None, filename="dashboard.html", top_k=None, flag_anomalies=False, workers=1):
     """Generate the complete HTML page"""
+    import figure_codec
+
+    if df is None:
+        df = generate_data()
+
     print("🔄 Generating HTML dashboard...")
     
+    # Vectorized anomaly detection over every (Site, Category, Cause) series
+    anomalies = None
+    if flag_anomalies:
+        import analytics
+        with span('anomalies'):
+            anomalies = analytics.find_anomalies(df)
+        print(f"🔎 Flagged {len(anomalies)} anomalous points")
+
     # Create dashboard
-    dashboard_fig = create_dashboard()
+    dashboard_fig = create_dashboard(df, top_k=top_k, anomalies=anomalies, workers=workers)
     
     # Calculate statistics
-    total_records = len(df)
-    total_incidents = df['Count'].sum()
-    period = f"{df['Year'].min()} - {df['Year'].max()}"
-    sites_count = df['Site'].nunique()
-    categories_count = df['Category'].nunique()
+    with span('statistics'):
+        total_records = outofcore.record_count(df)
+        total_incidents = df['Count'].sum()
+        period = f"{df['Year'].min()} - {df['Year'].max()}"
+        sites_count = df['Site'].nunique()
+        categories_count = df['Category'].nunique()
+    
+    # Serialize the figure (compact typed/dictionary-encoded arrays)
+    with span('figure_div'):
+        plot_div = figure_codec.figure_div(dashboard_fig, include_plotlyjs=True)
     
     # Generate timestamp
     timestamp = datetime.now().strftime('%d/%m/%Y at %H:%M:%S')
@@ -334,7 +415,7 @@ def generate_html():
         </div>
         
         <div class="dashboard-container">
-            {pyo.plot(dashboard_fig, output_type='div', include_plotlyjs=True)}
+            {plot_div}
         </div>
         
         <div class="footer">
@@ -356,14 +437,33 @@ def generate_html():
 </html>"""
     
     # Save the dashboard
-    filename = "dashboard.html"
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    with span('write'):
+        watch.write_atomic(filename, html_content)
     
     print(f"✅ Dashboard saved as: {filename}")
     print(f"📊 Dashboard contains {total_records:,} records and {total_incidents:,} incidents")
     return filename
 
 if __name__ == "__main__":
-    generate_html()
-    print("🎉 Dashboard generation complete!")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate the static dashboard")
+    parser.add_argument('--top-k', type=topk.parse_k, metavar='K',
+                        help="Plot only the K largest categories, causes and sites, plus an \"Other\" bar")
+    parser.add_argument('--anomalies', action='store_true',
+                        help="Flag anomalous months of every (Site, Category, Cause) series on the trend chart")
+    synthetic.add_arguments(parser)
+    snapshot.add_arguments(parser)
+    watch.add_arguments(parser)
+    instrumentation.add_arguments(parser, default_profile='generate_dashboard.prof')
+    args = parser.parse_args()
+    watch.check_arguments(parser, args)
+
+    with instrumentation.instrumented(args):
+        if args.watch is not None:
+            # Rebuilt on every data change, from the partitions that changed
+            watch.watch(args.data, lambda df: generate_html(df, top_k=args.top_k, flag_anomalies=args.anomalies,
+                                                            workers=args.workers),
+                        interval=args.watch, chunk_rows=args.out_of_core or outofcore.CHUNK_ROWS)
+        else:
+            df = snapshot.load_data(generate_data, args)
+            generate_html(df, top_k=args.top_k, flag_anomalies=args.anomalies, workers=args.workers)
+            print("🎉 Dashboard generation complete!")
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Hierarchical drill-down index (Site → Category → Cause → Severity)
+
+``HierarchyIndex`` sorts the distinct level combinations of a frame once
+(the leaves of the hierarchy) and keeps, for every depth, where each node's
+leaves start, so a node is a contiguous range of leaves and its children
+are found by binary search. Each row is mapped to its leaf, so a crossfilter
+group keyed by leaf keeps the leaf sums current under every filter.
+
+A drill-down view only reads the leaves below its root: ``sunburst`` returns
+the root and the next ``depth`` levels, and deeper levels are fetched when a
+node is clicked. Nodes keep their ``limit`` largest children and fold the
+rest into an "Other" node, so views stay small with thousands of sites and
+causes.
+"""
+
+import topk
+
+LEVELS = ('Site', 'Category', 'Cause', 'Severity')
+# Levels shown below the root of a drill-down view
+DEPTH = 2
+# Children kept per node; the rest are summed into "Other"
+MAX_CHILDREN = 20
+ROOT_LABEL = 'Total'
+
+
+class HierarchyIndex:
+    """Sorted leaves of ``levels`` and the leaf range of every node"""
+
+    def __init__(self, df, levels=LEVELS):
+        import numpy as np
+        import pandas as pd
+
+        self.levels = list(levels)
+        codes, self.labels = [], []
+        for level in self.levels:
+            level_codes, labels = pd.factorize(df[level], sort=True)
+            codes.append(level_codes)
+            self.labels.append(np.asarray(labels, dtype=object))
+
+        # Rows in level order; a new leaf starts wherever any level changes
+        order = np.lexsort(codes[::-1])
+        ordered = np.stack([level_codes[order] for level_codes in codes])
+        changed = np.ones((len(self.levels), len(order)), dtype=bool)
+        changed[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        # Nodes of depth d start where any of the first d levels changes
+        changed = np.logical_or.accumulate(changed, axis=0)
+        first = np.flatnonzero(changed[-1])
+
+        self.n_leaves = len(first)
+        self.row_leaf = np.empty(len(order), dtype=np.int32 if self.n_leaves < 2 ** 31 else np.int64)
+        self.row_leaf[order] = np.cumsum(changed[-1]) - 1
+        # Level codes of every leaf, and where the nodes of each depth start among the leaves
+        self.leaf_codes = ordered[:, first]
+        self.starts = [np.flatnonzero(changed[depth][first]) for depth in range(len(self.levels))]
+
+    def node_range(self, path):
+        """``(start, stop)`` leaves below the node at ``path`` (empty when it does not exist)"""
+        import numpy as np
+
+        start, stop = 0, self.n_leaves
+        for depth, label in enumerate(path):
+            position = np.searchsorted(self.labels[depth], label)
+            if position == len(self.labels[depth]) or self.labels[depth][position] != label:
+                return 0, 0
+            codes = self.leaf_codes[depth][start:stop]
+            start, stop = start + np.searchsorted(codes, position), start + np.searchsorted(codes, position, 'right')
+        return int(start), int(stop)
+
+    def children(self, sums, path, limit=MAX_CHILDREN):
+        """``(labels, values)`` of the children of ``path`` with non-zero ``sums`` (one per leaf), largest first
+
+        Beyond the ``limit`` largest, children are summed into ``topk.OTHER_LABEL``.
+        """
+        import numpy as np
+
+        depth = len(path)
+        start, stop = self.node_range(path)
+        if depth == len(self.levels) or start == stop:
+            return [], []
+        starts = self.starts[depth]
+        child_starts = starts[np.searchsorted(starts, start):np.searchsorted(starts, stop)]
+        values = np.add.reduceat(sums[start:stop], child_starts - start)
+        labels = self.labels[depth][self.leaf_codes[depth][child_starts]]
+        nonzero = values != 0
+        return topk.top_k_values(labels[nonzero].tolist(), values[nonzero], limit)
+
+    def sunburst(self, sums, path=(), depth=DEPTH, limit=MAX_CHILDREN):
+        """Nodes of the view rooted at ``path``: ``{'ids', 'labels', 'parents', 'values', 'paths'}``
+
+        The root and ``depth`` levels below it, each node with its full
+        ``path``; "Other" nodes are not expanded.
+        """
+        path = list(path)
+        start, stop = self.node_range(path)
+        nodes = {'ids': [], 'labels': [], 'parents': [], 'values': [], 'paths': []}
+
+        def add(node_path, label, value, parent):
+            node_id = '/'.join([ROOT_LABEL] + node_path)
+            nodes['ids'].append(node_id)
+            nodes['labels'].append(label)
+            nodes['parents'].append(parent)
+            nodes['values'].append(value)
+            nodes['paths'].append(node_path)
+            return node_id
+
+        root = add(path, path[-1] if path else ROOT_LABEL, sums[start:stop].sum().item(), '')
+        level = [(path, root)]
+        for _ in range(depth):
+            below = []
+            for node_path, node_id in level:
+                for label, value in zip(*self.children(sums, node_path, limit)):
+                    if label == topk.OTHER_LABEL:
+                        # A sum of several nodes: nothing to drill into
+                        add(node_path + [label], label, value, node_id)
+                        continue
+                    child_path = node_path + [label]
+                    below.append((child_path, add(child_path, label, value, node_id)))
+            level = below
+        return nodes
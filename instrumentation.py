@@ -0,0 +1,123 @@
+"""
+Per-stage timing and memory instrumentation for the dashboard generators
+"""
+
+import contextlib
+import cProfile
+import json
+import time
+import tracemalloc
+
+# Recorded spans, in start order
+_spans = []
+# Open spans, innermost last
+_stack = []
+
+
+@contextlib.contextmanager
+def span(name):
+    """Record wall time, CPU time and (when tracemalloc is tracing) peak memory of a block"""
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # Fold the memory peak so far into the parent before resetting it for this span
+        _, peak = tracemalloc.get_traced_memory()
+        if _stack:
+            _stack[-1]['child_peak'] = max(_stack[-1]['child_peak'], peak)
+        tracemalloc.reset_peak()
+
+    entry = {
+        'name': name,
+        'parent': _stack[-1]['entry']['name'] if _stack else None,
+        'depth': len(_stack),
+        'wall_s': None,
+        'cpu_s': None,
+        'peak_bytes': None,
+    }
+    _spans.append(entry)
+    frame = {'entry': entry, 'child_peak': 0}
+    _stack.append(frame)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield entry
+    finally:
+        entry['wall_s'] = time.perf_counter() - wall_start
+        entry['cpu_s'] = time.process_time() - cpu_start
+        _stack.pop()
+
+        if tracing and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            entry['peak_bytes'] = max(peak, frame['child_peak'])
+            if _stack:
+                _stack[-1]['child_peak'] = max(_stack[-1]['child_peak'], entry['peak_bytes'])
+
+
+def get_spans():
+    """Return the recorded spans in start order (parents before their children)"""
+    return [dict(entry) for entry in _spans]
+
+
+def reset():
+    """Forget every recorded span"""
+    _spans.clear()
+    _stack.clear()
+
+
+def print_report():
+    """Print the recorded spans as an indented table"""
+    print("⏱️ Stage timings:")
+    print(f"   {'stage':<40} {'wall ms':>10} {'cpu ms':>10} {'peak MB':>10}")
+    for entry in get_spans():
+        label = '  ' * entry['depth'] + entry['name']
+        peak = '' if entry['peak_bytes'] is None else f"{entry['peak_bytes'] / 1e6:.1f}"
+        print(f"   {label:<40} {entry['wall_s'] * 1000:>10.1f} {entry['cpu_s'] * 1000:>10.1f} {peak:>10}")
+
+
+def write_json(path):
+    """Write the recorded spans to a JSON file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'spans': get_spans()}, f, indent=2)
+
+
+@contextlib.contextmanager
+def profiled(path):
+    """Run a block under cProfile and dump pstats to ``path`` (snakeviz/flameprof compatible)"""
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"✅ Profile saved as: {path}")
+
+
+def add_arguments(parser, default_profile):
+    """Register the shared instrumentation flags on an argparse parser"""
+    parser.add_argument('--profile', nargs='?', const=default_profile, default=None,
+                        help=f"Dump cProfile stats (default file: {default_profile})")
+    parser.add_argument('--timings', nargs='?', const='', default=None,
+                        help="Print per-stage timings and optionally write them to a JSON file")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Record tracemalloc peaks for every stage (slower)")
+
+
+@contextlib.contextmanager
+def instrumented(args):
+    """Apply the flags from ``add_arguments`` around a generator run"""
+    if args.trace_memory:
+        tracemalloc.start()
+    try:
+        with profiled(args.profile):
+            yield
+    finally:
+        if args.trace_memory:
+            tracemalloc.stop()
+        if args.timings is not None:
+            print_report()
+            if args.timings:
+                write_json(args.timings)
+                print(f"✅ Timings saved as: {args.timings}")
@@ -0,0 +1,121 @@
+"""
+Lazy, viewport-driven chart loading for the static dashboard
+
+``write_lazy_charts`` splits the dashboard's subplot grid into one figure
+per chart and writes each as a small JSON file in a directory next to the
+page, together with the layout they share (template, fonts, colors) and
+plotly.js. The page itself only holds fixed-size placeholders, the figure
+decoder and ``assets/lazy_charts.js``, which fetches and draws a chart when
+its placeholder scrolls into view. plotly.js is only downloaded with the
+first visible chart, so the page paints before any chart work starts.
+
+Browsers do not ``fetch`` from ``file://`` pages, so the output must be
+served over HTTP (``python -m http.server``).
+"""
+
+import html
+import os
+
+import figure_codec
+import watch
+
+LOADER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'lazy_charts.js')
+
+CHART_HEIGHT = 450
+LAYOUT_FILE = 'layout.json'
+
+
+def loader_js():
+    """Source of the browser-side loader and page timings"""
+    with open(LOADER_PATH, encoding='utf-8') as f:
+        return f.read()
+
+
+def _cell(domain, rows, cols):
+    """``(row, col)`` of the grid cell holding an ``{'x': [start, end], 'y': [start, end]}`` domain"""
+    x = (domain['x'][0] + domain['x'][1]) / 2
+    y = (domain['y'][0] + domain['y'][1]) / 2
+    return rows - 1 - min(int(y * rows), rows - 1), min(int(x * cols), cols - 1)
+
+
+def split_subplots(fig, rows, cols, height=CHART_HEIGHT):
+    """Split a ``make_subplots`` figure (or its plain dict) into ``(shared layout, charts)``
+
+    ``charts`` holds one ``{'title', 'data', 'layout'}`` figure per grid cell
+    with traces, in row-major order; each keeps the styling of its subplot
+    axes, and its title is the cell's subplot title. The layout settings
+    common to every chart are returned once as the shared layout.
+
+    Cells are found from the axis and trace domains, so the figure does not
+    need to be a graph object.
+    """
+    figure = fig if isinstance(fig, dict) else fig.to_plotly_json()
+    layout = figure['layout']
+    # make_subplots centers each subplot title above its cell
+    titles = {}
+    for annotation in layout.get('annotations', ()):
+        titles.setdefault(_cell({'x': [annotation['x']] * 2, 'y': [annotation['y']] * 2}, rows, cols),
+                          annotation.get('text', ''))
+    shared = {key: value for key, value in layout.items()
+              if key not in ('annotations', 'title', 'height') and not key.startswith(('xaxis', 'yaxis'))}
+    shared['margin'] = dict(shared.get('margin', {}), t=60)
+
+    cells = {}
+    for trace in figure['data']:
+        trace = dict(trace)
+        if 'domain' in trace:
+            cell, axes = _cell(trace.pop('domain'), rows, cols), {}
+        else:
+            # Trace axis 'x2' -> layout['xaxis2']
+            axes = {key: layout[key + trace.pop(key, key[0])[1:]] for key in ('xaxis', 'yaxis')}
+            cell = _cell({'x': axes['xaxis']['domain'], 'y': axes['yaxis']['domain']}, rows, cols)
+        chart = cells.setdefault(cell, {'axes': axes, 'data': []})
+        chart['data'].append(trace)
+
+    charts = []
+    for cell in sorted(cells):
+        title = titles.get(cell, '')
+        chart_layout = {'height': height, 'title': {'text': title, 'x': 0.5, 'xanchor': 'center',
+                                                    'font': {'size': 16}}}
+        for name, axis in cells[cell]['axes'].items():
+            chart_layout[name] = {key: value for key, value in axis.items() if key not in ('domain', 'anchor')}
+        charts.append({'title': title, 'data': cells[cell]['data'], 'layout': chart_layout})
+    return shared, charts
+
+
+def write_lazy_charts(fig, directory, rows, cols, base_url=None, height=CHART_HEIGHT):
+    """Write the charts of ``fig`` to ``directory``, return ``(placeholder html, bytes per file)``
+
+    ``base_url`` is the directory as seen from the page (default: its name).
+    """
+    os.makedirs(directory, exist_ok=True)
+    base_url = base_url if base_url is not None else os.path.basename(os.path.normpath(directory))
+    sizes = {}
+
+    def write(name, text):
+        # Atomic, so a page open while the dashboard is rebuilt never reads half a file
+        watch.write_atomic(os.path.join(directory, name), text)
+        sizes[name] = os.path.getsize(os.path.join(directory, name))
+
+    shared, charts = split_subplots(fig, rows, cols, height)
+    write(LAYOUT_FILE, figure_codec.to_json(shared))
+    placeholders = []
+    for i, chart in enumerate(charts, 1):
+        name = f'chart-{i}.json'
+        write(name, figure_codec.to_json(figure_codec.encode_figure(chart)))
+        placeholders.append(
+            f'<div id="chart-{i}" class="lazy-chart lazy-chart-pending" data-src="{name}" '
+            f'style="height:{height}px;" aria-label="{html.escape(chart["title"])}"></div>')
+
+    # Versioned name: browsers can cache it, and regenerating the page does not rewrite it
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+    plotly_file = f'plotly-{get_plotlyjs_version()}.min.js'
+    plotly_path = os.path.join(directory, plotly_file)
+    if not os.path.exists(plotly_path):
+        write(plotly_file, get_plotlyjs())
+    sizes[plotly_file] = os.path.getsize(plotly_path)
+
+    grid = (f'<div class="lazy-chart-grid" data-base="{html.escape(base_url.rstrip("/") + "/")}" '
+            f'data-plotly="{plotly_file}" data-layout="{LAYOUT_FILE}">\n'
+            + '\n'.join(placeholders) + '\n</div>')
+    return f"<script>{figure_codec.decoder_js()}</script>\n" + grid, sizes
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Concurrent-user load test of the Dash app
+
+Starts ``Untitled-1.py`` locally (or uses ``--url``) and has ``--users``
+simulated analysts drive the ``/_dash-update-component`` endpoint the way
+the browser does. Every virtual user repeatedly changes one of the seven
+filter dropdowns at random (a few options, or clears it) and fires the
+server callbacks that the change triggers, in the renderer's order: the
+approximate-mode store, the record table, the export links and the
+hierarchy, then the exact figures. Callback payloads are built from the app's own
+``/_dash-dependencies`` and layout, so they follow the app as it changes.
+
+Reports throughput, p50/p95/p99 latency and mean response bytes on the
+wire per callback and per whole interaction (filter change to exact
+figures). Requests accept the encodings of ``compression`` (gzip, and
+Brotli when installed); ``--accept-encoding identity`` measures the same
+load uncompressed. ``--link MBIT:RTT_MS`` adds to every request the time a
+link of that bandwidth and round-trip time would take to carry it (one
+round trip plus the request and response bytes at the link rate), so runs
+with and without compression can be compared for slow connections.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import compression
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = 8051
+
+# Filter dropdowns of the sidebar, in FILTER_COLUMNS order
+FILTERS = ['filter-category', 'filter-site', 'filter-month', 'filter-cause', 'filter-severity', 'filter-year',
+           'filter-status']
+# Callback name -> one of its outputs, to find it in /_dash-dependencies
+CALLBACKS = {
+    'fill_filter_options': 'filter-category.options',
+    'update_all_graphs_approx': 'approx-store.data',
+    'update_detail_table': 'detail-table.data',
+    'update_export_links': 'export-csv.href',
+    'update_hierarchy': 'hierarchy.figure',
+    'update_all_graphs': 'figures-store.data',
+}
+# Callbacks fired by a filter change, in the order the renderer sends them
+INTERACTION = ['update_all_graphs_approx', 'update_detail_table', 'update_export_links', 'update_hierarchy',
+               'update_all_graphs']
+INTERACTION_NAME = 'interaction'
+
+
+def default_accept_encoding():
+    """``Accept-Encoding`` of a browser, limited to the encodings this Python can decode"""
+    return ', '.join(compression.available_encodings())
+
+
+def parse_link(text):
+    """``MBIT:RTT_MS`` -> ``(bits_per_second, round_trip_seconds)``"""
+    try:
+        mbit, round_trip_ms = (float(part) for part in text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MBIT:RTT_MS, e.g. 2:100, not {text!r}") from None
+    if mbit <= 0 or round_trip_ms < 0:
+        raise argparse.ArgumentTypeError("the bandwidth must be positive and the round trip not negative")
+    return mbit * 1e6, round_trip_ms / 1000
+
+
+def percentile(values, q):
+    """``q``-th percentile (0-100) of ``values``, interpolated"""
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def output_ids(output):
+    """``(id, property)`` pairs of a dependency's output string (``..a.b...c.d..`` for several outputs)"""
+    parts = output.strip('.').split('...') if output.startswith('..') else [output]
+    return [tuple(part.rsplit('.', 1)) for part in parts]
+
+
+def layout_values(layout):
+    """``{'id.prop': value}`` for every property of every component with an id in a layout tree"""
+    values = {}
+    stack = [layout]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict) and 'props' in node:
+            props = node['props']
+            if isinstance(props.get('id'), str):
+                for prop, value in props.items():
+                    values[f"{props['id']}.{prop}"] = value
+            stack.extend(value for value in props.values() if isinstance(value, (dict, list)))
+    return values
+
+
+class Callback:
+    """Builds the ``/_dash-update-component`` request of one server callback"""
+
+    def __init__(self, dependency):
+        self.output = dependency['output']
+        self.outputs = output_ids(self.output)
+        self.inputs = [(item['id'], item['property']) for item in dependency['inputs']]
+        self.state = [(item['id'], item['property']) for item in dependency['state']]
+
+    def body(self, values, changed):
+        """Request body with the current ``values`` after ``changed`` (``id.prop`` keys) changed"""
+        def items(pairs):
+            return [{'id': id_, 'property': prop, 'value': values.get(f'{id_}.{prop}')} for id_, prop in pairs]
+
+        outputs = [{'id': id_, 'property': prop} for id_, prop in self.outputs]
+        return {
+            'output': self.output,
+            'outputs': outputs if self.output.startswith('..') else outputs[0],
+            'inputs': items(self.inputs),
+            'state': items(self.state),
+            'changedPropIds': list(changed),
+        }
+
+
+class VirtualUser:
+    """One analyst: a connection, the page's property values and a random filter sequence"""
+
+    def __init__(self, base_url, callbacks, values, seed, think_time=0.0, accept_encoding=None, link=None):
+        parts = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+        self.prefix = parts.path.rstrip('/')
+        self.callbacks = callbacks
+        self.values = dict(values)
+        self.random = random.Random(seed)
+        self.think_time = think_time
+        self.accept_encoding = accept_encoding or default_accept_encoding()
+        self.link = link
+
+    def call(self, name, changed):
+        """Send one callback, apply its response to the page values, return ``(seconds, ok, wire_bytes)``"""
+        body = json.dumps(self.callbacks[name].body(self.values, changed)).encode('utf-8')
+        start = time.perf_counter()
+        try:
+            self.connection.request('POST', f'{self.prefix}/_dash-update-component', body,
+                                    {'Content-Type': 'application/json', 'Accept-Encoding': self.accept_encoding})
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return time.perf_counter() - start, False, 0
+        elapsed = time.perf_counter() - start
+        if self.link:
+            bits_per_second, round_trip = self.link
+            elapsed += round_trip + (len(body) + len(data)) * 8 / bits_per_second
+        if response.status == 204:
+            # PreventUpdate: nothing changed
+            return elapsed, True, len(data)
+        if response.status != 200:
+            return elapsed, False, len(data)
+        wire_bytes = len(data)
+        data = compression.decompress(data, response.getheader('Content-Encoding'))
+        for id_, props in json.loads(data).get('response', {}).items():
+            for prop, value in props.items():
+                self.values[f'{id_}.{prop}'] = value
+        return elapsed, True, wire_bytes
+
+    def change_filter(self):
+        """Pick a dropdown and new values for it, like an analyst narrowing or widening a query"""
+        dropdown = self.random.choice(FILTERS)
+        options = [option['value'] for option in self.values.get(f'{dropdown}.options') or []]
+        if not options or self.random.random() < 0.3:
+            value = None
+        else:
+            value = self.random.sample(options, self.random.randint(1, min(3, len(options))))
+        self.values[f'{dropdown}.value'] = value
+        return f'{dropdown}.value'
+
+    def interact(self, record):
+        """One filter change and the callbacks it triggers; ``record(name, seconds, ok, wire_bytes)`` gets every call"""
+        changed = self.change_filter()
+        total, total_bytes = 0.0, 0
+        all_ok = True
+        for name in INTERACTION:
+            # The exact figures are triggered by the approximate store, the others by the dropdown
+            trigger = ['approx-store.data'] if name == 'update_all_graphs' else [changed]
+            elapsed, ok, wire_bytes = self.call(name, trigger)
+            record(name, elapsed, ok, wire_bytes)
+            total += elapsed
+            total_bytes += wire_bytes
+            all_ok = all_ok and ok
+        # The callbacks run one after the other, so the interaction takes their sum
+        record(INTERACTION_NAME, total, all_ok, total_bytes)
+        if self.think_time:
+            time.sleep(self.random.expovariate(1 / self.think_time))
+
+
+class Recorder:
+    """Thread-safe latency samples, response bytes and error counts per callback"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.wire_bytes = {}
+        self.errors = {}
+
+    def __call__(self, name, seconds, ok, wire_bytes=0):
+        with self.lock:
+            if ok:
+                self.latencies.setdefault(name, []).append(seconds)
+                self.wire_bytes.setdefault(name, []).append(wire_bytes)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, duration):
+        """One row per callback: requests, throughput, latency percentiles (ms), mean response bytes and errors"""
+        rows = []
+        for name in INTERACTION + [INTERACTION_NAME]:
+            samples = self.latencies.get(name, [])
+            errors = self.errors.get(name, 0)
+            row = {'name': name, 'requests': len(samples) + errors, 'errors': errors,
+                   'throughput': (len(samples) + errors) / duration}
+            if samples:
+                row.update({'mean_ms': statistics.fmean(samples) * 1000,
+                            **{f'p{q}_ms': percentile(samples, q) * 1000 for q in (50, 95, 99)},
+                            'wire_bytes': statistics.fmean(self.wire_bytes[name])})
+            rows.append(row)
+        return rows
+
+
+def fetch_json(base_url, path):
+    """GET a JSON document from the app"""
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    try:
+        connection.request('GET', parts.path.rstrip('/') + path)
+        response = connection.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"GET {path}: HTTP {response.status}")
+        return json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def start_app(port, app_args, timeout=300):
+    """Start ``Untitled-1.py`` on ``port`` and wait until it serves its layout"""
+    command = [sys.executable, os.path.join(REPO_DIR, 'Untitled-1.py'), '--no-debug', '--port', str(port),
+               *app_args]
+    process = subprocess.Popen(command, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Untitled-1.py exited with status {process.returncode}")
+        try:
+            fetch_json(base_url, '/_dash-layout')
+            return process, base_url
+        except (OSError, RuntimeError, http.client.HTTPException):
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Untitled-1.py did not answer on port {port} within {timeout} s")
+
+
+def prepare(base_url):
+    """Callbacks and initial page values, with the dropdown options loaded like on page load"""
+    dependencies = fetch_json(base_url, '/_dash-dependencies')
+    callbacks = {}
+    for name, output in CALLBACKS.items():
+        matches = [Callback(dep) for dep in dependencies
+                   if output in (f'{id_}.{prop}'.split('@')[0] for id_, prop in output_ids(dep['output']))]
+        if not matches:
+            raise RuntimeError(f"callback {name} ({output}) not found in /_dash-dependencies")
+        callbacks[name] = matches[0]
+    values = layout_values(fetch_json(base_url, '/_dash-layout'))
+    loader = VirtualUser(base_url, callbacks, values, seed=0)
+    _, ok, _ = loader.call('fill_filter_options', ['filter-category.options'])
+    if not ok:
+        raise RuntimeError("could not load the filter options")
+    return callbacks, loader.values
+
+
+def run_load(base_url, users=4, duration=30.0, think_time=0.0, seed=0, accept_encoding=None, link=None):
+    """Drive the app with ``users`` concurrent virtual users for ``duration`` seconds, return the summary
+
+    ``link`` is ``(bits_per_second, round_trip_seconds)`` of a simulated connection (see the module docstring).
+    """
+    callbacks, values = prepare(base_url)
+    recorder = Recorder()
+    stop = threading.Event()
+
+    def run_user(index):
+        user = VirtualUser(base_url, callbacks, values, seed=seed * 1000 + index, think_time=think_time,
+                           accept_encoding=accept_encoding, link=link)
+        while not stop.is_set():
+            user.interact(recorder)
+
+    threads = [threading.Thread(target=run_user, args=(i,), daemon=True) for i in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        # Let every user finish its interaction, so no request is cut off
+        thread.join()
+    return recorder.summary(time.perf_counter() - start)
+
+
+def print_summary(rows, users):
+    print(f"📊 {users} concurrent user(s)")
+    print(f"  {'callback':<26} {'requests':>9} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'KB/resp':>9} {'errors':>7}")
+    for row in rows:
+        if 'p50_ms' not in row:
+            print(f"  {row['name']:<26} {row['requests']:>9} {row['throughput']:>8.1f} {'-':>9} {'-':>9} {'-':>9} "
+                  f"{'-':>9} {row['errors']:>7}")
+            continue
+        print(f"  {row['name']:<26} {row['requests']:>9} {row['throughput']:>8.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['wire_bytes'] / 1e3:>9.1f} {row['errors']:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load test the Dash app with concurrent simulated analysts",
+        epilog="Arguments after -- are passed to Untitled-1.py, e.g. -- --scale 10 --sample-rate 0.01")
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 4, 16],
+                        help="Concurrent users; several values run one stage each (default: 1 4 16)")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds per stage")
+    parser.add_argument('--think-time', type=float, default=0, metavar='SECONDS',
+                        help="Mean pause between a user's interactions (exponential); 0 = back to back")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the filter sequences")
+    parser.add_argument('--url', help="Load test a running app instead of starting Untitled-1.py")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port of the app started for the test")
+    parser.add_argument('--accept-encoding', nargs='+', default=[default_accept_encoding()], metavar='ENCODINGS',
+                        help="Accept-Encoding of the requests; several values run every stage once each, e.g. "
+                             f"identity '{default_accept_encoding()}' (default: {default_accept_encoding()})")
+    parser.add_argument('--link', type=parse_link, metavar='MBIT:RTT_MS',
+                        help="Add the transfer time of a link of MBIT Mbit/s and RTT_MS ms round trip to every "
+                             "request, e.g. 2:100")
+    parser.add_argument('--output', help="Write the results as JSON")
+    parser.add_argument('app_args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    app_args = args.app_args[1:] if args.app_args[:1] == ['--'] else args.app_args
+
+    process = None
+    if args.url:
+        base_url = args.url
+    else:
+        print(f"🔄 Starting Untitled-1.py on port {args.port}...")
+        process, base_url = start_app(args.port, app_args)
+    try:
+        stages = []
+        for users in args.users:
+            for accept_encoding in args.accept_encoding:
+                print(f"🔄 {users} user(s) for {args.duration:g} s against {base_url} "
+                      f"(Accept-Encoding: {accept_encoding})...")
+                rows = run_load(base_url, users, args.duration, args.think_time, args.seed, accept_encoding,
+                                args.link)
+                print_summary(rows, users)
+                stages.append({'users': users, 'duration_s': args.duration, 'accept_encoding': accept_encoding,
+                               'callbacks': rows})
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            link = {'mbit': args.link[0] / 1e6, 'round_trip_ms': args.link[1] * 1000} if args.link else None
+            json.dump({'url': base_url, 'think_time_s': args.think_time, 'link': link, 'app_args': app_args,
+                       'stages': stages}, f, indent=2)
+        print(f"✅ Results saved as: {args.output}")
+    errors = sum(row['errors'] for stage in stages for row in stage['callbacks'])
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
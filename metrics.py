@@ -0,0 +1,241 @@
+"""
+Runtime metrics for the Dash app in the Prometheus text exposition format
+"""
+
+import functools
+import os
+import resource
+import threading
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+ROWS_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+_lock = threading.Lock()
+_registry = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for a labelled metric family"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        _registry.append(self)
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with _lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def samples(self):
+        with _lock:
+            children = list(self._children.items())
+        for key, child in children:
+            yield from child.samples(self.name, dict(zip(self.labelnames, key)))
+
+    def render(self):
+        family = f'{self.name}_total' if self.kind == 'counter' else self.name
+        lines = [f'# HELP {family} {self.documentation}', f'# TYPE {family} {self.kind}']
+        lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}'
+                     for name, labels, value in self.samples())
+        return '\n'.join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with _lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield f'{name}_total', labels, self.value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class _GaugeChild:
+    def __init__(self, func=None):
+        self.value = 0.0
+        self.func = func
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        yield name, labels, self.func() if self.func else self.value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally computed at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), func=None):
+        self._func = func
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _GaugeChild(self._func)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            yield f'{name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+        yield f'{name}_sum', labels, self.sum
+        yield f'{name}_count', labels, cumulative
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+def process_rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # No procfs (macOS): fall back to the peak RSS, reported in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+CALLBACK_LATENCY = Histogram(
+    'dashboard_callback_latency_seconds', 'Wall time spent inside a Dash callback.', ['callback'])
+CALLBACK_ERRORS = Counter(
+    'dashboard_callback_errors', 'Dash callback invocations that raised.', ['callback'])
+RESPONSE_BYTES = Histogram(
+    'dashboard_response_bytes', 'Size of Dash callback response payloads.', ['callback'], buckets=SIZE_BUCKETS)
+WIRE_BYTES = Histogram(
+    'dashboard_response_wire_bytes', 'Bytes sent for Dash callback responses, after compression.', ['callback'],
+    buckets=SIZE_BUCKETS)
+ROWS_SCANNED = Histogram(
+    'dashboard_rows_scanned', 'Rows scanned per callback invocation.', ['callback'], buckets=ROWS_BUCKETS)
+CACHE_REQUESTS = Counter(
+    'dashboard_cache_requests', 'Cache lookups by cache name and result (hit or miss).', ['cache', 'result'])
+PROCESS_RSS = Gauge(
+    'process_resident_memory_bytes', 'Resident memory size in bytes.', func=process_rss_bytes)
+PROCESS_RSS.labels()
+
+
+def timed(callback_name):
+    """Decorator recording latency, errors and response size of a Dash callback"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _tag_request(callback_name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as exc:
+                if type(exc).__name__ != 'PreventUpdate':
+                    CALLBACK_ERRORS.labels(callback=callback_name).inc()
+                raise
+            finally:
+                CALLBACK_LATENCY.labels(callback=callback_name).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record_rows_scanned(callback_name, rows):
+    """Record how many rows a callback had to scan"""
+    ROWS_SCANNED.labels(callback=callback_name).observe(rows)
+
+
+def record_cache(cache_name, hit):
+    """Record a cache lookup so the hit rate can be derived"""
+    CACHE_REQUESTS.labels(cache=cache_name, result='hit' if hit else 'miss').inc()
+
+
+def _tag_request(callback_name):
+    # Remember which callback served this request so the response size can be attributed
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        return
+    if has_request_context():
+        g.dashboard_callback = callback_name
+
+
+def render():
+    """Render every registered metric in the text exposition format"""
+    return '\n'.join(metric.render() for metric in _registry) + '\n'
+
+
+def install(server, path='/metrics'):
+    """Mount the metrics endpoint and response-size tracking on a Flask server"""
+    from flask import Response, g
+
+    @server.after_request
+    def _record_response_size(response):
+        callback_name = g.get('dashboard_callback')
+        if callback_name and not response.direct_passthrough:
+            # compression.install keeps the size before compression in g
+            sent = response.calculate_content_length() or 0
+            RESPONSE_BYTES.labels(callback=callback_name).observe(g.get('uncompressed_bytes', sent))
+            WIRE_BYTES.labels(callback=callback_name).observe(sent)
+        return response
+
+    @server.route(path)
+    def _metrics():
+        return Response(render(), mimetype=None, content_type=CONTENT_TYPE)
+
+    return server
@@ -0,0 +1,101 @@
+"""
+Out-of-core map-reduce aggregation of incident files bigger than memory
+
+Every chart of the dashboards is a sum of ``Count`` over some of the label
+columns, so a file can be reduced to one row per distinct combination of
+its labels without changing any chart. ``aggregate_file`` reads the file in
+row chunks (CSV with pandas, Parquet and Feather with pyarrow), sums each
+chunk by those labels (map) and merges the partial sums (reduce), so peak
+memory is one chunk plus the groups, whatever the size of the file. The
+result is an ordinary incident frame, with a ``Records`` column counting
+the input rows behind each group.
+"""
+
+import os
+
+CHUNK_ROWS = 1_000_000
+# Input rows summed into each group of the reduced frame
+RECORDS = 'Records'
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS, columns=None):
+    """Yield a CSV, Parquet or Feather file as frames of at most ``chunk_rows`` rows"""
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        yield from pd.read_csv(path, chunksize=chunk_rows, usecols=columns)
+    elif extension == '.parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    elif extension in ('.feather', '.arrow'):
+        import pyarrow as pa
+
+        # Memory-mapped: only the batches being summed are paged in
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunk_rows):
+                    yield batch.slice(start, chunk_rows).to_pandas()
+    else:
+        raise ValueError(f"unknown dataset extension {extension!r} (expected .csv, .parquet or .feather)")
+
+
+def partial_sums(chunk, by, value='Count'):
+    """Map step: ``value`` and ``RECORDS`` summed by ``by`` within one chunk"""
+    if RECORDS not in chunk:
+        chunk = chunk.assign(**{RECORDS: 1})
+    return chunk.groupby(by, observed=True, sort=False, dropna=False)[[value, RECORDS]].sum()
+
+
+def merge_sums(partials, value='Count'):
+    """Reduce step: add up partial sums indexed by the same group keys"""
+    import pandas as pd
+
+    if len(partials) == 1:
+        return partials[0]
+    merged = pd.concat(partials)
+    return merged.groupby(level=list(range(merged.index.nlevels)), observed=True, sort=False,
+                          dropna=False)[[value, RECORDS]].sum()
+
+
+def aggregate_chunks(chunks, by=None, value='Count'):
+    """Sum ``value`` by ``by`` (every other column by default) over an iterable of frames
+
+    Partial sums are merged as soon as they hold as many groups as the
+    merged result, so no more than about twice the group count is kept
+    besides the chunk being read.
+    """
+    reduced, partials, pending = None, [], 0
+    for chunk in chunks:
+        if by is None:
+            by = [column for column in chunk.columns if column not in (value, RECORDS)]
+        partial = partial_sums(chunk, by, value)
+        partials.append(partial)
+        pending += len(partial)
+        if reduced is None or pending >= len(reduced):
+            reduced = merge_sums(([reduced] if reduced is not None else []) + partials, value)
+            partials, pending = [], 0
+    if reduced is None:
+        raise ValueError("no rows to aggregate")
+    if partials:
+        reduced = merge_sums([reduced] + partials, value)
+    frame = reduced.reset_index()
+    # Group keys come back in the order they were met; sort them like a groupby would
+    return frame.sort_values(by, kind='stable', ignore_index=True)
+
+
+def aggregate_file(path, by=None, value='Count', chunk_rows=CHUNK_ROWS):
+    """Reduce a file of any size to one row per distinct ``by`` combination, reading ``chunk_rows`` at a time"""
+    columns = None if by is None else list(by) + [value]
+    return aggregate_chunks(iter_chunks(path, chunk_rows, columns), by, value)
+
+
+def record_count(df):
+    """Input rows behind ``df``: its length, or the ``RECORDS`` total of a reduced frame"""
+    return int(df[RECORDS].sum()) if RECORDS in df else len(df)
@@ -0,0 +1,80 @@
+"""
+Multi-core partitioned group-by for the chart aggregations
+
+The rows are split into contiguous ranges, one per worker process; every
+worker sums ``Count`` by the chart columns over its range (the map step of
+``outofcore``) and the partial sums are merged. The result has one row per
+distinct combination of the chart columns, so the per-chart groupbys that
+follow run over a few thousand groups instead of every row.
+
+On platforms that fork, workers read the frame inherited from the parent
+and only the small partial sums cross process boundaries; elsewhere the
+frame is sent to each worker once.
+"""
+
+import outofcore
+
+# Every column the static dashboards group by
+CHART_COLUMNS = ['Category', 'Cause', 'Site', 'Year', 'Month', 'Severity']
+# Below this many rows per partition a worker process costs more than it saves
+MIN_PARTITION_ROWS = 250_000
+
+# Frame shared with the worker processes
+_frame = None
+
+
+def partitions(n_rows, n_parts):
+    """``n_parts`` contiguous ``(start, stop)`` row ranges of about the same size"""
+    bounds = [n_rows * i // n_parts for i in range(n_parts + 1)]
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+
+def _init_worker(frame):
+    global _frame
+    _frame = frame
+
+
+def _sum_partition(args):
+    start, stop, by, value = args
+    return outofcore.partial_sums(_frame.iloc[start:stop], by, value)
+
+
+def worker_count(n_rows, workers):
+    """Workers actually used for ``n_rows`` rows: at most one per ``MIN_PARTITION_ROWS``"""
+    return max(1, min(workers or 1, n_rows // MIN_PARTITION_ROWS))
+
+
+def aggregate_frame(df, by=CHART_COLUMNS, value='Count', workers=1):
+    """``df`` summed by ``by`` over row partitions in ``workers`` processes, as a reduced incident frame
+
+    Like ``outofcore.aggregate_file``, the result has a ``Records`` column
+    (the sum of ``df``'s own ``Records`` when it is already reduced) and
+    gives the same sums as ``df`` for any grouping of ``by``. A single
+    worker or partition is summed in this process, without a pool.
+    """
+    import multiprocessing
+
+    by = list(by)
+    # An already reduced frame keeps its own record counts
+    columns = by + [value] + ([outofcore.RECORDS] if outofcore.RECORDS in df else [])
+    workers = worker_count(len(df), workers)
+    ranges = partitions(len(df), workers)
+    if workers <= 1 or len(ranges) <= 1:
+        return outofcore.aggregate_chunks([df[columns]], by, value)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    tasks = [(start, stop, by, value) for start, stop in ranges]
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Forked workers see the frame set here without copying it through a pipe
+        _init_worker(df)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                parts = list(pool.map(_sum_partition, tasks))
+        finally:
+            _init_worker(None)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df[columns],)) as pool:
+            parts = list(pool.map(_sum_partition, tasks))
+    frame = outofcore.merge_sums(parts, value).reset_index()
+    return frame.sort_values(by, kind='stable', ignore_index=True)
@@ -0,0 +1,284 @@
+"""
+Result cache of the Dash figures, warmed at startup and prefetched while idle
+
+Every exact figure payload is cached under its filter state (dropdown
+values, chart selections and trend zoom, in a canonical form so that value
+order and empty lists do not matter). The states users ask for are counted
+in an access log persisted as JSON, and a background thread:
+
+- warms the cache at startup with the most frequent states of the log, so
+  the first users after a deploy hit a warm cache;
+- after each request, while no request is running, precomputes the states
+  one dropdown change away from it (each option alone in one dropdown, or
+  one dropdown cleared), the most frequent ones first. The request only
+  hands its state over; the thread ranks the neighbours.
+
+The thread computes one state at a time and only after ``IDLE_SECONDS``
+without requests, so real clicks never queue behind a speculative one for
+longer than one computation.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+import metrics
+import watch
+
+# Figure payloads kept in memory (about 50 KB each)
+MAX_RESULTS = 256
+# Most frequent states of the access log computed at startup
+WARM_STATES = 20
+# States one change away from the last request precomputed while idle
+MAX_ADJACENT = 64
+# Seconds without requests before speculative work starts
+IDLE_SECONDS = 0.5
+# Seconds between two saves of the access log
+SAVE_SECONDS = 30
+# States kept in the access log; it grows to twice this before being pruned
+MAX_STATES = 1000
+DEFAULT_LOG = 'access_log.json'
+
+
+def normalize(filters, selection=None):
+    """Canonical ``(filters, selection)``: empty values as None, values sorted, empty selections dropped"""
+    filters = tuple(sorted(values, key=str) if values else None for values in filters)
+    selection = {chart: labels for chart, labels in sorted((selection or {}).items()) if labels}
+    return filters, selection
+
+
+def state_key(filters, selection=None, view=None):
+    """Cache key of a filter state"""
+    filters, selection = normalize(filters, selection)
+    return json.dumps([filters, selection, view], sort_keys=True, default=str)
+
+
+class ResultCache:
+    """Thread-safe LRU of payloads by state key, recorded in the ``metrics`` cache counters"""
+
+    def __init__(self, max_results=MAX_RESULTS, name='figures'):
+        self.max_results = max_results
+        self.name = name
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._results
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key, record=True):
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+        if record:
+            metrics.record_cache(self.name, result is not None)
+        return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+
+class AccessLog:
+    """Request counts per filter state, loaded from and saved to a JSON file
+
+    At most ``max_states`` states are saved, the most requested ones. In
+    memory the log grows to twice that, then every count is halved and the
+    states below one half request, and beyond the ``max_states`` most
+    requested, are dropped; so old favourites fade and new states get time
+    to build up a count.
+    """
+
+    def __init__(self, path=None, max_states=MAX_STATES):
+        self.path = path
+        self.max_states = max_states
+        self.states = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.states = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️ Ignoring unreadable access log {path}")
+
+    def _top(self, states, n):
+        return dict(sorted(states.items(), key=lambda item: -item[1]['count'])[:n])
+
+    def _prune(self):
+        """Halve every count and keep the ``max_states`` most requested states (lock held)"""
+        for entry in self.states.values():
+            entry['count'] /= 2
+        self.states = self._top({key: entry for key, entry in self.states.items() if entry['count'] >= 0.5},
+                                self.max_states)
+
+    def __len__(self):
+        return len(self.states)
+
+    def record(self, filters, selection=None):
+        filters, selection = normalize(filters, selection)
+        key = state_key(filters, selection)
+        with self._lock:
+            entry = self.states.setdefault(key, {'filters': list(filters), 'selection': selection, 'count': 0})
+            entry['count'] += 1
+            self.dirty = True
+            if len(self.states) > 2 * self.max_states:
+                self._prune()
+
+    def count(self, filters, selection=None):
+        key = state_key(filters, selection)
+        with self._lock:
+            entry = self.states.get(key)
+            return entry['count'] if entry else 0
+
+    def most_common(self, n):
+        """``(filters, selection)`` of the ``n`` most requested states"""
+        with self._lock:
+            entries = sorted(self.states.values(), key=lambda entry: -entry['count'])[:n]
+        return [(tuple(entry['filters']), entry['selection']) for entry in entries]
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        with self._lock:
+            text = json.dumps(self._top(self.states, self.max_states), separators=(',', ':'), default=str)
+            self.dirty = False
+        watch.write_atomic(self.path, text)
+
+
+def adjacent_states(filters, options):
+    """Filter states one dropdown change away: one dropdown cleared, or set to a single one of its ``options``"""
+    filters = list(filters)
+    for i, values in enumerate(filters):
+        if values:
+            yield tuple(filters[:i] + [None] + filters[i + 1:])
+    for i, column_options in enumerate(options):
+        for option in column_options:
+            if filters[i] != [option]:
+                yield tuple(filters[:i] + [[option]] + filters[i + 1:])
+
+
+class Prefetcher:
+    """Cached ``compute(filters, selection, view)`` with startup warm-up and idle prefetch of adjacent states
+
+    ``options`` lists the values of every dropdown, in ``filters`` order.
+    """
+
+    def __init__(self, compute, options, log=None, cache=None, warm=WARM_STATES, max_adjacent=MAX_ADJACENT,
+                 idle_seconds=IDLE_SECONDS):
+        self.compute = compute
+        self.options = options
+        self.log = log if log is not None else AccessLog()
+        self.cache = cache if cache is not None else ResultCache()
+        self.warm_states = warm
+        self.max_adjacent = max_adjacent
+        self.idle_seconds = idle_seconds
+        self.prefetched = 0
+        self._queue = collections.deque()
+        # State of the last request, until the thread has ranked its neighbours into _queue
+        self._origin = None
+        self._in_flight = 0
+        self._last_request = 0.0
+        self._wake = threading.Condition()
+        self._thread = None
+
+    def lookup(self, filters, selection=None, view=None):
+        """``(payload, hit)`` for a real request, which also sets the states to prefetch next"""
+        filters, selection = normalize(filters, selection)
+        with self._wake:
+            self._in_flight += 1
+        try:
+            self.log.record(filters, selection)
+            key = state_key(filters, selection, view)
+            payload = self.cache.get(key)
+            hit = payload is not None
+            if not hit:
+                payload = self.compute(filters, selection, view)
+                self.cache.put(key, payload)
+        finally:
+            with self._wake:
+                self._in_flight -= 1
+                self._last_request = time.monotonic()
+                self._origin = (filters, selection, view)
+                self._queue = collections.deque()
+                self._wake.notify()
+        return payload, hit
+
+    def _adjacent(self, filters, selection, view):
+        states = sorted(adjacent_states(filters, self.options), key=lambda state: -self.log.count(state, selection))
+        return [(state, selection, view) for state in states[:self.max_adjacent]]
+
+    def _fill(self, filters, selection, view):
+        key = state_key(filters, selection, view)
+        if key not in self.cache:
+            self.cache.put(key, self.compute(filters, selection, view))
+            return True
+        return False
+
+    def _wait_idle(self):
+        """Block until no request has run for ``idle_seconds``, return the next queued state (or None)
+
+        The neighbours of a new request are ranked here, outside the lock,
+        and only queued if no newer request came in meanwhile.
+        """
+        while True:
+            with self._wake:
+                while True:
+                    pending = self._queue or self._origin is not None
+                    idle_for = time.monotonic() - self._last_request
+                    if pending and not self._in_flight and idle_for >= self.idle_seconds:
+                        break
+                    self._wake.wait(timeout=max(self.idle_seconds - idle_for, 0.05) if pending else SAVE_SECONDS)
+                    if not self._queue and self._origin is None:
+                        return None
+                if self._origin is None:
+                    return self._queue.popleft()
+                origin, self._origin = self._origin, None
+            queue = collections.deque(self._adjacent(*origin))
+            with self._wake:
+                if self._origin is None:
+                    self._queue = queue
+
+    def warm(self):
+        """Compute the most frequent states of the access log, return how many were computed"""
+        warmed = 0
+        for filters, selection in self.log.most_common(self.warm_states):
+            warmed += self._fill(filters, selection, None)
+        return warmed
+
+    def _run(self):
+        start = time.perf_counter()
+        warmed = self.warm()
+        if warmed:
+            print(f"🔥 Warmed {warmed} frequent filter combinations in {time.perf_counter() - start:.1f} s")
+        last_save = time.monotonic()
+        while True:
+            state = self._wait_idle()
+            if state is not None:
+                try:
+                    self.prefetched += self._fill(*state)
+                except Exception as exc:
+                    # Speculative work must never stop the thread
+                    print(f"⚠️ Prefetch failed: {exc}")
+            if time.monotonic() - last_save >= SAVE_SECONDS:
+                self.log.save()
+                last_save = time.monotonic()
+
+    def start(self):
+        """Run the warm-up and the idle prefetch in a daemon thread; the log is also saved at exit"""
+        import atexit
+
+        if self._thread is None:
+            atexit.register(self.log.save)
+            self._thread = threading.Thread(target=self._run, name='prefetch', daemon=True)
+            self._thread.start()
+        return self
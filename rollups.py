@@ -0,0 +1,123 @@
+"""
+Multi-resolution roll-ups of the trend chart
+
+``TimeGrains`` assigns every row to one bucket per time grain (year,
+quarter, month, and week and day when the frame has a ``Date`` column) and
+knows the time span of each bucket. The crossfilter engine keeps one group
+per grain, so the sums of every grain stay current as filters change and a
+zoom only reads group sums, never the rows.
+
+A zoom is answered at the coarsest grain that still shows ``MIN_POINTS``
+buckets in the visible window: the full three years of monthly data stay
+monthly, a one-year window of daily data is shown by week, a quarter by day.
+"""
+
+GRAINS = ('year', 'quarter', 'month', 'week', 'day')
+# Fewest points a zoomed trend should show before switching to a finer grain
+MIN_POINTS = 24
+
+
+class TimeGrains:
+    """Bucket codes, labels and time spans of every grain available in a frame"""
+
+    def __init__(self, df, months, month_codes=None):
+        """``month_codes`` (positions of ``df['Month']`` in ``months``) saves looking the labels up again"""
+        import numpy as np
+        import pandas as pd
+
+        years = sorted(int(year) for year in pd.unique(df['Year']))
+        year_codes = pd.Index(years).get_indexer(df['Year'])
+        if month_codes is None:
+            month_codes = pd.Index(months).get_indexer(df['Month'])
+        firsts = np.array([f'{year}-01-01' for year in years], dtype='datetime64[M]')
+
+        self.grains = {}
+        for grain, per_year in (('year', 1), ('quarter', 4), ('month', 12)):
+            step = 12 // per_year
+            starts = (firsts[:, None] + np.arange(0, 12, step)).ravel()
+            if grain == 'year':
+                labels = [str(year) for year in years]
+            elif grain == 'quarter':
+                labels = [f'{year}-Q{quarter}' for year in years for quarter in range(1, 5)]
+            else:
+                # Same labels as the Period column of the Dash app
+                labels = [f'{year}-{month}' for year in years for month in months]
+            codes = year_codes * per_year + month_codes // step
+            self._add(grain, codes, labels, starts.astype('datetime64[D]'),
+                      (starts + step).astype('datetime64[D]'))
+
+        if 'Date' in df:
+            days = pd.to_datetime(df['Date']).to_numpy().astype('datetime64[D]')
+            first, last = days.min(), days.max()
+            self._add('day', (days - first).astype(np.int64), [str(day) for day in np.arange(first, last + 1)],
+                      np.arange(first, last + 1), np.arange(first, last + 1) + 1)
+            # Weeks start on Monday; 1970-01-01 was a Thursday
+            mondays = days - (days.astype(np.int64) + 3) % 7
+            starts = np.arange(mondays.min(), mondays.max() + 1, 7)
+            calendar = pd.DatetimeIndex(starts).isocalendar()
+            labels = [f'{year}-W{week:02d}' for year, week in zip(calendar['year'], calendar['week'])]
+            self._add('week', ((mondays - starts[0]) // 7).astype(np.int64), labels, starts, starts + 7)
+
+        self.names = [grain for grain in GRAINS if grain in self.grains]
+        # Bucket label -> (grain, position), to map selections back to months
+        self._positions = {label: (grain, i) for grain in self.names
+                           for i, label in enumerate(self.grains[grain]['labels'])}
+
+    def _add(self, grain, codes, labels, starts, ends):
+        self.grains[grain] = {'codes': codes, 'labels': labels, 'starts': starts, 'ends': ends}
+
+    def labels(self, grain):
+        return self.grains[grain]['labels']
+
+    def codes(self, grain):
+        return self.grains[grain]['codes']
+
+    def view(self, window=None, min_points=MIN_POINTS):
+        """``{'grain', 'start', 'stop'}`` buckets answering a zoom to ``window``
+
+        ``window`` is a ``(start, end)`` pair of ``datetime64[D]`` (None for the
+        whole range). The grain is the coarsest with at least ``min_points``
+        buckets overlapping the window, or the finest available.
+        """
+        if window is None:
+            finest = self.grains[self.names[-1]]
+            window = (finest['starts'][0], finest['ends'][-1])
+        start, end = window
+        for grain in self.names:
+            buckets = self.grains[grain]
+            inside = (buckets['starts'] < end) & (buckets['ends'] > start)
+            positions = inside.nonzero()[0]
+            if len(positions) >= min_points or grain == self.names[-1]:
+                if not len(positions):
+                    positions = [0]
+                return {'grain': grain, 'start': int(positions[0]), 'stop': int(positions[-1]) + 1}
+
+    def window(self, view, low, high):
+        """Time span of the buckets of ``view`` whose axis position lies in ``[low, high]``
+
+        Positions are the category-axis coordinates of the trend chart, 0
+        being the first bucket of the view.
+        """
+        import math
+
+        buckets = self.grains[view['grain']]
+        last = view['stop'] - view['start'] - 1
+        first_visible = min(max(math.ceil(low), 0), last)
+        last_visible = min(max(math.floor(high), 0), last)
+        if last_visible < first_visible:
+            # Zoomed in between two points: keep the nearest one
+            first_visible = last_visible = min(max(round((low + high) / 2), 0), last)
+        return (buckets['starts'][view['start'] + first_visible], buckets['ends'][view['start'] + last_visible])
+
+    def month_labels(self, labels):
+        """Months covered by bucket ``labels`` of any grain (unknown labels are dropped)"""
+        months = self.grains['month']
+        selected = []
+        for label in labels:
+            if label not in self._positions:
+                continue
+            grain, i = self._positions[label]
+            start, end = self.grains[grain]['starts'][i], self.grains[grain]['ends'][i]
+            overlap = ((months['starts'] < end) & (months['ends'] > start)).nonzero()[0]
+            selected.extend(months['labels'][j] for j in overlap)
+        return list(dict.fromkeys(selected))
@@ -0,0 +1,162 @@
+"""
+On-disk snapshots of generated and loaded datasets
+
+A snapshot is the frame stored as an uncompressed Arrow IPC (Feather v2)
+file. Reading it memory-maps the file instead of parsing it, so a 1.4M-row
+frame loads in about 10 ms rather than being generated again. Snapshots are
+keyed by everything that determines the frame: the generator, its
+parameters and the hash of its source files, or the content hash of a
+loaded file. Changing any of them writes a new snapshot instead of reusing
+a stale one.
+
+pyarrow is optional: without it nothing is cached.
+"""
+
+import os
+import sys
+
+# hashlib (OpenSSL) and inspect are imported where they are used: every CLI
+# imports this module, and --help should stay fast and small
+import outofcore
+import synthetic
+
+DEFAULT_DIR = '.snapshots'
+EXTENSION = '.arrow'
+
+# Generator parameters that do not change the generated frame
+IGNORED_PARAMETERS = ('workers',)
+
+
+def available():
+    """Whether snapshots can be written (they need pyarrow)"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-1 of a file's contents"""
+    import hashlib
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(directory, name, key):
+    """Snapshot file for ``name`` and a JSON-serializable ``key``"""
+    import hashlib
+    import json
+
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return os.path.join(directory, f'{name}-{digest[:16]}{EXTENSION}')
+
+
+def read_snapshot(path):
+    """Frame stored in a snapshot, memory-mapped"""
+    import pyarrow.feather as feather
+
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+def write_snapshot(df, path):
+    """Store ``df`` as a snapshot, atomically (readers never see a partial file)"""
+    import pyarrow.feather as feather
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    feather.write_feather(df.reset_index(drop=True), temporary, compression='uncompressed')
+    os.replace(temporary, path)
+
+
+def _cached(path, build):
+    if os.path.exists(path):
+        df = read_snapshot(path)
+        print(f"⚡ Loaded {len(df):,} records from snapshot {path}")
+        return df
+    df = build()
+    write_snapshot(df, path)
+    print(f"💾 Saved snapshot {path}")
+    return df
+
+
+def load_or_generate(generate, directory=DEFAULT_DIR, **params):
+    """``generate(**params)``, read from a snapshot when the same call already ran
+
+    The key holds the generator's name, its parameters (except the ones in
+    ``IGNORED_PARAMETERS``) and the hashes of its module and of ``synthetic``.
+    """
+    import inspect
+
+    if not directory or not available():
+        return generate(**params)
+    # The module file, not the function's: it also works for scripts run as __main__
+    source = os.path.abspath(sys.modules[generate.__module__].__file__)
+    name = os.path.splitext(os.path.basename(source))[0]
+    # Defaults included, so generate() and generate(seed=DEFAULT_SEED) share a snapshot
+    bound = inspect.signature(generate).bind(**params)
+    bound.apply_defaults()
+    key = {
+        'generator': f'{name}.{generate.__qualname__}',
+        'params': {param: value for param, value in bound.arguments.items() if param not in IGNORED_PARAMETERS},
+        'sources': [file_hash(path) for path in sorted({source, os.path.abspath(synthetic.__file__)})],
+    }
+    return _cached(snapshot_path(directory, name, key), lambda: generate(**params))
+
+
+def read_dataset(path):
+    """Frame from a CSV, Parquet or Feather file"""
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return pd.read_csv(path)
+    if extension == '.parquet':
+        return pd.read_parquet(path)
+    if extension in ('.feather', EXTENSION):
+        return pd.read_feather(path)
+    raise ValueError(f"unknown dataset extension {extension!r} (expected .csv, .parquet or .feather)")
+
+
+def load_or_read(path, directory=DEFAULT_DIR):
+    """``read_dataset(path)``, read from a snapshot keyed by the file's content hash"""
+    if not directory or not available():
+        return read_dataset(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    return _cached(snapshot_path(directory, name, {'source': file_hash(path)}), lambda: read_dataset(path))
+
+
+def load_or_aggregate(path, directory=DEFAULT_DIR, chunk_rows=outofcore.CHUNK_ROWS):
+    """``outofcore.aggregate_file(path)``, read from a snapshot keyed by the file's content hash"""
+    if not directory or not available():
+        return outofcore.aggregate_file(path, chunk_rows=chunk_rows)
+    name = os.path.splitext(os.path.basename(path))[0]
+    # The chunk size does not change the sums, so it is not part of the key
+    key = {'source': file_hash(path), 'aggregate': outofcore.RECORDS}
+    return _cached(snapshot_path(directory, name, key), lambda: outofcore.aggregate_file(path, chunk_rows=chunk_rows))
+
+
+def add_arguments(parser):
+    """Register the dataset and snapshot flags on an argparse parser"""
+    parser.add_argument('--data', metavar='PATH',
+                        help="Load the incidents from a CSV, Parquet or Feather file instead of generating them")
+    parser.add_argument('--out-of-core', type=int, nargs='?', const=outofcore.CHUNK_ROWS, metavar='ROWS',
+                        help="Sum the --data file ROWS rows at a time into one row per distinct label combination, "
+                             f"for files bigger than memory (default: {outofcore.CHUNK_ROWS:,} rows)")
+    parser.add_argument('--snapshot-dir', default=DEFAULT_DIR,
+                        help="Directory of the memory-mapped dataset snapshots")
+    parser.add_argument('--no-snapshot', dest='snapshot_dir', action='store_const', const=None,
+                        help="Always generate (or read) the dataset, without snapshots")
+
+
+def load_data(generate, args):
+    """Dataset selected by the flags of ``add_arguments`` and ``synthetic.add_arguments``"""
+    if args.data and args.out_of_core:
+        return load_or_aggregate(args.data, args.snapshot_dir, args.out_of_core)
+    if args.data:
+        return load_or_read(args.data, args.snapshot_dir)
+    return load_or_generate(generate, args.snapshot_dir, **synthetic.data_options(args))
@@ -0,0 +1,237 @@
+"""
+Precomputed chart data for every filter combination of the static dashboard
+
+The enhanced dashboard has four selects (Category, Severity, Site and Year,
+each with an "all" option). ``write_static_queries`` answers every
+combination ahead of time, so a page hosted without a server (GitHub
+Pages) can refilter its charts with one cached static fetch.
+
+All answers come from sparse roll-ups: the incident counts grouped by
+every subset of the filters together with each chart's column, holding only
+the label combinations that occur, so their size follows the rows and not
+the product of the label counts. Only the filter combinations that match
+some incidents get an answer; every other one shares ``manifest['empty']``.
+Answers are written as JSON files named after a hash of their content, so
+identical answers are stored once, and ``manifest.json`` maps every
+combination to its file. ``assets/static_queries.js`` fetches the manifest
+on the first filter change and restyles the charts.
+"""
+
+import itertools
+import json
+import os
+
+import figure_codec
+import topk
+import watch
+
+FILTERS = ['Category', 'Severity', 'Site', 'Year']
+MANIFEST_FILE = 'manifest.json'
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'static_queries.js')
+
+# Label of the "all" option in manifest keys (the selects' empty value)
+ALL = ''
+# Columns of every chart answer, looked up in the roll-ups
+CHART_COLUMNS = [('Category',), ('Site',), ('Cause',), ('Month',), ('Severity',), ('Year', 'Month')]
+
+# Roll-ups shared by the worker processes, set once per process by _init_worker
+_rollups = None
+
+
+def script_js():
+    """Source of the browser-side filter handler"""
+    with open(SCRIPT_PATH, encoding='utf-8') as f:
+        return f.read()
+
+
+def _table(codes, fixed, free):
+    """``Count`` of ``codes`` summed by ``fixed + free``: ``{fixed codes: (free codes, values)}``, in label order"""
+    import numpy as np
+
+    sums = codes.groupby(list(fixed + free), sort=True)['Count'].sum().reset_index()
+    fixed_codes = sums[list(fixed)].to_numpy()
+    free_codes = sums[list(free)].to_numpy().T
+    values = sums['Count'].to_numpy().astype(np.int64)
+    if not fixed:
+        return {(): (free_codes, values)}
+    # Rows are sorted by the fixed codes, so every fixed combination is one contiguous run
+    changed = np.flatnonzero((fixed_codes[1:] != fixed_codes[:-1]).any(axis=1)) + 1
+    bounds = np.concatenate([[0], changed, [len(sums)]])
+    return {tuple(fixed_codes[start].tolist()): (free_codes[:, start:stop], values[start:stop])
+            for start, stop in zip(bounds[:-1], bounds[1:])}
+
+
+def build_rollups(df, month_order):
+    """Sparse ``Count`` sums of every chart under every subset of the filters
+
+    Returns the sorted labels of every axis and ``tables``, keyed by
+    ``(fixed filters, chart columns)`` (see ``_table``). Labels are stored as
+    their position on their axis; position ``n`` on a filter axis with ``n``
+    labels means "all".
+    """
+    import pandas as pd
+
+    labels, codes = {}, {}
+    for column in FILTERS + ['Cause']:
+        column_codes, uniques = pd.factorize(df[column], sort=True)
+        labels[column] = [value.item() if hasattr(value, 'item') else value for value in uniques]
+        codes[column] = column_codes
+    labels['Month'] = [month for month in month_order if month in set(df['Month'].unique())]
+    codes['Month'] = pd.Index(labels['Month']).get_indexer(df['Month'])
+    codes['Count'] = df['Count'].to_numpy()
+    # One row per label combination that occurs
+    codes = pd.DataFrame(codes).groupby(FILTERS + ['Cause', 'Month'], sort=False, as_index=False)['Count'].sum()
+
+    tables = {}
+    for n_fixed in range(len(FILTERS) + 1):
+        for fixed in itertools.combinations(FILTERS, n_fixed):
+            for chart in CHART_COLUMNS:
+                free = tuple(column for column in chart if column not in fixed)
+                if (fixed, free) not in tables:
+                    tables[fixed, free] = _table(codes, fixed, free)
+    return {'labels': labels, 'tables': tables}
+
+
+def _fixed(rollups, combination):
+    """Filters set by a combination and their positions"""
+    labels = rollups['labels']
+    pairs = [(column, position) for column, position in zip(FILTERS, combination) if position < len(labels[column])]
+    return tuple(column for column, _ in pairs), tuple(position for _, position in pairs)
+
+
+def combinations(rollups):
+    """Every filter combination with incidents, as a sorted list of axis position tuples ("all" is the last one)"""
+    labels = rollups['labels']
+    found = set()
+    for (fixed, free), table in rollups['tables'].items():
+        if free != ('Month',):
+            continue
+        for key in table:
+            positions = dict(zip(fixed, key))
+            found.add(tuple(positions.get(column, len(labels[column])) for column in FILTERS))
+    return sorted(found)
+
+
+def combination_key(rollups, combination):
+    """Manifest key of a combination: the select values joined by "|" ("all" is empty)"""
+    labels = rollups['labels']
+    return '|'.join(ALL if position == len(labels[column]) else str(labels[column][position])
+                    for column, position in zip(FILTERS, combination))
+
+
+def _lookup(rollups, combination, chart):
+    """``(codes, values)`` of the ``chart`` columns under a filter combination; ``codes`` has one row per column"""
+    import numpy as np
+
+    fixed, positions = _fixed(rollups, combination)
+    free = tuple(column for column in chart if column not in fixed)
+    free_codes, values = rollups['tables'][fixed, free].get(positions, (np.zeros((len(free), 0), dtype=int),
+                                                                        np.zeros(0, dtype=np.int64)))
+    # A filtered chart column has the filter's label
+    codes = [free_codes[free.index(column)] if column in free else np.full(len(values), positions[fixed.index(column)])
+             for column in chart]
+    nonzero = values != 0
+    return [column_codes[nonzero] for column_codes in codes], values[nonzero]
+
+
+def _chart(rollups, combination, column, k=None):
+    (codes,), values = _lookup(rollups, combination, (column,))
+    return topk.top_k_values([rollups['labels'][column][i] for i in codes], values, k)
+
+
+def query(rollups, combination, top_k=None):
+    """Chart data of one filter combination, shaped like the dashboard's main traces
+
+    Every chart maps to ``{'labels', 'values'}``; the bar charts are sorted
+    and cut to ``top_k`` like ``create_enhanced_dashboard`` does, and labels
+    without incidents are left out.
+    """
+    labels = rollups['labels']
+    combination = tuple(combination)
+
+    charts = {}
+    for column in ('Category', 'Site', 'Cause'):
+        charts[column] = _chart(rollups, combination, column, topk.limit_for(top_k, column))
+    # The site bars are horizontal, largest at the top
+    charts['Site'] = (charts['Site'][0][::-1], charts['Site'][1][::-1])
+    for column in ('Month', 'Severity'):
+        (codes,), values = _lookup(rollups, combination, (column,))
+        charts[column] = ([labels[column][i] for i in codes], values.tolist())
+    (years, month_positions), values = _lookup(rollups, combination, ('Year', 'Month'))
+    charts['Trend'] = ([f"{labels['Year'][y]}-{labels['Month'][m]}" for y, m in zip(years, month_positions)],
+                       values.tolist())
+    return {name: {'labels': chart_labels, 'values': values} for name, (chart_labels, values) in charts.items()}
+
+
+def _init_worker(rollups):
+    global _rollups
+    _rollups = rollups
+
+
+def _write_answer(directory, answer):
+    """Write an answer under the hash of its content, return the file name"""
+    # hashlib loads OpenSSL; imported here so importing this module stays small (see snapshot.py)
+    import hashlib
+
+    text = figure_codec.to_json(answer)
+    name = hashlib.sha1(text.encode('utf-8')).hexdigest()[:16] + '.json'
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        # Another worker may write the same answer: write aside, then rename atomically
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temporary, path)
+    return name
+
+
+def _write_answers(args):
+    """Write the answers of a batch of combinations, return their ``(key, file name)`` pairs"""
+    directory, combos, top_k = args
+    return [(combination_key(_rollups, combination), _write_answer(directory, query(_rollups, combination, top_k)))
+            for combination in combos]
+
+
+def empty_answer(rollups, top_k=None):
+    """Answer of a filter combination without incidents"""
+    import collections
+
+    no_rows = dict(rollups, tables=collections.defaultdict(dict))
+    return query(no_rows, [len(rollups['labels'][column]) for column in FILTERS], top_k)
+
+
+def write_static_queries(df, directory, month_order, top_k=None, workers=1):
+    """Precompute every filter combination of ``df`` into ``directory``, return the manifest
+
+    Combinations without incidents are left out of ``manifest['results']``
+    and answered by the file of ``manifest['empty']``. The combinations are split in batches (one per first-filter option) that
+    run in a process pool when ``workers`` > 1; each worker receives the
+    roll-ups once.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rollups = build_rollups(df, month_order)
+    combos = list(combinations(rollups))
+    batches = [(directory, list(batch), top_k) for _, batch in itertools.groupby(combos, key=lambda c: c[0])]
+    if workers and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rollups,)) as pool:
+            results = list(pool.map(_write_answers, batches))
+    else:
+        _init_worker(rollups)
+        results = [_write_answers(batch) for batch in batches]
+
+    manifest = {
+        'filters': FILTERS,
+        'results': dict(entry for entries in results for entry in entries),
+        'empty': _write_answer(directory, empty_answer(rollups, top_k)),
+    }
+    watch.write_atomic(os.path.join(directory, MANIFEST_FILE),
+                       json.dumps(manifest, separators=(',', ':'), ensure_ascii=False))
+
+    # Answers of earlier builds that no combination points to any more
+    used = set(manifest['results'].values()) | {manifest['empty']}
+    for name in os.listdir(directory):
+        if name.endswith('.json') and name != MANIFEST_FILE and name not in used:
+            os.remove(os.path.join(directory, name))
+    return manifest
@@ -0,0 +1,78 @@
+"""
+Deterministic sharded generation of synthetic data
+
+The dataset is split into independent shards (one per Year x Site in the
+generators). Every shard draws from its own generator, seeded with a child
+of one root ``np.random.SeedSequence`` (``spawn``), so a shard's rows depend
+only on the root seed and the shard's position. Shards can therefore run in
+any process, in any order, and the concatenated frame is bit-identical
+whatever the number of workers.
+"""
+
+DEFAULT_SEED = 42
+
+
+def shard_seeds(n_shards, seed=DEFAULT_SEED):
+    """One independent child ``SeedSequence`` per shard"""
+    import numpy as np
+
+    return np.random.SeedSequence(seed).spawn(n_shards)
+
+
+def _run_shard(args):
+    import numpy as np
+
+    func, seed, shard = args
+    return func(np.random.default_rng(seed), *shard)
+
+
+def generate_shards(func, shards, seed=DEFAULT_SEED, workers=1):
+    """Concatenate ``func(rng, *shard)`` over ``shards``, in shard order
+
+    ``func`` must be a module-level function (so it can be sent to worker
+    processes) returning a dict of equal-length arrays; small integer codes
+    keep the transfer between processes cheap. With ``workers`` > 1 the
+    shards run in a process pool; the result does not depend on the number
+    of workers.
+    """
+    import numpy as np
+
+    shards = list(shards)
+    tasks = [(func, child, shard) for child, shard in zip(shard_seeds(len(shards), seed), shards)]
+    if workers and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run_shard, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    else:
+        parts = [_run_shard(task) for task in tasks]
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def decode(columns, labels):
+    """Frame from ``generate_shards`` output, replacing the codes of ``labels`` columns (name -> labels)"""
+    import numpy as np
+    import pandas as pd
+
+    # Taking from a small string array is much cheaper than building one string per row
+    return pd.DataFrame({name: pd.array(labels[name], dtype='str').take(values.astype(np.intp))
+                         if name in labels else values for name, values in columns.items()})
+
+
+def choose_distinct(rng, n_rows, n_options, k):
+    """``k`` distinct option indices per row, like ``rng.choice(n_options, k, replace=False)`` row by row"""
+    return rng.random((n_rows, n_options)).argsort(axis=1)[:, :k]
+
+
+def add_arguments(parser):
+    """Register the shared data generation flags on an argparse parser"""
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Root seed of the synthetic data")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for the data shards and other parallel build steps (the output does not depend on it)")
+    parser.add_argument('--scale', type=int, default=1,
+                        help="Multiply the records per site and month, for large benchmark datasets")
+
+
+def data_options(args):
+    """``generate_data`` keyword arguments from the flags of ``add_arguments``"""
+    return {'seed': args.seed, 'workers': args.workers, 'scale': args.scale}
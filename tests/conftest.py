@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top level of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def incidents():
+    """The synthetic incident frame of the dashboards (4,605 rows)"""
+    import generate_dashboard
+
+    return generate_dashboard.generate_data()
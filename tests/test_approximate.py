@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import approximate
+
+
+def test_full_sample_is_exact(incidents):
+    sample = approximate.StratifiedSample(incidents, 1)
+    result = sample.estimate(sample.rows, ['Category'])
+    expected = incidents.groupby('Category')['Count'].sum()
+    assert dict(zip(result['Category'], result['Count'])) == pytest.approx(expected.to_dict())
+    assert (result['Error'] == 0).all()
+
+
+def test_every_stratum_is_sampled(incidents):
+    sample = approximate.StratifiedSample(incidents, 0.01)
+    strata = incidents.groupby(list(approximate.DEFAULT_STRATA)).size()
+    kept = sample.rows.groupby(list(approximate.DEFAULT_STRATA)).size()
+    assert kept.index.equals(strata.index)
+    assert (kept == np.ceil(strata * 0.01)).all()
+
+
+def test_intervals_cover_the_pandas_total(incidents):
+    rows = incidents[incidents['Category'] == 'Spill']
+    truth = rows['Count'].sum()
+    by_site = rows.groupby('Site')['Count'].sum()
+    estimates, covered, site_covered = [], 0, []
+    for seed in range(200):
+        sample = approximate.StratifiedSample(incidents, 0.1, seed=seed)
+        subset = sample.rows[sample.rows['Category'] == 'Spill']
+        estimate, error = sample.estimate_total(subset)
+        estimates.append(estimate)
+        covered += abs(estimate - truth) <= error
+        sites = sample.estimate(subset, ['Site']).set_index('Site').reindex(by_site.index, fill_value=0)
+        site_covered.append(((sites['Low'] <= by_site) & (by_site <= sites['High'])).mean())
+    # Unbiased, and the 95% intervals hold the true sums about 95% of the time
+    assert np.mean(estimates) == pytest.approx(truth, rel=0.02)
+    assert covered / 200 >= 0.88
+    assert np.mean(site_covered) >= 0.85
+
+
+def test_empty_subset(incidents):
+    sample = approximate.StratifiedSample(incidents, 0.05)
+    assert sample.estimate_total(pd.DataFrame(columns=sample.rows.columns)) == (0.0, 0.0)
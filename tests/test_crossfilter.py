@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+import dash_app
+import topk
+
+# Sidebar filters (in FILTER_COLUMNS order) and chart selections, applied one after the other
+STATES = [
+    ((None,) * 7, None),
+    ((['Spill'], None, None, None, None, None, None), None),
+    ((['Spill', 'Injury'], ['Weston'], None, None, None, None, None), {'pie-severity': ['Major']}),
+    ((None, None, ['Jan', 'Feb', 'Mar'], None, None, [2008], None), {'bar-site': ['Weston', 'Acton']}),
+    ((None,) * 7, {'bar-category': ['Spill'], 'bar-trend': ['Jun']}),
+    ((None, None, None, None, ['Critical'], None, None), {'line-month': ['2007-Mar', '2009-Nov'],
+                                                          'bar-cause': ['Equipment', 'Training']}),
+    ((None, ['Nowhere'], None, None, None, None, None), None),
+    ((None,) * 7, None),
+]
+
+
+def sums(frame, columns):
+    return {key: value for key, value in frame.groupby(columns)['Count'].sum().items() if value}
+
+
+@pytest.fixture(scope='module')
+def engine(incidents):
+    return dash_app.create_crossfilter(incidents)
+
+
+def test_filter_sequence_matches_pandas(incidents, engine):
+    for filters, selection in STATES:
+        with engine.lock:
+            dash_app.apply_filters(engine, *filters, selection=selection)
+            frames = {chart: engine.group_frame(chart) for chart in dash_app.CROSSFILTER_CHARTS}
+            total = engine.total
+        dff = dash_app.filter_data(incidents, *filters)
+        assert total == dash_app.apply_selection(dff, selection)['Count'].sum()
+        for chart, columns in dash_app.CHART_GROUPS.items():
+            expected = dash_app.chart_frame(dash_app.apply_selection(dff, selection, exclude=chart), chart)
+            assert sums(frames[chart], columns) == sums(expected, columns), (filters, selection, chart)
+
+
+def test_count_scans_counts_changed_rows(incidents, engine):
+    with engine.lock:
+        dash_app.apply_filters(engine, *(None,) * 7)
+        with engine.count_scans() as scans:
+            engine.filter('Site', ['Weston'])
+        assert scans.rows == (incidents['Site'] != 'Weston').sum()
+        with engine.count_scans() as scans:
+            engine.filter('Site', ['Weston'])
+        assert scans.rows == 0
+        engine.filter('Site', None)
+
+
+def test_zoom_groups_built_after_filtering_match_pandas(incidents):
+    engine = dash_app.create_crossfilter(incidents)
+    filters = (['Spill', 'Injury'], None, None, None, ['Major'], None, None)
+    with engine.lock:
+        dash_app.apply_filters(engine, *filters)
+        assert dash_app.trend_group('quarter') not in engine.groups
+        frame = engine.group_frame(dash_app.trend_group('quarter'))
+    dff = dash_app.filter_data(incidents, *filters)
+    quarter = dff['Year'].astype(str) + '-Q' + (dff['Month'].map(dash_app.months.index) // 3 + 1).astype(str)
+    expected = dff.assign(Quarter=quarter)
+    assert sums(frame, ['Period:quarter', 'Category']) == sums(expected, ['Quarter', 'Category'])
+
+
+def test_hierarchy_group_built_after_filtering_matches_pandas(incidents):
+    engine = dash_app.create_crossfilter(incidents)
+    filters = (None, None, ['Jan', 'Feb'], None, None, [2008], None)
+    with engine.lock:
+        dash_app.apply_filters(engine, *filters)
+        assert 'hierarchy' not in engine.groups
+        leaves = engine.group_sums('hierarchy')
+    index = engine.hierarchy
+    top = pd.Series(leaves).groupby(index.labels[0][index.leaf_codes[0]]).sum()
+    expected = dash_app.filter_data(incidents, *filters).groupby(index.levels[0])['Count'].sum()
+    assert top[top > 0].to_dict() == expected.to_dict()
+
+
+def test_clicking_the_other_bar_selects_nothing(incidents, engine):
+    figures = dash_app.update_all_graphs_crossfilter(engine, *(None,) * 7, top_k=3)
+    cause_figure = figures[list(dash_app.CROSSFILTER_CHARTS).index('bar-cause')]
+    bars = [label for trace in cause_figure['data'] for label in trace['x']]
+    assert topk.OTHER_LABEL in bars
+
+    click = {'points': [{'x': topk.OTHER_LABEL}]}
+    assert dash_app.update_selection(None, 'bar-cause', 'clickData', click) == {}
+    selection = {'bar-site': ['Weston']}
+    assert dash_app.update_selection(selection, 'bar-cause', 'clickData', click) == selection
+
+    lasso = {'points': [{'x': topk.OTHER_LABEL}, {'x': 'Design'}]}
+    selection = dash_app.update_selection(None, 'bar-cause', 'selectedData', lasso)
+    assert selection == {'bar-cause': ['Design']}
+    *_, count = dash_app.update_all_graphs_crossfilter(engine, *(None,) * 7, top_k=3, selection=selection)
+    assert count == f"{incidents.loc[incidents['Cause'] == 'Design', 'Count'].sum():,}"
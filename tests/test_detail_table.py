@@ -0,0 +1,40 @@
+import pytest
+
+import dash_app
+import detail_table
+
+# DataTable filter_query -> pandas mask of the same rows
+QUERIES = {
+    '{Site} contains Wes': lambda df: df['Site'].str.contains('Wes'),
+    '{Site} scontains wes': lambda df: df['Site'].str.contains('wes'),
+    '{Site} icontains "wES"': lambda df: df['Site'].str.lower().str.contains('wes'),
+    '{Site} s= Weston': lambda df: df['Site'] == 'Weston',
+    '{Site} i= weston': lambda df: df['Site'] == 'Weston',
+    '{Site} ieq "ACTON"': lambda df: df['Site'] == 'Acton',
+    '{Site} seq acton': lambda df: df['Site'] == 'acton',
+    '{Site} ine acton': lambda df: df['Site'] != 'Acton',
+    '{Month} datestartswith Ju': lambda df: df['Month'].str.startswith('Ju'),
+    '{Month} idatestartswith ju': lambda df: df['Month'].str.startswith('Ju'),
+    '{Count} s> 5 && {Year} i= 2008': lambda df: (df['Count'] > 5) & (df['Year'] == 2008),
+    '{Count}>=10 && {Severity} slt M': lambda df: (df['Count'] >= 10) & (df['Severity'] < 'M'),
+}
+
+
+@pytest.mark.parametrize('query, expected', QUERIES.items(), ids=list(QUERIES))
+def test_filter_query_matches_pandas(incidents, query, expected):
+    engine = dash_app.create_crossfilter(incidents)
+    table = detail_table.DetailTable(engine, dash_app.DETAIL_COLUMNS)
+    matching = incidents[expected(incidents)]
+    assert table.count(query) == len(matching)
+    records, n_matching, _ = table.page(0, 10, [{'column_id': 'Count', 'direction': 'desc'}], query)
+    assert n_matching == len(matching)
+    assert [record['Count'] for record in records] == matching['Count'].nlargest(10).tolist()
+
+
+def test_split_filter_part():
+    assert detail_table.split_filter_part('{Site} scontains Wes') == ('Site', 'contains', 'Wes')
+    assert detail_table.split_filter_part('{Site} icontains wes') == ('Site', 'icontains', 'wes')
+    assert detail_table.split_filter_part('{Count} s>= 5') == ('Count', 'ge', '5')
+    assert detail_table.split_filter_part('{Count} i<5') == ('Count', 'ilt', '5')
+    assert detail_table.split_filter_part('{Month} datestartswith "Ja"') == ('Month', 'datestartswith', 'Ja')
+    assert detail_table.split_filter_part('{Site} between x') is None
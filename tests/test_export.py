@@ -0,0 +1,42 @@
+import io
+
+import pandas as pd
+import pytest
+
+import dash_app
+import export
+
+
+@pytest.fixture(scope='module')
+def client(incidents):
+    app = dash_app.create_app(incidents, warm=0, prefetch_idle=False)
+    return app.server.test_client()
+
+
+@pytest.mark.parametrize('where', [{}, {'Site': ['Weston'], 'Year': ['2008']},
+                                   [('Period', ['2007-Jan', '2009-Dec']), ('Severity', ['Major'])]])
+def test_csv_matches_pandas(incidents, where):
+    data = b''.join(export.stream_export(incidents, 'csv', where, chunk_rows=1000))
+    exported = pd.read_csv(io.BytesIO(data))
+    mask = pd.Series(True, index=incidents.index)
+    for column, labels in (where.items() if isinstance(where, dict) else where):
+        values = incidents['Year'].astype(str) + '-' + incidents['Month'] if column == 'Period' else incidents[column]
+        mask &= values.astype(str).isin(labels)
+    expected = incidents[mask].reset_index(drop=True)
+    assert exported['Count'].sum() == expected['Count'].sum()
+    assert len(exported) == len(expected)
+
+
+def test_bad_filters_fail_before_streaming(incidents):
+    with pytest.raises(ValueError):
+        export.stream_export(incidents, 'csv', {'Year': ['last year']})
+    with pytest.raises(ValueError):
+        export.stream_export(incidents, 'csv', {'Nope': ['x']})
+
+
+def test_endpoint_answers_400_on_bad_filters(client):
+    response = client.get('/export/csv?Year=abc')
+    assert response.status_code == 400
+    response = client.get('/export/csv?Year=2008&Site=Weston')
+    assert response.status_code == 200
+    assert response.get_data().startswith(b'Category,')
@@ -0,0 +1,53 @@
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import figure_codec
+
+DTYPES = {code: name for name, code in figure_codec._TYPED_ARRAY_DTYPES.items()}
+
+
+def decode(value):
+    """What plotly.js and assets/figure_codec.js make of an encoded value"""
+    if isinstance(value, dict):
+        if set(value) == {'dtype', 'bdata'}:
+            return np.frombuffer(base64.b64decode(value['bdata']), dtype=DTYPES[value['dtype']]).tolist()
+        if set(value) == {'dict', 'codes'}:
+            return [value['dict'][code] for code in decode(value['codes'])]
+        return {key: decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    return value
+
+
+def test_round_trip_matches_the_frame(incidents):
+    sums = incidents.groupby(['Site', 'Cause'], as_index=False)['Count'].sum()
+    fig = go.Figure([
+        go.Bar(x=incidents['Site'], y=incidents['Count']),
+        go.Scatter(x=sums['Cause'], y=sums['Count'] / 7, customdata=np.arange(len(sums)) * 1000),
+    ])
+    data = decode(json.loads(figure_codec.to_json(figure_codec.encode_figure(fig))))['data']
+    assert data[0]['x'] == incidents['Site'].tolist()
+    assert data[0]['y'] == incidents['Count'].tolist()
+    assert data[1]['x'] == sums['Cause'].tolist()
+    assert data[1]['y'] == (sums['Count'] / 7).tolist()
+    assert data[1]['customdata'] == (np.arange(len(sums)) * 1000).tolist()
+
+
+def test_dates_are_iso_strings():
+    dates = pd.date_range('2024-01-01', periods=40, freq='D').as_unit('ns')
+    fig = go.Figure(go.Scatter(x=dates, y=np.arange(40)))
+    payload = figure_codec.encode_figure(fig)
+    assert decode(payload['data'][0]['x']) == [date.strftime('%Y-%m-%d') for date in dates]
+    with_missing = np.array(['2024-01-01T06:30', 'NaT'], dtype='datetime64[ns]')
+    assert json.loads(figure_codec.to_json(figure_codec._plain_value(with_missing))) == ['2024-01-01T06:30', None]
+
+
+def test_selectedpoints_stay_a_plain_list():
+    fig = go.Figure(go.Bar(x=list(range(40)), y=list(range(40)), selectedpoints=list(range(0, 40, 2))))
+    trace = figure_codec.encode_figure(fig)['data'][0]
+    assert trace['selectedpoints'] == list(range(0, 40, 2))
+    assert 'bdata' in trace['y']
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import forecasting
+
+JULY = 6
+
+
+def spiked_series(start, years=3):
+    """Monthly counts of 10 with 180 every July, from absolute month ``start``"""
+    phases = (start + np.arange(years * 12)) % 12
+    return np.where(phases == JULY, 180.0, 10.0)[None, :]
+
+
+def forecaster_for(matrix, start):
+    forecaster = forecasting.SeriesForecaster()
+    forecaster.state = forecasting.fit_series(matrix, start)
+    forecaster.n_obs = np.full(len(matrix), matrix.shape[1])
+    forecaster.last_period = start + matrix.shape[1] - 1
+    return forecaster
+
+
+@pytest.mark.parametrize('first_month', [0, 3, 7, 11])
+def test_seasonality_follows_calendar_months(first_month):
+    start = 2008 * 12 + first_month
+    forecaster = forecaster_for(spiked_series(start), start)
+    mean, _ = forecaster.forecast(12)
+    phases = (forecaster.last_period + np.arange(1, 13)) % 12
+    np.testing.assert_allclose(mean[0, phases == JULY], 180, atol=1)
+    np.testing.assert_allclose(mean[0, phases != JULY], 10, atol=1)
+    # A pure seasonal pattern needs no seasonal smoothing
+    assert forecaster.state['gamma'][0] == 0
+
+
+def test_forecast_frame_sums_series(incidents):
+    forecaster = forecasting.SeriesForecaster(horizon=3).fit(incidents)
+    total = forecaster.forecast_frame()
+    by_site = forecaster.forecast_frame(by=['Site'])
+    assert len(total) == 3
+    # Clipping at zero is per group, so the sum over sites can only be larger
+    assert (by_site.groupby(['Year', 'Month'], sort=False)['Forecast'].sum().to_numpy()
+            >= total['Forecast'].to_numpy() - 1e-9).all()
+
+
+def total_forecast(forecaster):
+    return forecaster.forecast_frame()['Forecast'].sum()
+
+
+def test_cache_is_refitted_when_the_data_changes(incidents, tmp_path):
+    cache = str(tmp_path / 'forecast.npz')
+    first = total_forecast(forecasting.load_or_fit(incidents, cache, horizon=3))
+    scaled = incidents.assign(Count=incidents['Count'] * 10)
+    cached = total_forecast(forecasting.load_or_fit(scaled, cache, horizon=3))
+    fresh = total_forecast(forecasting.SeriesForecaster(horizon=3).fit(scaled))
+    assert cached == pytest.approx(fresh)
+    assert cached == pytest.approx(10 * first)
+
+
+def test_cache_resumes_on_the_same_history(incidents, tmp_path, monkeypatch):
+    cache = str(tmp_path / 'forecast.npz')
+    older = incidents[incidents['Year'] < incidents['Year'].max()]
+    forecasting.load_or_fit(older, cache, horizon=3)
+
+    def no_fit(self, df):
+        raise AssertionError('the cached months did not change')
+
+    monkeypatch.setattr(forecasting.SeriesForecaster, 'fit', no_fit)
+    forecaster = forecasting.load_or_fit(incidents, cache, horizon=3)
+    assert forecaster.last_period == incidents['Year'].max() * 12 + 11
+    # Other settings do not reuse the cache
+    monkeypatch.undo()
+    assert forecasting.load_or_fit(incidents, cache, horizon=4).horizon == 4
+    assert forecasting.load_or_fit(incidents, cache, keys=['Site'], horizon=4).keys == ['Site']
+
+
+def test_negative_horizon_is_rejected():
+    import argparse
+
+    assert forecasting.parse_horizon('0') == 0
+    for text in ('-1', 'soon'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            forecasting.parse_horizon(text)
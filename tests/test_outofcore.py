@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+import outofcore
+
+
+def reference(df, by):
+    return df.assign(Records=1).groupby(by)[['Count', outofcore.RECORDS]].sum()
+
+
+def write(df, path):
+    extension = path.suffix
+    if extension == '.csv':
+        df.to_csv(path, index=False)
+    elif extension == '.parquet':
+        df.to_parquet(path, index=False, row_group_size=1000)
+    else:
+        df.to_feather(path)
+    return str(path)
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.parquet', '.feather'])
+@pytest.mark.parametrize('by', [None, ['Site', 'Year']])
+def test_file_matches_pandas(incidents, tmp_path, extension, by):
+    path = write(incidents, tmp_path / f'incidents{extension}')
+    frame = outofcore.aggregate_file(path, by=by, chunk_rows=700)
+    columns = by or [column for column in incidents.columns if column != 'Count']
+    assert frame[columns].equals(frame[columns].sort_values(columns, ignore_index=True))
+    pd.testing.assert_frame_equal(frame.set_index(columns), reference(incidents, columns), check_dtype=False)
+
+
+def test_reduced_file_keeps_its_record_counts(incidents, tmp_path):
+    reduced = outofcore.aggregate_chunks([incidents.iloc[:3000], incidents.iloc[2000:]])
+    path = write(reduced, tmp_path / 'reduced.parquet')
+    frame = outofcore.aggregate_file(path, chunk_rows=500)
+    assert outofcore.record_count(frame) == len(incidents) + 1000
+    assert frame['Count'].sum() == incidents['Count'].sum() + incidents['Count'].iloc[2000:3000].sum()
+
+
+def test_errors(tmp_path):
+    with pytest.raises(ValueError):
+        outofcore.aggregate_chunks([])
+    with pytest.raises(ValueError):
+        list(outofcore.iter_chunks(str(tmp_path / 'incidents.xlsx')))
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+import outofcore
+import partitioned
+
+
+def reference(df, by):
+    """Count and record sums by ``by``, with pandas"""
+    frame = df.assign(Records=1) if outofcore.RECORDS not in df else df
+    return frame.groupby(by)[['Count', outofcore.RECORDS]].sum().sort_index()
+
+
+def reduced(frame, by):
+    return frame.groupby(by)[['Count', outofcore.RECORDS]].sum().sort_index()
+
+
+@pytest.mark.parametrize('workers', [1, 2, 3])
+def test_matches_pandas(incidents, monkeypatch, workers):
+    # Small partitions so the frame really is split over the workers
+    monkeypatch.setattr(partitioned, 'MIN_PARTITION_ROWS', 1000)
+    frame = partitioned.aggregate_frame(incidents, workers=workers)
+    assert len(frame) == len(frame.drop_duplicates(partitioned.CHART_COLUMNS))
+    for by in (partitioned.CHART_COLUMNS, ['Site'], ['Year', 'Month']):
+        pd.testing.assert_frame_equal(reduced(frame, by), reference(incidents, by), check_dtype=False)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_reduced_frame_keeps_its_record_counts(incidents, monkeypatch, workers):
+    monkeypatch.setattr(partitioned, 'MIN_PARTITION_ROWS', 1000)
+    # Every row of the reduced frame stands for two records
+    twice = outofcore.aggregate_chunks([incidents, incidents], value='Count')
+    assert (twice[outofcore.RECORDS] == 2).all()
+    frame = partitioned.aggregate_frame(twice, workers=workers)
+    expected = reference(incidents, partitioned.CHART_COLUMNS) * 2
+    pd.testing.assert_frame_equal(reduced(frame, partitioned.CHART_COLUMNS), expected, check_dtype=False)
+
+
+def test_small_frame_is_summed_in_process(incidents, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError('no worker pool for a single partition')
+
+    import concurrent.futures
+
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', no_pool)
+    frame = partitioned.aggregate_frame(incidents, workers=8)
+    assert frame[outofcore.RECORDS].sum() == len(incidents)
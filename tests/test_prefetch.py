@@ -0,0 +1,92 @@
+import json
+import time
+
+import prefetch
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = prefetch.ResultCache(max_results=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert len(cache) == 2
+
+
+def test_state_key_ignores_value_order_and_empty_values():
+    assert (prefetch.state_key((['b', 'a'], []), {'pie': ['x'], 'bar': []})
+            == prefetch.state_key((['a', 'b'], None), {'pie': ['x']}))
+
+
+def test_access_log_is_bounded(tmp_path):
+    path = tmp_path / 'log.json'
+    log = prefetch.AccessLog(str(path), max_states=10)
+    for i in range(5000):
+        log.record(([f'site-{i}'], None))
+        if i % 5 == 0:
+            # A popular state keeps its place while one-off states come and go
+            log.record((['Spill'], None))
+    assert len(log) <= 20
+    assert log.most_common(1) == [((['Spill'], None), {})]
+    log.save()
+    saved = json.loads(path.read_text())
+    assert len(saved) == 10
+    assert prefetch.AccessLog(str(path)).most_common(1)[0][0] == (['Spill'], None)
+
+
+def test_adjacent_states():
+    states = list(prefetch.adjacent_states((['a'], None), [['a', 'b'], ['x']]))
+    assert states == [(None, None), (['b'], None), (['a'], ['x'])]
+
+
+def test_lookup_warm_and_idle_prefetch(tmp_path):
+    calls = []
+
+    def compute(filters, selection, view):
+        calls.append(filters)
+        return {'filters': filters}
+
+    log = prefetch.AccessLog(str(tmp_path / 'log.json'))
+    log.record((['b'], None))
+    prefetcher = prefetch.Prefetcher(compute, [['a', 'b'], ['x']], log, warm=5, idle_seconds=0.01)
+    assert prefetcher.warm() == 1
+
+    payload, hit = prefetcher.lookup((['b'], []))
+    assert hit and payload == {'filters': (['b'], None)} and calls == [(['b'], None)]
+    payload, hit = prefetcher.lookup((None, None))
+    assert not hit
+
+    prefetcher.start()
+    deadline = time.monotonic() + 5
+    while prefetcher.prefetched < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # The neighbours of the unfiltered state not computed yet: ['a'] and ['x']
+    assert prefetcher.lookup((['a'], None))[1]
+    assert prefetcher.lookup((None, ['x']))[1]
+
+
+def test_neighbours_are_ranked_on_the_prefetch_thread():
+    import threading
+
+    options = [[f'option-{i}' for i in range(200)], ['x']]
+    prefetcher = prefetch.Prefetcher(lambda filters, selection, view: filters, options, idle_seconds=0.01)
+    ranked_on = []
+    adjacent = prefetcher._adjacent
+
+    def recording_adjacent(*args):
+        ranked_on.append(threading.current_thread().name)
+        return adjacent(*args)
+
+    prefetcher._adjacent = recording_adjacent
+    prefetcher.lookup((None, None))
+    prefetcher.lookup((['option-3'], None))
+    assert ranked_on == []
+
+    prefetcher.start()
+    deadline = time.monotonic() + 5
+    while prefetcher.prefetched < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Only the neighbours of the last request were ranked, on the prefetch thread
+    assert ranked_on == ['prefetch']
+    assert prefetcher.lookup((None, None))[1]
@@ -0,0 +1,37 @@
+import os
+
+import enhanced_dashboard
+import static_queries
+
+
+def reference(df, rollups, combination):
+    """Chart sums of the rows matching a combination, with pandas"""
+    mask = True
+    for column, position in zip(static_queries.FILTERS, combination):
+        if position < len(rollups['labels'][column]):
+            mask = mask & (df[column] == rollups['labels'][column][position])
+    rows = df[mask]
+    charts = {column: rows.groupby(column)['Count'].sum() for column in ('Category', 'Site', 'Cause', 'Month',
+                                                                        'Severity')}
+    trend = rows.groupby(['Year', 'Month'])['Count'].sum()
+    charts['Trend'] = {f'{year}-{month}': value for (year, month), value in trend.items()}
+    return {name: {label: value for label, value in dict(sums).items() if value} for name, sums in charts.items()}
+
+
+def test_every_combination_matches_pandas(incidents):
+    rollups = static_queries.build_rollups(incidents, enhanced_dashboard.months)
+    combinations = static_queries.combinations(rollups)
+    for combination in combinations[::7]:
+        answer = static_queries.query(rollups, combination)
+        expected = reference(incidents, rollups, combination)
+        assert {name: dict(zip(chart['labels'], chart['values'])) for name, chart in answer.items()} == expected
+
+
+def test_only_combinations_with_incidents(incidents, tmp_path):
+    df = incidents[~((incidents['Site'] == 'Weston') & (incidents['Year'] == 2008))]
+    manifest = static_queries.write_static_queries(df, str(tmp_path), enhanced_dashboard.months)
+    assert not any(key.endswith('|Weston|2008') for key in manifest['results'])
+    assert '|||' in manifest['results'] and 'Spill|||' in manifest['results']
+    assert os.path.exists(tmp_path / manifest['empty'])
+    rollups = static_queries.build_rollups(df, enhanced_dashboard.months)
+    assert all(not chart['labels'] for chart in static_queries.empty_answer(rollups).values())
@@ -0,0 +1,22 @@
+import argparse
+
+import pytest
+
+import topk
+
+
+@pytest.mark.parametrize('k', [None, 1, 3, 100])
+def test_top_k_matches_pandas(incidents, k):
+    sums = incidents.groupby('Cause')['Count'].sum().sort_values(ascending=False, kind='stable')
+    frame = topk.top_k(incidents, 'Cause', k)
+    kept = sums if k is None else sums.iloc[:k]
+    assert dict(zip(frame['Cause'], frame['Count'])) == {
+        **kept.to_dict(), **({topk.OTHER_LABEL: sums.iloc[k:].sum()} if k is not None and len(sums) > k else {})}
+    assert frame['Count'].sum() == incidents['Count'].sum()
+
+
+def test_parse_k_rejects_less_than_one():
+    assert topk.parse_k('5') == 5
+    for text in ('0', '-2', 'many'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            topk.parse_k(text)
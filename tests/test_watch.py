@@ -0,0 +1,99 @@
+import pandas as pd
+import pytest
+
+import outofcore
+import partitioned
+import watch
+
+
+def totals(frame):
+    return frame['Count'].sum(), frame[outofcore.RECORDS].sum()
+
+
+def settle(watcher):
+    """Poll until no partition is still being written, return the last changes"""
+    changes = watcher.poll()
+    while watcher.pending():
+        changes = watcher.poll()
+    return changes
+
+
+@pytest.fixture
+def feed(tmp_path, incidents):
+    incidents.iloc[:3000].to_csv(tmp_path / 'a.csv', index=False)
+    incidents.iloc[3000:].to_csv(tmp_path / 'b.csv', index=False)
+    return tmp_path
+
+
+def test_frame_matches_full_aggregation(feed, incidents):
+    watcher = watch.DataWatcher(str(feed))
+    settle(watcher)
+    expected = outofcore.aggregate_chunks([incidents], partitioned.CHART_COLUMNS)
+    pd.testing.assert_frame_equal(watcher.frame(), expected, check_dtype=False)
+
+
+def test_append_is_read_incrementally(feed, incidents):
+    watcher = watch.DataWatcher(str(feed))
+    settle(watcher)
+    with open(feed / 'b.csv', 'a') as f:
+        incidents.iloc[:100].to_csv(f, index=False, header=False)
+    added, appended, changed, removed = settle(watcher)
+    assert appended == [str(feed / 'b.csv')] and not (added or changed or removed)
+    assert totals(watcher.frame()) == (incidents['Count'].sum() + incidents['Count'].iloc[:100].sum(),
+                                       len(incidents) + 100)
+
+
+def test_bad_partition_keeps_last_good_sums(feed, incidents):
+    watcher = watch.DataWatcher(str(feed))
+    settle(watcher)
+    expected = totals(watcher.frame())
+
+    (feed / 'c.csv').write_text('garbage,,,\n')
+    settle(watcher)
+    assert totals(watcher.frame()) == expected
+
+    # A partition that turns bad keeps the sums read before
+    (feed / 'a.csv').write_text('garbage,,,\n')
+    settle(watcher)
+    assert totals(watcher.frame()) == expected
+
+    # and is read again once it is fixed
+    incidents.iloc[:10].to_csv(feed / 'c.csv', index=False)
+    settle(watcher)
+    assert totals(watcher.frame())[1] == expected[1] + 10
+
+
+def test_empty_directory_has_no_frame(tmp_path):
+    watcher = watch.DataWatcher(str(tmp_path))
+    assert settle(watcher) is None
+    assert watcher.frame() is None
+
+
+def test_watch_survives_bad_partition_and_failed_rebuild(feed, incidents, monkeypatch):
+    built = []
+
+    def rebuild(df):
+        built.append(totals(df))
+        if len(built) == 2:
+            raise RuntimeError("template error")
+
+    steps = iter([
+        lambda: (feed / 'c.csv').write_text('garbage,,,\n'),
+        lambda: None,
+        lambda: incidents.iloc[:10].to_csv(feed / 'd.csv', index=False),
+        lambda: None,
+        lambda: incidents.iloc[:20].to_csv(feed / 'e.csv', index=False),
+        lambda: None,
+    ])
+
+    def sleep(_):
+        # Each poll interval changes the feed, then stops the watcher
+        step = next(steps, None)
+        if step is None:
+            raise KeyboardInterrupt
+        step()
+
+    monkeypatch.setattr(watch.time, 'sleep', sleep)
+    watch.watch(str(feed), rebuild, interval=0)
+    records = len(incidents)
+    assert [rows for _, rows in built] == [records, records + 10, records + 30]
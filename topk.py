@@ -0,0 +1,81 @@
+"""
+Top-K aggregation with an "Other" bucket for high-cardinality dimensions
+
+``top_k`` aggregates a frame by one column and keeps the K largest groups
+using a partial selection (``np.argpartition``, O(n)) instead of sorting
+every group; the remaining groups are summed into a single "Other" row.
+"""
+
+OTHER_LABEL = 'Other'
+
+
+def limit_for(top_k, column):
+    """Resolve ``top_k`` (an int, or a dict of column -> int) for one chart"""
+    if isinstance(top_k, dict):
+        return top_k.get(column)
+    return top_k
+
+
+def parse_k(text):
+    """``argparse`` type for ``--top-k``: a whole number of groups, at least 1"""
+    import argparse
+
+    try:
+        k = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid K: {text!r}") from None
+    if k < 1:
+        raise argparse.ArgumentTypeError(f"K must be at least 1, got {k}")
+    return k
+
+
+def _top_indices(values, k):
+    import numpy as np
+
+    if k is None or len(values) <= k:
+        return np.argsort(-values, kind='stable')
+    # Partial selection: only the K winners get sorted
+    selected = np.argpartition(-values, k - 1)[:k]
+    return selected[np.argsort(-values[selected], kind='stable')]
+
+
+def top_k(df, column, k=None, value='Count', other_label=OTHER_LABEL):
+    """Sum ``value`` by ``column`` keeping the ``k`` largest groups plus an "Other" row"""
+    import pandas as pd
+
+    grouped = df.groupby(column)[value].sum()
+    if k is None or len(grouped) <= k:
+        return grouped.reset_index().sort_values(value, ascending=False)
+
+    values = grouped.to_numpy()
+    selected = _top_indices(values, k)
+    top = grouped.iloc[selected].reset_index()
+    other = pd.DataFrame({column: [other_label], value: [values.sum() - values[selected].sum()]})
+    return pd.concat([top, other], ignore_index=True)
+
+
+def top_k_values(labels, values, k=None, other_label=OTHER_LABEL):
+    """``top_k`` over already aggregated ``(labels, values)`` arrays, as two lists"""
+    import numpy as np
+
+    values = np.asarray(values)
+    selected = _top_indices(values, k)
+    top_labels = [labels[i] for i in selected]
+    top_values = values[selected].tolist()
+    if k is not None and len(values) > k:
+        top_labels.append(other_label)
+        top_values.append((values.sum() - values[selected].sum()).item())
+    return top_labels, top_values
+
+
+def collapse_other(df, column, k=None, value='Count', other_label=OTHER_LABEL):
+    """Relabel rows outside the ``k`` largest groups of ``column`` as "Other" (row-level charts)"""
+    if k is None:
+        return df
+    grouped = df.groupby(column)[value].sum()
+    if len(grouped) <= k:
+        return df
+    keep = grouped.index[_top_indices(grouped.to_numpy(), k)]
+    df = df.copy()
+    df[column] = df[column].where(df[column].isin(keep), other_label)
+    return df
@@ -0,0 +1,260 @@
+"""
+Watch mode: rebuild a static dashboard whenever its data changes
+
+``--watch`` keeps a generator running on a ``--data`` file, or on a
+directory of partition files (CSV, Parquet, Feather) such as an hourly
+feed writes. Each partition is kept as its partial sums by the chart
+columns (``outofcore.partial_sums``); a poll compares the size and mtime of
+every partition and re-reads only the ones that changed. Rows appended to a
+CSV are parsed from the previous end of the file, and a partition is only
+read once its size and mtime are the same at two polls in a row. The
+partial sums are merged into a reduced incident frame (one row per label
+combination, with ``outofcore.RECORDS``), so a rebuild only costs the
+charts of that frame.
+
+A partition that cannot be read (malformed rows, missing columns) is
+reported and keeps its last good sums until it changes again, and a failed
+rebuild keeps the previous page, so one bad file never stops the watcher.
+
+Pages are written with ``write_atomic``: readers see the old page or the
+new one, never a partial file.
+"""
+
+import os
+import time
+
+import outofcore
+import partitioned
+
+# Seconds between two polls of the data
+DEFAULT_INTERVAL = 2.0
+PARTITION_EXTENSIONS = ('.csv', '.parquet', '.feather', '.arrow')
+# Bytes before the end of a CSV that must be unchanged for new bytes to count as an append
+TAIL_BYTES = 4096
+
+
+def write_atomic(path, text):
+    """Write ``text`` to ``path`` through a temporary file renamed over it"""
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def partition_files(path):
+    """Partition files of a data directory (hidden and temporary files excluded), or ``[path]`` for a file"""
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(os.path.join(path, name) for name in os.listdir(path)
+                  if not name.startswith('.') and os.path.splitext(name)[1].lower() in PARTITION_EXTENSIONS)
+
+
+def signature(path):
+    """``(size, mtime)`` of a file, or None when it is gone"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class _Partition:
+    """Partial sums of one data file and how much of it they cover"""
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.sums = None
+        # CSV only: bytes summed so far, the bytes just before that point and the header
+        self.offset = 0
+        self.tail = b''
+        self.columns = None
+
+
+class DataWatcher:
+    """Partial sums of every partition under ``path``, refreshed from the partitions that changed"""
+
+    def __init__(self, path, by=partitioned.CHART_COLUMNS, value='Count', chunk_rows=outofcore.CHUNK_ROWS):
+        self.path = path
+        self.by = list(by)
+        self.value = value
+        self.chunk_rows = chunk_rows
+        self.partitions = {}
+        # Signatures seen at the previous poll, to wait for partitions that are still being written
+        self._pending = {}
+
+    def _sum(self, chunks):
+        partials = [outofcore.partial_sums(chunk, self.by, self.value) for chunk in chunks]
+        return outofcore.merge_sums(partials, self.value) if partials else None
+
+    def _read(self, partition, size):
+        """Sum a whole partition (left unchanged if reading it fails)"""
+        sums = self._sum(outofcore.iter_chunks(partition.path, self.chunk_rows, self.by + [self.value]))
+        if partition.path.lower().endswith('.csv'):
+            import pandas as pd
+
+            columns = list(pd.read_csv(partition.path, nrows=0).columns)
+            with open(partition.path, 'rb') as f:
+                f.seek(max(0, size - TAIL_BYTES))
+                tail = f.read(size - max(0, size - TAIL_BYTES))
+            partition.columns, partition.offset, partition.tail = columns, size, tail
+        partition.sums = sums
+
+    def _appended(self, partition, size):
+        """Whether a CSV only grew by whole lines since it was summed (its old last bytes are still in place)"""
+        if partition.columns is None or size <= partition.offset or not partition.tail.endswith(b'\n'):
+            return False
+        with open(partition.path, 'rb') as f:
+            f.seek(partition.offset - len(partition.tail))
+            return f.read(len(partition.tail)) == partition.tail
+
+    def _read_appended(self, partition, size):
+        """Add the rows appended to a CSV to its sums"""
+        import io
+
+        import pandas as pd
+
+        with open(partition.path, 'rb') as f:
+            f.seek(partition.offset)
+            data = f.read(size - partition.offset)
+        chunks = pd.read_csv(io.BytesIO(data), header=None, names=partition.columns,
+                             usecols=self.by + [self.value], chunksize=self.chunk_rows)
+        new = self._sum(chunks)
+        if new is not None:
+            partition.sums = outofcore.merge_sums([partition.sums, new], self.value)
+        partition.offset = size
+        partition.tail = (partition.tail + data)[-TAIL_BYTES:]
+
+    def _settled(self, path, current):
+        """Whether ``path`` kept the same signature since the last poll"""
+        previous = self._pending.get(path)
+        self._pending[path] = current
+        return previous == current
+
+    def poll(self):
+        """Refresh the partitions that changed; returns ``(added, appended, changed, removed)`` paths, or None"""
+        added, appended, changed, removed = [], [], [], []
+        files = partition_files(self.path)
+        self._pending = {path: pending for path, pending in self._pending.items() if path in files}
+        for path in set(self.partitions) - set(files):
+            del self.partitions[path]
+            removed.append(path)
+        for path in files:
+            current = signature(path)
+            partition = self.partitions.get(path)
+            if current is None or (partition is not None and partition.signature == current):
+                self._pending.pop(path, None)
+                continue
+            if not self._settled(path, current):
+                continue
+            new = partition is None
+            if new:
+                partition = _Partition(path)
+            try:
+                if new:
+                    self._read(partition, current[0])
+                    added.append(path)
+                elif self._appended(partition, current[0]):
+                    self._read_appended(partition, current[0])
+                    appended.append(path)
+                else:
+                    self._read(partition, current[0])
+                    changed.append(path)
+            except (OSError, ValueError, KeyError) as exc:
+                # Keep the last good sums; the partition is read again once it changes
+                print(f"⚠️ Skipping unreadable partition {path}: {exc}")
+            if new:
+                self.partitions[path] = partition
+            if signature(path) != current:
+                # Written to while being read: read it whole again once it settles
+                partition.columns = None
+                current = None
+            partition.signature = current
+            self._pending.pop(path, None)
+        if not (added or appended or changed or removed):
+            return None
+        return added, appended, changed, removed
+
+    def pending(self):
+        """Whether some partition is still being written (seen changing at the last poll)"""
+        return bool(self._pending)
+
+    def frame(self):
+        """Reduced incident frame of every partition (sorted like ``outofcore.aggregate_chunks``), or None
+
+        None when there is no partition, or none with rows that could be read.
+        """
+        sums = [partition.sums for partition in self.partitions.values() if partition.sums is not None]
+        if not sums:
+            return None
+        frame = outofcore.merge_sums(sums, self.value).reset_index()
+        return frame.sort_values(self.by, kind='stable', ignore_index=True)
+
+
+def wait_for_data(watcher, interval):
+    """Poll until every partition present has settled and some rows could be read, return the first frame"""
+    waiting = False
+    while True:
+        watcher.poll()
+        if not watcher.pending():
+            frame = watcher.frame()
+            if frame is not None:
+                return frame
+            if not waiting:
+                print(f"⏳ No readable data in {watcher.path} yet, waiting for partitions...")
+                waiting = True
+        time.sleep(interval)
+
+
+def _rebuild(rebuild, frame):
+    """Call ``rebuild(frame)``, reporting a failure instead of raising it"""
+    try:
+        rebuild(frame)
+    except Exception as exc:
+        # The previous page stays in place until the next change rebuilds it
+        print(f"❌ Rebuild failed, keeping the previous page: {exc}")
+        return False
+    return True
+
+
+def watch(path, rebuild, interval=DEFAULT_INTERVAL, chunk_rows=outofcore.CHUNK_ROWS):
+    """Call ``rebuild(df)`` with the reduced frame of ``path`` now and after every change, until interrupted"""
+    watcher = DataWatcher(path, chunk_rows=chunk_rows)
+    print(f"👀 Watching {path} (every {interval:g} s, Ctrl+C to stop)")
+    try:
+        _rebuild(rebuild, wait_for_data(watcher, interval))
+        while True:
+            time.sleep(interval)
+            start = time.perf_counter()
+            try:
+                changes = watcher.poll()
+            except OSError as exc:
+                # e.g. the data directory is being replaced
+                print(f"⚠️ Could not list {path}: {exc}")
+                continue
+            if changes is None:
+                continue
+            summary = ', '.join(f"{len(paths)} {kind}" for kind, paths in
+                                zip(('added', 'appended', 'changed', 'removed'), changes) if paths)
+            print(f"🔄 Data changed ({summary})")
+            frame = watcher.frame()
+            if frame is None:
+                print(f"⏳ No readable data left in {path}, keeping the previous page")
+                continue
+            if _rebuild(rebuild, frame):
+                print(f"⚡ Rebuilt in {time.perf_counter() - start:.2f} s")
+    except KeyboardInterrupt:
+        print("👋 Stopped watching")
+
+
+def add_arguments(parser):
+    """Register the watch flag on an argparse parser"""
+    parser.add_argument('--watch', type=float, nargs='?', const=DEFAULT_INTERVAL, metavar='SECONDS',
+                        help="Keep running and rebuild whenever the --data file or directory changes, polling every "
+                             f"SECONDS seconds (default: {DEFAULT_INTERVAL:g})")
+
+
+def check_arguments(parser, args):
+    """Reject ``--watch`` without ``--data``"""
+    if args.watch is not None and not args.data:
+        parser.error("--watch needs --data (a file or a directory of partition files)")